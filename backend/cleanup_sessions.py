@@ -1,52 +1,248 @@
 """
-Cleanup script for abandoned upload sessions
-This script should be run periodically (e.g. via cron) to clean up:
-1. Expired upload sessions (older than 2 hours)
-2. Orphaned chunk files on disk
-3. Old completed sessions (older than 7 days)
+Sweeper for abandoned upload sessions and files
+Runs inside the server as a periodic background task, or once from the command line:
+1. Expires active upload sessions past their expiry, in bulk, and deletes their partial files
+2. Reclaims orphaned files in temp_chunks/ and uploads/ that no session or job owns
+3. Enforces a disk quota by expiring the least recently active uploads
+4. Purges finished session rows, jobs (with their reports) and work queue items older
+   than the retention period
 """
+import argparse
+import asyncio
+import json
+import logging
 import os
 import shutil
+import time
 from datetime import datetime, timedelta
-from supabase_client import supabase_service
+from typing import Dict, List, Optional, Set
 
 # Import paths from chunked_upload_router
 import sys
 sys.path.append(os.path.dirname(__file__))
 from routers.chunked_upload_router import TEMP_CHUNK_DIR, UPLOAD_DIR
+from routers.assessment_router import admission_controller
+from services.object_store import object_store
+from session_registry import upload_registry, supabase_write_behind
+from job_store import job_store
+from work_queue import work_queue
 
-def cleanup_expired_sessions():
-    """Clean up expired or abandoned upload sessions"""
-    print("Starting cleanup of expired sessions...")
-    
-    # Get all active sessions from Supabase
-    # Note: This is a simplified approach. In a real implementation, you would
-    # query Supabase directly for expired sessions.
-    
-    # For demonstration purposes, we'll just print a message
-    print("Would clean up expired sessions from Supabase")
-    print("Would remove orphaned chunk directories")
-    
-    # In a real implementation, you would:
-    # 1. Query Supabase for sessions older than 2 hours with status 'active'
-    # 2. Mark them as 'expired' in the database
-    # 3. Remove their chunk directories from disk
-    
-    print("Cleanup completed")
-
-def cleanup_old_completed_sessions():
-    """Remove old completed sessions (older than 7 days)"""
-    print("Cleaning up old completed sessions...")
-    
-    # In a real implementation, you would:
-    # 1. Query Supabase for sessions older than 7 days with status 'completed'
-    # 2. Remove them from the database
-    # 3. Clean up any associated files
-    
-    print("Old completed sessions cleanup completed")
+logger = logging.getLogger(__name__)
+
+
+def disk_usage(path: str) -> int:
+    """Bytes allocated on disk for a file or directory tree"""
+    if os.path.isdir(path) and not os.path.islink(path):
+        return sum(disk_usage(os.path.join(path, name)) for name in os.listdir(path))
+    st = os.lstat(path)
+    # Preallocated upload targets occupy their full size even before chunks arrive
+    return st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+
+
+class UploadSweeper:
+    def __init__(self, interval: float = 300, orphan_grace: timedelta = timedelta(hours=6),
+                 disk_quota_bytes: Optional[int] = None, retention: timedelta = timedelta(days=7)):
+        self.interval = interval
+        self.orphan_grace = orphan_grace
+        self.disk_quota_bytes = disk_quota_bytes
+        self.retention = retention
+        self._task = None
+        self.metrics = {
+            "runs": 0,
+            "sessions_expired": 0,
+            "quota_evictions": 0,
+            "files_removed": 0,
+            "bytes_reclaimed": 0,
+            "sessions_purged": 0,
+            "jobs_purged": 0,
+            "last_run_at": None,
+            "last_run_s": None
+        }
+
+    def _remove(self, path: str, result: Dict):
+        try:
+            size = disk_usage(path)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"Sweeper could not remove {path}: {e}")
+            return
+        result["files_removed"] += 1
+        result["bytes_reclaimed"] += size
+
+    def _release_session(self, session: Dict, result: Dict):
+        """Delete whatever an expired session was holding"""
+        if session.get("upload_type") == "s3_multipart":
+            try:
+                object_store.abort_multipart_upload(session["s3_key"], session["s3_upload_id"])
+            except Exception as e:
+                logger.warning(f"Sweeper could not abort object upload {session['session_id']}: {e}")
+        elif session.get("target_path"):
+            self._remove(session["target_path"], result)
+        result["expired_ids"].append(session["session_id"])
+
+    def _live_assessments(self) -> Set[str]:
+        return set(job_store.list_job_ids("processing"))
+
+    def _is_orphan(self, directory: str, name: str, live: Set[str]) -> bool:
+        path = os.path.join(directory, name)
+        owner_id = name.split(".", 1)[0]
+
+        if directory == TEMP_CHUNK_DIR:
+            session = upload_registry.get_session(owner_id)
+            if session and session["status"] in ("active", "completing"):
+                return False
+            # An incremental job may still be reading a completed upload in place
+            if session and session.get("video_id") in live:
+                return False
+        elif owner_id in live:
+            return False
+
+        age = time.time() - os.lstat(path).st_mtime
+        return age > self.orphan_grace.total_seconds()
+
+    def _enforce_quota(self, live: Set[str], result: Dict):
+        usage = sum(
+            disk_usage(os.path.join(directory, name))
+            for directory in (TEMP_CHUNK_DIR, UPLOAD_DIR) for name in os.listdir(directory)
+        )
+        result["disk_usage_bytes"] = usage
+        if self.disk_quota_bytes is None or usage <= self.disk_quota_bytes:
+            return
+
+        for session in upload_registry.list_sessions("active"):
+            if usage <= self.disk_quota_bytes:
+                break
+            if session.get("video_id") in live or session.get("upload_type") == "s3_multipart":
+                continue
+            if not upload_registry.transition_status(session["session_id"], "active", "expired"):
+                continue
+            upload_registry.delete_chunks(session["session_id"])
+
+            reclaimed_before = result["bytes_reclaimed"]
+            self._release_session(session, result)
+            usage -= result["bytes_reclaimed"] - reclaimed_before
+            result["quota_evictions"] += 1
+            logger.warning(f"Disk quota exceeded, expired upload session {session['session_id']}")
+
+    def sweep(self) -> Dict:
+        """One full pass; returns what was reclaimed"""
+        started = time.perf_counter()
+        result = {
+            "sessions_expired": 0,
+            "quota_evictions": 0,
+            "files_removed": 0,
+            "bytes_reclaimed": 0,
+            "sessions_purged": 0,
+            "jobs_purged": 0,
+            "expired_ids": []
+        }
+
+        # 1. Expire stale sessions in one transaction, then release their files
+        expired = upload_registry.expire_stale_sessions()
+        for session in expired:
+            self._release_session(session, result)
+        result["sessions_expired"] = len(expired)
+
+        # 2. Reclaim files nothing owns any more
+        live = self._live_assessments()
+        for directory in (TEMP_CHUNK_DIR, UPLOAD_DIR):
+            for name in os.listdir(directory):
+                try:
+                    if self._is_orphan(directory, name, live):
+                        self._remove(os.path.join(directory, name), result)
+                except FileNotFoundError:
+                    continue
+
+        # 3. Stay under the disk quota
+        self._enforce_quota(live, result)
+
+        # 4. Forget long-finished sessions, jobs and queue items
+        before = (datetime.utcnow() - self.retention).isoformat()
+        result["sessions_purged"] = upload_registry.purge_finished_sessions(before)
+        result["jobs_purged"] = job_store.purge_finished(before)
+        work_queue.purge_finished(before)
+
+        result["duration_s"] = round(time.perf_counter() - started, 3)
+        return result
+
+    def record(self, result: Dict):
+        """Fold a sweep result into the running metrics and mirror expirations to Supabase"""
+        for key in ("sessions_expired", "quota_evictions", "files_removed", "bytes_reclaimed",
+                    "sessions_purged", "jobs_purged"):
+            self.metrics[key] += result[key]
+        self.metrics["runs"] += 1
+        self.metrics["last_run_at"] = datetime.utcnow().isoformat()
+        self.metrics["last_run_s"] = result["duration_s"]
+
+        for session_id in result["expired_ids"]:
+            supabase_write_behind.update(session_id, {"status": "expired"})
+            # An incremental job reading this upload fails once it sees the session expired
+            admission_controller.release(f"upload:{session_id}")
+
+        if result["sessions_expired"] or result["files_removed"]:
+            logger.info(
+                f"Sweeper expired {result['sessions_expired']} sessions, evicted {result['quota_evictions']}, "
+                f"removed {result['files_removed']} files ({result['bytes_reclaimed']} bytes)"
+            )
+
+    async def run(self):
+        while True:
+            try:
+                result = await asyncio.to_thread(self.sweep)
+                self.record(result)
+            except Exception as e:
+                logger.error(f"Upload sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+def quota_from_env() -> Optional[int]:
+    quota_gb = os.getenv("UPLOAD_DISK_QUOTA_GB")
+    return int(float(quota_gb) * 1024 ** 3) if quota_gb else None
+
+
+# Singleton instance
+upload_sweeper = UploadSweeper(
+    interval=float(os.getenv("SWEEP_INTERVAL_SECONDS", "300")),
+    orphan_grace=timedelta(hours=float(os.getenv("ORPHAN_GRACE_HOURS", "6"))),
+    disk_quota_bytes=quota_from_env()
+)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Reclaim abandoned uploads and files")
+    parser.add_argument("--orphan-grace-hours", type=float, help="Minimum age of an orphaned file before deletion")
+    parser.add_argument("--quota-gb", type=float, help="Disk quota for temp_chunks/ and uploads/ combined")
+    args = parser.parse_args(argv)
+
+    sweeper = upload_sweeper
+    if args.orphan_grace_hours is not None:
+        sweeper.orphan_grace = timedelta(hours=args.orphan_grace_hours)
+    if args.quota_gb is not None:
+        sweeper.disk_quota_bytes = int(args.quota_gb * 1024 ** 3)
 
-if __name__ == "__main__":
     print(f"Running cleanup script at {datetime.now()}")
-    cleanup_expired_sessions()
-    cleanup_old_completed_sessions()
-    print("All cleanup tasks completed")
\ No newline at end of file
+    result = sweeper.sweep()
+    sweeper.record(result)
+    asyncio.run(supabase_write_behind.flush())
+
+    result.pop("expired_ids")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -66,6 +66,11 @@ def create_tables():
                 upload_type TEXT DEFAULT 'direct' CHECK (upload_type IN ('direct', 'chunked', 's3_presigned', 's3_multipart')),
                 s3_upload_id TEXT,
                 s3_key TEXT,
+                tier TEXT DEFAULT 'standard',
+                tenant TEXT,
+                chunk_size INTEGER,
+                target_path TEXT,
+                incremental BOOLEAN DEFAULT FALSE,
                 status TEXT DEFAULT 'initiated' CHECK (status IN ('initiated', 'uploading', 'completed', 'failed', 'cancelled', 'expired')),
                 error_message TEXT,
                 expires_at TIMESTAMPTZ,
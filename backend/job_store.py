@@ -0,0 +1,623 @@
+"""
+Assessment job store
+Holds job status, progress, the serialised AssessmentReport and per-stage pipeline
+checkpoints. The default backend is an embedded SQLite (WAL) database shared by every
+worker process on the node; set JOB_STORE=memory for a single-process, non-persistent store.
+"""
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from models.assessment_models import AssessmentStatus, AssessmentReport
+from session_registry import DATA_DIR
+
+STATUS_FIELDS = ("status", "progress", "message", "error")
+
+
+def _jsonable(value):
+    """json.dumps fallback for pydantic models and numpy values in stage outputs"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_checkpoint(data: Dict) -> str:
+    return json.dumps(data, default=_jsonable)
+
+
+class LRUCache:
+    """Small thread-safe LRU map"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class JobStore(ABC):
+    """Interface shared by the job store backends
+
+    Every status write bumps the job's revision and is reported to the listeners
+    registered in this process (writes from other workers only show up through
+    get_revisions).
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """Call `callback(assessment_id)` after each status write made by this process"""
+        self._listeners.append(callback)
+
+    def _notify(self, assessment_id: str):
+        for callback in self._listeners:
+            try:
+                callback(assessment_id)
+            except Exception as e:
+                print(f"Warning: job status listener failed: {e}")
+
+    @abstractmethod
+    def create_job(self, status: AssessmentStatus, tier: Optional[str] = None):
+        """Create a job, or reset an existing one to `status`"""
+
+    @abstractmethod
+    def get_status(self, assessment_id: str) -> Optional[AssessmentStatus]:
+        """Current status of a job (None if unknown)"""
+
+    @abstractmethod
+    def update_status(self, assessment_id: str, **fields):
+        """Update any of status, progress, message and error"""
+
+    @abstractmethod
+    def complete_job(self, report: AssessmentReport, message: str = "Assessment complete!"):
+        """Store the report and mark the job completed in one step"""
+
+    @abstractmethod
+    def get_report(self, assessment_id: str) -> Optional[AssessmentReport]:
+        """Stored report of a completed job"""
+
+    @abstractmethod
+    def list_job_ids(self, status: str) -> List[str]:
+        """IDs of every job in a status"""
+
+    @abstractmethod
+    def get_revisions(self, assessment_ids: Iterable[str]) -> Dict[str, int]:
+        """Current revision of each existing job, in one read"""
+
+    @abstractmethod
+    def set_content_result(self, content_key: str, assessment_id: str):
+        """Remember the completed assessment for a (content hash, tier, scoring version) key"""
+
+    @abstractmethod
+    def get_content_result(self, content_key: str) -> Optional[str]:
+        """Assessment recorded for a content key by set_content_result"""
+
+    @abstractmethod
+    def set_job_input(self, assessment_id: str, job_input: Dict, owner: str):
+        """Record what a run was started with (for retries) and which process is running it"""
+
+    @abstractmethod
+    def get_job_input(self, assessment_id: str) -> Optional[Dict]:
+        """Input recorded by set_job_input"""
+
+    @abstractmethod
+    def get_owner(self, assessment_id: str) -> Optional[str]:
+        """Process recorded by set_job_input or claim_job"""
+
+    @abstractmethod
+    def claim_job(self, assessment_id: str, owner: str, expected_owner: Optional[str]) -> bool:
+        """Take over a job only if it is still owned by `expected_owner`"""
+
+    @abstractmethod
+    def set_cancel_requested(self, assessment_id: str, requested: bool = True):
+        """Ask the job to stop, wherever it runs (or clear the request)"""
+
+    @abstractmethod
+    def is_cancel_requested(self, assessment_id: str) -> bool:
+        """Whether cancellation was requested"""
+
+    @abstractmethod
+    def create_batch(self, batch_id: str, tier: Optional[str] = None, tenant: Optional[str] = None):
+        """Open a batch with the tier and tenant its jobs use"""
+
+    @abstractmethod
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        """A batch's ID, tier, tenant and creation time"""
+
+    @abstractmethod
+    def assign_batch(self, assessment_id: str, batch_id: str):
+        """Add a job to a batch"""
+
+    @abstractmethod
+    def get_batch_statuses(self, batch_id: str) -> List[AssessmentStatus]:
+        """Status of every job in a batch, in one read"""
+
+    @abstractmethod
+    def save_checkpoint(self, assessment_id: str, stage: str, data: Dict):
+        """Keep the output of a completed pipeline stage"""
+
+    @abstractmethod
+    def get_checkpoints(self, assessment_id: str) -> Dict[str, Dict]:
+        """Completed stage outputs, keyed by stage name"""
+
+    @abstractmethod
+    def clear_checkpoints(self, assessment_id: str):
+        """Drop every stage output of a job"""
+
+    @abstractmethod
+    def purge_finished(self, before: str) -> int:
+        """Delete completed, failed and cancelled jobs last updated before `before`, with
+        their reports, checkpoints and content-result keys; returns how many
+
+        Batches created before `before` that no longer have any jobs go as well.
+        """
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite/WAL job store; reports are LRU-cached by job revision
+
+    Any worker may rewrite or purge a job, so a cached report is only served while
+    the job's revision (one indexed read) still matches the one it was cached at.
+    """
+
+    def __init__(self, db_path: str, cache_size: int = 256):
+        super().__init__()
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Other workers write to the same database
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                assessment_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                message TEXT NOT NULL DEFAULT '',
+                error TEXT,
+                revision INTEGER NOT NULL DEFAULT 0,
+                tier TEXT,
+                report TEXT,
+                job_input TEXT,
+                owner TEXT,
+                batch_id TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+
+            CREATE TABLE IF NOT EXISTS content_results (
+                content_key TEXT PRIMARY KEY,
+                assessment_id TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY,
+                tier TEXT,
+                tenant TEXT,
+                created_at TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS job_checkpoints (
+                assessment_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (assessment_id, stage)
+            );
+        """)
+        self._add_missing_columns("jobs", {
+            "job_input": "TEXT",
+            "owner": "TEXT",
+            "revision": "INTEGER NOT NULL DEFAULT 0",
+            "batch_id": "TEXT",
+            "cancel_requested": "INTEGER NOT NULL DEFAULT 0"
+        })
+        self._add_missing_columns("batches", {"tenant": "TEXT"})
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id)")
+        self._report_cache = LRUCache(cache_size)
+
+    def _add_missing_columns(self, table: str, columns: Dict[str, str]):
+        existing = {r["name"] for r in self._conn.execute(f"PRAGMA table_info({table})")}
+        for name, definition in columns.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def create_job(self, status: AssessmentStatus, tier: Optional[str] = None):
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (assessment_id, status, progress, message, error, revision, tier, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT (assessment_id) DO UPDATE SET status = excluded.status, "
+                "progress = excluded.progress, message = excluded.message, error = excluded.error, "
+                "revision = jobs.revision + 1, tier = COALESCE(excluded.tier, jobs.tier), "
+                "updated_at = excluded.updated_at",
+                (status.assessment_id, status.status, status.progress, status.message, status.error,
+                 tier, now, now)
+            )
+        self._notify(status.assessment_id)
+
+    def get_status(self, assessment_id: str) -> Optional[AssessmentStatus]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT assessment_id, status, progress, message, error, revision FROM jobs "
+                "WHERE assessment_id = ?",
+                (assessment_id,)
+            ).fetchone()
+        return AssessmentStatus(**dict(row)) if row else None
+
+    def update_status(self, assessment_id: str, **fields):
+        fields = {k: v for k, v in fields.items() if k in STATUS_FIELDS}
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)}, revision = revision + 1 "
+                "WHERE assessment_id = ?",
+                [*fields.values(), assessment_id]
+            )
+        self._notify(assessment_id)
+
+    def complete_job(self, report: AssessmentReport, message: str = "Assessment complete!"):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'completed', progress = 100, message = ?, error = NULL, "
+                "report = ?, revision = revision + 1, updated_at = ? WHERE assessment_id = ?",
+                (message, report.model_dump_json(), datetime.utcnow().isoformat(), report.assessment_id)
+            )
+            row = self._conn.execute(
+                "SELECT revision FROM jobs WHERE assessment_id = ?", (report.assessment_id,)
+            ).fetchone()
+        if row is not None:
+            self._report_cache.put(report.assessment_id, (row["revision"], report))
+        self._notify(report.assessment_id)
+
+    def get_report(self, assessment_id: str) -> Optional[AssessmentReport]:
+        cached = self._report_cache.get(assessment_id)
+        if cached is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT revision FROM jobs WHERE assessment_id = ?", (assessment_id,)
+                ).fetchone()
+            if row is not None and row["revision"] == cached[0]:
+                return cached[1]
+            self._report_cache.pop(assessment_id)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT report, revision FROM jobs WHERE assessment_id = ?", (assessment_id,)
+            ).fetchone()
+        if row is None or row["report"] is None:
+            return None
+
+        report = AssessmentReport.model_validate_json(row["report"])
+        self._report_cache.put(assessment_id, (row["revision"], report))
+        return report
+
+    def list_job_ids(self, status: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT assessment_id FROM jobs WHERE status = ?", (status,)
+            ).fetchall()
+        return [r["assessment_id"] for r in rows]
+
+    def get_revisions(self, assessment_ids: Iterable[str]) -> Dict[str, int]:
+        ids = list(assessment_ids)
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT assessment_id, revision FROM jobs WHERE assessment_id IN ({', '.join('?' * len(ids))})",
+                ids
+            ).fetchall()
+        return {r["assessment_id"]: r["revision"] for r in rows}
+
+    def set_content_result(self, content_key: str, assessment_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO content_results (content_key, assessment_id) VALUES (?, ?)",
+                (content_key, assessment_id)
+            )
+
+    def get_content_result(self, content_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT assessment_id FROM content_results WHERE content_key = ?", (content_key,)
+            ).fetchone()
+        return row["assessment_id"] if row else None
+
+    def set_job_input(self, assessment_id: str, job_input: Dict, owner: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET job_input = ?, owner = ?, updated_at = ? WHERE assessment_id = ?",
+                (json.dumps(job_input), owner, datetime.utcnow().isoformat(), assessment_id)
+            )
+
+    def get_job_input(self, assessment_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_input FROM jobs WHERE assessment_id = ?", (assessment_id,)
+            ).fetchone()
+        return json.loads(row["job_input"]) if row and row["job_input"] else None
+
+    def get_owner(self, assessment_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT owner FROM jobs WHERE assessment_id = ?", (assessment_id,)
+            ).fetchone()
+        return row["owner"] if row else None
+
+    def claim_job(self, assessment_id: str, owner: str, expected_owner: Optional[str]) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET owner = ?, updated_at = ? WHERE assessment_id = ? AND owner IS ?",
+                (owner, datetime.utcnow().isoformat(), assessment_id, expected_owner)
+            )
+        return cursor.rowcount == 1
+
+    def set_cancel_requested(self, assessment_id: str, requested: bool = True):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET cancel_requested = ? WHERE assessment_id = ?", (int(requested), assessment_id)
+            )
+
+    def is_cancel_requested(self, assessment_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE assessment_id = ?", (assessment_id,)
+            ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def create_batch(self, batch_id: str, tier: Optional[str] = None, tenant: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO batches (batch_id, tier, tenant, created_at) VALUES (?, ?, ?, ?)",
+                (batch_id, tier, tenant, datetime.utcnow().isoformat())
+            )
+
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT batch_id, tier, tenant, created_at FROM batches WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def assign_batch(self, assessment_id: str, batch_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET batch_id = ? WHERE assessment_id = ?", (batch_id, assessment_id)
+            )
+
+    def get_batch_statuses(self, batch_id: str) -> List[AssessmentStatus]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT assessment_id, status, progress, message, error, revision FROM jobs "
+                "WHERE batch_id = ? ORDER BY created_at",
+                (batch_id,)
+            ).fetchall()
+        return [AssessmentStatus(**dict(r)) for r in rows]
+
+    def save_checkpoint(self, assessment_id: str, stage: str, data: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_checkpoints (assessment_id, stage, data, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (assessment_id, stage, dump_checkpoint(data), datetime.utcnow().isoformat())
+            )
+
+    def get_checkpoints(self, assessment_id: str) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, data FROM job_checkpoints WHERE assessment_id = ?", (assessment_id,)
+            ).fetchall()
+        return {r["stage"]: json.loads(r["data"]) for r in rows}
+
+    def clear_checkpoints(self, assessment_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM job_checkpoints WHERE assessment_id = ?", (assessment_id,))
+
+    def purge_finished(self, before: str) -> int:
+        finished = (
+            "SELECT assessment_id FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') "
+            "AND updated_at < ?"
+        )
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(f"DELETE FROM job_checkpoints WHERE assessment_id IN ({finished})", (before,))
+                self._conn.execute(f"DELETE FROM content_results WHERE assessment_id IN ({finished})", (before,))
+                cursor = self._conn.execute(
+                    "DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND updated_at < ?",
+                    (before,)
+                )
+                self._conn.execute(
+                    "DELETE FROM batches WHERE created_at < ? "
+                    "AND NOT EXISTS (SELECT 1 FROM jobs WHERE jobs.batch_id = batches.batch_id)",
+                    (before,)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local store (lost on restart; not shared between workers)"""
+
+    def __init__(self):
+        super().__init__()
+        self._statuses: Dict[str, AssessmentStatus] = {}
+        self._updated_at: Dict[str, str] = {}
+        self._reports: Dict[str, AssessmentReport] = {}
+        self._content_results: Dict[str, str] = {}
+        self._inputs: Dict[str, Dict] = {}
+        self._owners: Dict[str, str] = {}
+        self._checkpoints: Dict[str, Dict[str, str]] = {}
+        self._batches: Dict[str, Dict] = {}
+        self._cancel_requested = set()
+        self._batch_jobs: Dict[str, List[str]] = {}
+
+    def create_job(self, status: AssessmentStatus, tier: Optional[str] = None):
+        previous = self._statuses.get(status.assessment_id)
+        self._statuses[status.assessment_id] = status.model_copy(
+            update={"revision": previous.revision + 1 if previous else 1}
+        )
+        self._updated_at[status.assessment_id] = datetime.utcnow().isoformat()
+        self._notify(status.assessment_id)
+
+    def get_status(self, assessment_id: str) -> Optional[AssessmentStatus]:
+        status = self._statuses.get(assessment_id)
+        return status.model_copy() if status else None
+
+    def update_status(self, assessment_id: str, **fields):
+        status = self._statuses.get(assessment_id)
+        if status:
+            self._statuses[assessment_id] = status.model_copy(update={
+                **{k: v for k, v in fields.items() if k in STATUS_FIELDS},
+                "revision": status.revision + 1
+            })
+            self._updated_at[assessment_id] = datetime.utcnow().isoformat()
+            self._notify(assessment_id)
+
+    def complete_job(self, report: AssessmentReport, message: str = "Assessment complete!"):
+        self._reports[report.assessment_id] = report
+        self.update_status(report.assessment_id, status="completed", progress=100, message=message, error=None)
+
+    def get_report(self, assessment_id: str) -> Optional[AssessmentReport]:
+        return self._reports.get(assessment_id)
+
+    def list_job_ids(self, status: str) -> List[str]:
+        return [k for k, v in list(self._statuses.items()) if v.status == status]
+
+    def get_revisions(self, assessment_ids: Iterable[str]) -> Dict[str, int]:
+        return {k: self._statuses[k].revision for k in assessment_ids if k in self._statuses}
+
+    def set_content_result(self, content_key: str, assessment_id: str):
+        self._content_results[content_key] = assessment_id
+
+    def get_content_result(self, content_key: str) -> Optional[str]:
+        return self._content_results.get(content_key)
+
+    def set_job_input(self, assessment_id: str, job_input: Dict, owner: str):
+        self._inputs[assessment_id] = dict(job_input)
+        self._owners[assessment_id] = owner
+
+    def get_job_input(self, assessment_id: str) -> Optional[Dict]:
+        job_input = self._inputs.get(assessment_id)
+        return dict(job_input) if job_input else None
+
+    def get_owner(self, assessment_id: str) -> Optional[str]:
+        return self._owners.get(assessment_id)
+
+    def claim_job(self, assessment_id: str, owner: str, expected_owner: Optional[str]) -> bool:
+        if assessment_id not in self._statuses or self._owners.get(assessment_id) != expected_owner:
+            return False
+        self._owners[assessment_id] = owner
+        return True
+
+    def set_cancel_requested(self, assessment_id: str, requested: bool = True):
+        if requested:
+            self._cancel_requested.add(assessment_id)
+        else:
+            self._cancel_requested.discard(assessment_id)
+
+    def is_cancel_requested(self, assessment_id: str) -> bool:
+        return assessment_id in self._cancel_requested
+
+    def create_batch(self, batch_id: str, tier: Optional[str] = None, tenant: Optional[str] = None):
+        self._batches[batch_id] = {
+            "batch_id": batch_id, "tier": tier, "tenant": tenant, "created_at": datetime.utcnow().isoformat()
+        }
+        self._batch_jobs[batch_id] = []
+
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        batch = self._batches.get(batch_id)
+        return dict(batch) if batch else None
+
+    def assign_batch(self, assessment_id: str, batch_id: str):
+        members = self._batch_jobs.setdefault(batch_id, [])
+        if assessment_id not in members:
+            members.append(assessment_id)
+
+    def get_batch_statuses(self, batch_id: str) -> List[AssessmentStatus]:
+        return [
+            self._statuses[k].model_copy()
+            for k in self._batch_jobs.get(batch_id, []) if k in self._statuses
+        ]
+
+    def save_checkpoint(self, assessment_id: str, stage: str, data: Dict):
+        # Serialised like the SQLite store so both return plain JSON types
+        self._checkpoints.setdefault(assessment_id, {})[stage] = dump_checkpoint(data)
+
+    def get_checkpoints(self, assessment_id: str) -> Dict[str, Dict]:
+        return {stage: json.loads(data) for stage, data in self._checkpoints.get(assessment_id, {}).items()}
+
+    def clear_checkpoints(self, assessment_id: str):
+        self._checkpoints.pop(assessment_id, None)
+
+    def purge_finished(self, before: str) -> int:
+        finished = {
+            k for k, v in list(self._statuses.items())
+            if v.status in ("completed", "failed", "cancelled") and self._updated_at.get(k, "") < before
+        }
+        for assessment_id in finished:
+            for store in (self._statuses, self._updated_at, self._reports, self._inputs,
+                          self._owners, self._checkpoints):
+                store.pop(assessment_id, None)
+            self._cancel_requested.discard(assessment_id)
+        for key in [k for k, v in self._content_results.items() if v in finished]:
+            del self._content_results[key]
+        for batch_id, members in list(self._batch_jobs.items()):
+            members[:] = [k for k in members if k not in finished]
+            batch = self._batches.get(batch_id)
+            if not members and (batch is None or batch["created_at"] < before):
+                del self._batch_jobs[batch_id]
+                self._batches.pop(batch_id, None)
+        return len(finished)
+
+
+def create_job_store() -> JobStore:
+    backend = os.getenv("JOB_STORE", "sqlite").lower()
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore(
+            os.getenv("JOB_STORE_DB", os.path.join(DATA_DIR, "jobs.db")),
+            cache_size=int(os.getenv("JOB_CACHE_SIZE", "256"))
+        )
+    raise ValueError(f"Unknown JOB_STORE backend '{backend}'")
+
+
+# Singleton instance
+job_store = create_job_store()
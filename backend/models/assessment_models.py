@@ -29,17 +29,62 @@ class AssessmentReport(BaseModel):
     buckets: List[BucketScore]
     llm_report: str
     transcript_data: Optional[Dict] = None
+    processing_tier: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class AssessmentStatus(BaseModel):
     assessment_id: str
-    status: str  # 'processing', 'completed', 'failed'
+    status: str  # 'processing', 'completed', 'failed', 'cancelled'
     progress: int  # 0-100
     message: str
     error: Optional[str] = None
+    revision: int = 0  # increases on every status change
+    queue_position: Optional[int] = None  # 1 = next to start; set while waiting for a worker
+
+class ProcessingTier(BaseModel):
+    name: str
+    description: str
+    fps: float  # frames sampled per second for video analysis
+    pose_model_complexity: int  # MediaPipe Pose: 0 (lite), 1 (full), 2 (heavy)
+    analysis_width: int  # frame width used for inference, in pixels
+    audio_sample_rate: int  # Hz, mono analysis audio
+    asr_model: str
+    pitch_time_step: float  # Praat pitch time step in seconds (0 = automatic)
 
 class ProcessingResult(BaseModel):
     audio_features: Dict
     video_features: Dict
     nlp_features: Dict
     transcript: str
+
+class BatchCreateResponse(BaseModel):
+    batch_id: str
+    tier: str
+    tenant: str
+    object_prefix: str  # staged videos for /batch/{batch_id}/objects must be under this key prefix
+
+class BatchObjectsRequest(BaseModel):
+    object_keys: List[str]  # videos already staged in the upload bucket
+
+class BatchSubmitResponse(BaseModel):
+    batch_id: str
+    assessment_ids: List[str]
+    rejected: List[Dict] = []  # {"name", "detail"} for items that were not accepted
+
+class BatchItem(AssessmentStatus):
+    overall_score: Optional[float] = None
+    communication_score: Optional[float] = None
+    appearance_score: Optional[float] = None
+    storytelling_score: Optional[float] = None
+
+class BatchStatus(BaseModel):
+    batch_id: str
+    tier: Optional[str] = None
+    tenant: Optional[str] = None
+    total: int
+    completed: int
+    failed: int
+    cancelled: int = 0
+    processing: int
+    progress: float  # mean progress over all items, 0-100
+    items: List[BatchItem]
@@ -0,0 +1,106 @@
+"""
+Push delivery of assessment progress
+Long-poll, Server-Sent Events and WebSocket clients wait here instead of polling
+/status. Status writes made by this process wake waiters immediately; writes made
+by other workers are picked up by one batched revision query per poll interval,
+however many clients are connected.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+from models.assessment_models import AssessmentStatus
+from job_store import JobStore, job_store
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class ProgressBroker:
+    def __init__(self, store: JobStore, poll_interval: float = 1.0):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._events: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+        self._seen: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task = None
+        store.add_listener(self._on_status_write)
+
+    def _on_status_write(self, assessment_id: str):
+        # Status writes may come from worker threads
+        if self._loop is not None and assessment_id in self._events:
+            self._loop.call_soon_threadsafe(self._wake, assessment_id)
+
+    def _wake(self, assessment_id: str):
+        event = self._events.get(assessment_id)
+        if event is not None:
+            event.set()
+            self._events[assessment_id] = asyncio.Event()
+
+    async def wait_for_change(self, assessment_id: str, since: int, timeout: float) -> Optional[AssessmentStatus]:
+        """The job's status once its revision is past `since`, or the current status after `timeout`
+
+        Returns immediately for unknown jobs (None) and for finished jobs.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self._waiters[assessment_id] = self._waiters.get(assessment_id, 0) + 1
+        try:
+            while True:
+                event = self._events.setdefault(assessment_id, asyncio.Event())
+                status = self.store.get_status(assessment_id)
+                if status is None or status.revision > since or status.status in TERMINAL_STATUSES:
+                    return status
+                self._seen[assessment_id] = max(self._seen.get(assessment_id, 0), status.revision)
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return status
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters[assessment_id] -= 1
+            if self._waiters[assessment_id] == 0:
+                del self._waiters[assessment_id]
+                self._events.pop(assessment_id, None)
+                self._seen.pop(assessment_id, None)
+
+    def poll_once(self):
+        """Wake waiters whose job was updated by another worker"""
+        watched = list(self._waiters)
+        if not watched:
+            return
+        for assessment_id, revision in self.store.get_revisions(watched).items():
+            if revision > self._seen.get(assessment_id, 0):
+                self._seen[assessment_id] = revision
+                self._wake(assessment_id)
+
+    async def run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Progress poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Singleton instance
+progress_broker = ProgressBroker(
+    job_store,
+    poll_interval=float(os.getenv("PROGRESS_POLL_INTERVAL_SECONDS", "1"))
+)
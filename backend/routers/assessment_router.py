@@ -1,75 +1,192 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
 import uuid
 import aiofiles
+import logging
+import socket
 from datetime import datetime
-from typing import Dict
+from functools import partial
+from typing import Dict, Optional, Tuple
 import asyncio
 
 from services.audio_processor import AudioProcessor
-from services.video_processor import VideoProcessor
 from services.nlp_processor import NLPProcessor
-from services.scoring_engine import ScoringEngine
+from services.scoring_engine import ScoringEngine, SCORING_VERSION
 from services.report_generator import ReportGenerator
+from services.media_ingest import MediaIngestor
+from services.processing_tiers import DEFAULT_TIER, get_tier
+from services.content_hash import ContentHasher
+from services.incremental_ingest import GrowingFileSource
+from services.object_store import UPLOAD_KEY_PREFIX, object_store
+from services.admission import AdmissionError, create_admission_controller
+from services.cancellation import CancellationToken, JobCancelled, stage_budget
+from services.stage_runner import stage_runner
+from services.transcript_document import TranscriptDocument
 from models.assessment_models import (
     VideoUploadResponse,
     AssessmentStatus,
-    AssessmentReport
+    AssessmentReport,
+    BucketScore,
+    ProcessingTier
 )
 from supabase_client import supabase_service
+from job_store import job_store
+from session_registry import upload_registry
+from progress_events import progress_broker, TERMINAL_STATUSES
+from work_queue import work_queue, DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/assessment", tags=["assessment"])
 
 # Initialize processors
 audio_processor = AudioProcessor()
-video_processor = VideoProcessor()
 nlp_processor = NLPProcessor()
 scoring_engine = ScoringEngine()
 report_generator = ReportGenerator()
+media_ingestor = MediaIngestor()
 
-# Storage for assessment status (in production, use database)
-assessment_statuses: Dict[str, AssessmentStatus] = {}
-assessment_reports: Dict[str, AssessmentReport] = {}
 
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Disk and memory reservations for in-flight uploads and jobs on this node
+admission_controller = create_admission_controller(UPLOAD_DIR)
+
+# Upper bound for long-poll waits and the SSE/WebSocket keep-alive interval
+MAX_STATUS_WAIT_SECONDS = 30
+KEEPALIVE_SECONDS = 15
+
+# Queue priorities: a user waiting on a single upload goes ahead of bulk batch work
+INTERACTIVE_PRIORITY = 0
+BATCH_PRIORITY = -1
+
+# Cancellation tokens of the jobs running in this process
+running_jobs: Dict[str, CancellationToken] = {}
+# How often a running job looks for a cancel request made through another worker
+CANCEL_POLL_INTERVAL = 1.0
+
+# Recorded on running jobs so a restarted server can tell which ones were orphaned
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+MAX_TENANT_LENGTH = 64
+
+# Replace uploads with a compact analysis proxy as soon as they land
+ANALYSIS_PROXY_ENABLED = os.getenv("ANALYSIS_PROXY_ENABLED", "false").lower() == "true"
+
+def admission_http_error(error: AdmissionError) -> HTTPException:
+    return HTTPException(
+        status_code=error.status_code,
+        detail=error.detail,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 @router.post("/upload", response_model=VideoUploadResponse)
-async def upload_video(file: UploadFile = File(...)):
+async def upload_video(request: Request, file: UploadFile = File(...), tier: str = Form(DEFAULT_TIER),
+                       tenant: Optional[str] = Form(None)):
     """Upload video and start processing - uses chunked upload for large files"""
     
     # Validate file type
     if not file.filename.endswith(('.mp4', '.mov', '.MP4', '.MOV')):
         raise HTTPException(status_code=400, detail="Only MP4 and MOV files are supported")
     
+    # Validate processing tier
+    try:
+        processing_tier = get_tier(tier)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tenant_name = tenant_key(tenant)
+    
     # Generate assessment ID
     assessment_id = str(uuid.uuid4())
     
+    # Refuse up front rather than failing mid-upload or mid-job
+    upload_key = f"upload:{assessment_id}"
+    try:
+        admission_controller.check_memory()
+        admission_controller.reserve_disk(
+            upload_key, int(request.headers.get("content-length") or 1024 * 1024 * 1024)
+        )
+    except AdmissionError as e:
+        raise admission_http_error(e)
+    
     # Save file
     file_extension = os.path.splitext(file.filename)[1]
     video_filename = f"{assessment_id}{file_extension}"
     video_path = os.path.join(UPLOAD_DIR, video_filename)
     
+    try:
+        file_size, content_hash = await save_upload_file(file, video_path)
+    finally:
+        # The bytes are on disk now (or gone), so the reservation is no longer needed
+        admission_controller.release(upload_key)
+    
+    record_video_upload(
+        assessment_id, file, video_path, file_size, processing_tier.name, content_hash, "direct"
+    )
+    
+    # Identical video already assessed: reuse its report instead of reprocessing
+    if reuse_completed_assessment(assessment_id, content_hash, processing_tier.name):
+        os.remove(video_path)
+        return VideoUploadResponse(
+            assessment_id=assessment_id,
+            filename=file.filename,
+            message="Identical video already assessed. Report is ready."
+        )
+    
+    # Initialize status
+    job_store.create_job(AssessmentStatus(
+        assessment_id=assessment_id,
+        status="processing",
+        progress=0,
+        message="Video uploaded, starting analysis..."
+    ), tier=processing_tier.name)
+    
+    # Queue for the embedded or standalone workers
+    submit_upload(assessment_id, video_path, processing_tier.name, content_hash, tenant=tenant_name)
+    
+    return VideoUploadResponse(
+        assessment_id=assessment_id,
+        filename=file.filename,
+        message="Video uploaded successfully. Processing started."
+    )
+
+def tenant_key(tenant: Optional[str]) -> str:
+    """Validate the tenant an upload is scheduled under (fair share is per tenant)"""
+    tenant = (tenant or "").strip()
+    if not tenant:
+        return DEFAULT_TENANT
+    if len(tenant) > MAX_TENANT_LENGTH:
+        raise HTTPException(status_code=400, detail=f"tenant must be at most {MAX_TENANT_LENGTH} characters")
+    return tenant
+
+async def save_upload_file(file: UploadFile, video_path: str) -> Tuple[int, str]:
+    """Stream an uploaded file to disk; returns its size and content hash"""
     try:
         # Use chunked upload to handle large files without loading into memory
         chunk_size = 1024 * 1024  # 1MB chunks
         file_size = 0
+        hasher = ContentHasher()
         async with aiofiles.open(video_path, 'wb') as out_file:
             while chunk := await file.read(chunk_size):
+                hasher.update(chunk)
                 await out_file.write(chunk)
                 file_size += len(chunk)
+        return file_size, hasher.hexdigest()
     except Exception as e:
         # Clean up partial file on error
         if os.path.exists(video_path):
             os.remove(video_path)
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
-    
-    # Save video metadata to Supabase (non-blocking, best effort)
+
+def record_video_upload(assessment_id: str, file: UploadFile, video_path: str, file_size: int,
+                        tier_name: str, content_hash: str, upload_method: str):
+    """Save video metadata to Supabase (non-blocking, best effort)"""
     try:
         video_data = {
             'id': assessment_id,
-            'filename': video_filename,
+            'filename': os.path.basename(video_path),
             'original_filename': file.filename,
             'file_size': file_size,
             'content_type': file.content_type or 'video/mp4',
@@ -77,8 +194,10 @@ async def upload_video(file: UploadFile = File(...)):
             'storage_type': 'local',
             'status': 'uploaded',
             'metadata': {
-                'upload_method': 'direct',
-                'client_filename': file.filename
+                'upload_method': upload_method,
+                'client_filename': file.filename,
+                'processing_tier': tier_name,
+                'content_hash': content_hash
             }
         }
         # Supabase client is synchronous, use asyncio.to_thread for non-blocking
@@ -99,71 +218,289 @@ async def upload_video(file: UploadFile = File(...)):
     except Exception as e:
         print(f"Warning: Failed to save to Supabase: {e}")
         # Continue even if Supabase fails - don't block the upload
+
+def content_key(content_hash: str, tier_name: str) -> str:
+    return f"{content_hash}:{tier_name}:{SCORING_VERSION}"
+
+def reuse_completed_assessment(assessment_id: str, content_hash: Optional[str], tier_name: str) -> bool:
+    """Point `assessment_id` at an existing report for identical content, if there is one"""
+    if not content_hash:
+        return False
     
-    # Initialize status
-    assessment_statuses[assessment_id] = AssessmentStatus(
+    source_id = job_store.get_content_result(content_key(content_hash, tier_name))
+    source_report = job_store.get_report(source_id) if source_id else None
+    if source_report is None:
+        return False
+    
+    job_store.create_job(AssessmentStatus(
         assessment_id=assessment_id,
         status="processing",
-        progress=0,
-        message="Video uploaded, starting analysis..."
+        progress=100,
+        message="Reusing results for an identical video..."
+    ), tier=tier_name)
+    job_store.complete_job(
+        source_report.model_copy(update={"assessment_id": assessment_id}),
+        message="Assessment complete! (reused results for an identical video)"
     )
+    return True
+
+async def ingest_upload(assessment_id: str, video_path: str, tier: ProcessingTier,
+                        timeout: Optional[float] = None) -> str:
+    """Transcode the upload to an analysis proxy and delete the original (if enabled)"""
+    if not ANALYSIS_PROXY_ENABLED:
+        return video_path
     
-    # Start processing in background
-    asyncio.create_task(process_video_async(assessment_id, video_path))
+    job_store.update_status(assessment_id, message="Preparing video for analysis...")
     
-    return VideoUploadResponse(
-        assessment_id=assessment_id,
-        filename=file.filename,
-        message="Video uploaded successfully. Processing started."
-    )
+    try:
+        proxy_path = await asyncio.to_thread(
+            media_ingestor.create_analysis_proxy,
+            video_path,
+            analysis_width=tier.analysis_width,
+            sample_rate=tier.audio_sample_rate,
+            timeout=timeout
+        )
+    except Exception as e:
+        print(f"Warning: analysis proxy failed, using original upload: {e}")
+        return video_path
+    
+    os.remove(video_path)
+    return proxy_path
+
+def delete_uploaded_object(object_key: str):
+    try:
+        object_store.delete_object(object_key)
+    except Exception as e:
+        print(f"Warning: Failed to delete uploaded object {object_key}: {e}")
+
+def load_scores(data: Dict) -> Dict:
+    """Rebuild a scoring checkpoint into the shape generate_scores returns"""
+    return {**data, "buckets": [BucketScore(**bucket) for bucket in data["buckets"]]}
 
-async def process_video_async(assessment_id: str, video_path: str):
-    """Background task to process video"""
+async def process_video_async(assessment_id: str, video_path: str, tier_name: str = DEFAULT_TIER,
+                              content_hash: Optional[str] = None,
+                              source: Optional[GrowingFileSource] = None,
+                              object_key: Optional[str] = None,
+                              upload_id: Optional[str] = None,
+                              tenant: str = DEFAULT_TENANT):
+    """Background task to process video
+    
+    With `source`, the upload at `video_path` is still arriving and is demuxed
+    incrementally from its received prefix. With `object_key`, `video_path` is a
+    presigned URL for an object-store upload that ffmpeg reads with range requests.
+    
+    Each stage checkpoints its output to the job store and stages that already have
+    a checkpoint are skipped, so a retry or a restarted server resumes where the last
+    run stopped. The upload is kept until the job completes.
+    
+    Every stage runs against a deadline scaled by the media duration, and the job
+    can be cancelled; both stop it cooperatively between frames or analysis steps.
+    """
+    demux = None
+    audio_path = None
+    media_seconds = None
+    # Side files (analysis audio) of remote inputs are written locally
+    output_base = os.path.join(UPLOAD_DIR, assessment_id) if object_key else None
+    
+    # Recorded before anything can fail so the job can be retried or resumed
+    job_store.set_job_input(assessment_id, {
+        "video_path": video_path,
+        "tier": tier_name,
+        "content_hash": content_hash,
+        "object_key": object_key,
+        "upload_id": upload_id,
+        "tenant": tenant
+    }, owner=WORKER_ID)
+    checkpoints = job_store.get_checkpoints(assessment_id)
+    
+    def checkpoint(stage: str, data: Dict):
+        # Output of a stage that was interrupted is never kept
+        token.check()
+        job_store.save_checkpoint(assessment_id, stage, data)
+        checkpoints[stage] = data
+    
+    def start_stage(stage: str):
+        token.check()
+        token.start_stage(stage, stage_budget(stage, media_seconds))
+    
+    token = CancellationToken()
+    running_jobs[assessment_id] = token
+    if source is not None:
+        token.on_cancel(source.cancel)
+    watcher = asyncio.create_task(watch_job(assessment_id, token))
     try:
+        tier = get_tier(tier_name)
+        
+        # Wait for capacity instead of starting a job the node cannot hold
+        await admission_controller.acquire_job(
+            assessment_id,
+            on_wait=lambda: job_store.update_status(assessment_id, message="Waiting for server capacity..."),
+            check=token.check
+        )
+        
+        # Stage deadlines scale with the media; the transcript stage refines this
+        if "transcription" in checkpoints:
+            media_seconds = checkpoints["transcription"]["duration"]
+        elif source is None:
+            media_seconds = await probe_duration(video_path)
+        
+        # Later stages read the smaller proxy when proxying is enabled
+        if "ingest" in checkpoints:
+            video_path = checkpoints["ingest"]["video_path"]
+        elif source is None and object_key is None:
+            start_stage("ingest")
+            video_path = await ingest_upload(assessment_id, video_path, tier, timeout=token.remaining())
+            checkpoint("ingest", {"video_path": video_path})
+        
+        # Analysis audio survives a failed run; it is only reused once fully written
+        if "audio_extraction" in checkpoints and os.path.exists(checkpoints["audio_extraction"]["audio_path"]):
+            audio_path = checkpoints["audio_extraction"]["audio_path"]
+        needs_audio = audio_path is None and "acoustic_features" not in checkpoints
+        
+        if "video_landmarks" in checkpoints:
+            video_features = checkpoints["video_landmarks"]
+        else:
+            # Update status: Video processing
+            job_store.update_status(
+                assessment_id, progress=10, message="Analyzing video (pose, expressions, gestures)..."
+            )
+            start_stage("video_landmarks")
+            
+            # One ffmpeg pass feeds frames to the video analyzers and writes the analysis audio
+            if needs_audio:
+                try:
+                    demux = await asyncio.to_thread(
+                        media_ingestor.open,
+                        video_path,
+                        fps=tier.fps,
+                        analysis_width=tier.analysis_width,
+                        sample_rate=tier.audio_sample_rate,
+                        input_source=source,
+                        output_base=output_base
+                    )
+                    # Killing ffmpeg unblocks a frame read that is waiting on input
+                    token.on_cancel(demux.close)
+                except Exception as e:
+                    if object_key:
+                        raise Exception(f"Failed to open uploaded object: {e}")
+                    print(f"Warning: single-pass demux unavailable, decoding separately: {e}")
+            
+            if demux is None and source is not None:
+                # Separate decoding needs the whole file
+                job_store.update_status(assessment_id, message="Waiting for upload to finish...")
+                await asyncio.to_thread(source.wait_complete)
+            
+            # MediaPipe/OpenCV run in a crash-isolated stage process
+            if demux:
+                video_features = await asyncio.to_thread(
+                    stage_runner.run, "video_landmarks", video_path, tier.name, frames=demux.frames(), token=token
+                )
+                audio_path = await asyncio.to_thread(demux.wait)
+                checkpoint("audio_extraction", {"audio_path": audio_path})
+            else:
+                video_features = await asyncio.to_thread(
+                    stage_runner.run, "video_landmarks", video_path, tier.name, token=token
+                )
+            checkpoint("video_landmarks", video_features)
+        
+        if audio_path is None and "acoustic_features" not in checkpoints:
+            start_stage("audio_extraction")
+            if source is not None:
+                await asyncio.to_thread(source.wait_complete)
+            audio_path = await asyncio.to_thread(
+                stage_runner.run,
+                "audio_extraction",
+                video_path,
+                tier.audio_sample_rate,
+                f"{output_base}.wav" if output_base else None,
+                token=token
+            )
+            checkpoint("audio_extraction", {"audio_path": audio_path})
+        
         # Update status: Audio processing
-        assessment_statuses[assessment_id].progress = 10
-        assessment_statuses[assessment_id].message = "Extracting and analyzing audio..."
+        job_store.update_status(assessment_id, progress=40, message="Transcribing and analyzing audio...")
         
-        audio_features = await audio_processor.process_audio(video_path)
+        # Storytelling analysis follows the transcript segment by segment on its own
+        # thread while later windows of the recording are still being transcribed
+        nlp_stream = None
+        if "nlp" not in checkpoints:
+            nlp_stream = nlp_processor.start_incremental()
+            token.on_cancel(nlp_stream.close)
         
-        # Update status: Video processing
-        assessment_statuses[assessment_id].progress = 40
-        assessment_statuses[assessment_id].message = "Analyzing video (pose, expressions, gestures)..."
+        if "transcription" not in checkpoints:
+            media_seconds = await asyncio.to_thread(audio_processor.measure_duration, audio_path)
+            start_stage("transcription")
+            transcript_data = await audio_processor.transcribe_audio(
+                audio_path, tier.asr_model, timeout=token.remaining(),
+                on_segment=nlp_stream.add_segment if nlp_stream else None
+            )
+            checkpoint("transcription", {"duration": media_seconds, **transcript_data})
+        elif nlp_stream:
+            for text in audio_processor.segment_texts(checkpoints["transcription"]):
+                nlp_stream.add_segment(text)
+        transcription = checkpoints["transcription"]
         
-        video_features = video_processor.process_video(video_path)
+        if "acoustic_features" in checkpoints:
+            acoustic_features = checkpoints["acoustic_features"]
+        else:
+            start_stage("acoustic_features")
+            acoustic_features = await asyncio.to_thread(
+                stage_runner.run, "acoustic_features", audio_path, transcription, transcription["duration"], tier.name,
+                token=token
+            )
+            checkpoint("acoustic_features", acoustic_features)
+            os.remove(audio_path)
         
         # Update status: NLP processing
-        assessment_statuses[assessment_id].progress = 70
-        assessment_statuses[assessment_id].message = "Analyzing storytelling and narrative..."
+        job_store.update_status(assessment_id, progress=70, message="Analyzing storytelling and narrative...")
         
-        nlp_features = nlp_processor.process_nlp(
-            audio_features["transcript"],
-            audio_features["duration"]
-        )
+        if "nlp" in checkpoints:
+            nlp_features = checkpoints["nlp"]
+            document = TranscriptDocument(transcription["transcript"])
+        else:
+            start_stage("nlp")
+            # Only the last sentence is left to analyse at this point
+            nlp_features = await asyncio.to_thread(nlp_stream.finish, round(transcription["duration"], 1))
+            document = TranscriptDocument(transcription["transcript"], sentences=nlp_stream.sentences)
+            checkpoint("nlp", nlp_features)
+        
+        # The speech analyzers reuse the sentences found by the storytelling analysis
+        audio_features = {
+            **acoustic_features,
+            **audio_processor.analyze_transcript(document, transcription["duration"])
+        }
         
         # Update status: Scoring
-        assessment_statuses[assessment_id].progress = 85
-        assessment_statuses[assessment_id].message = "Calculating scores..."
+        job_store.update_status(assessment_id, progress=85, message="Calculating scores...")
         
-        scores = scoring_engine.generate_scores(audio_features, video_features, nlp_features)
+        if "scoring" in checkpoints:
+            scores = load_scores(checkpoints["scoring"])
+        else:
+            start_stage("scoring")
+            scores = scoring_engine.generate_scores(audio_features, video_features, nlp_features)
+            checkpoint("scoring", scores)
         
         # Update status: Report generation
-        assessment_statuses[assessment_id].progress = 95
-        assessment_statuses[assessment_id].message = "Generating coaching report..."
+        job_store.update_status(assessment_id, progress=95, message="Generating coaching report...")
         
-        llm_report = await report_generator.generate_report(
-            scores, audio_features, video_features, nlp_features
-        )
+        if "report" in checkpoints:
+            llm_report = checkpoints["report"]["llm_report"]
+        else:
+            start_stage("report")
+            llm_report = await report_generator.generate_report(
+                scores, audio_features, video_features, nlp_features, timeout=token.remaining()
+            )
+            checkpoint("report", {"llm_report": llm_report})
         
         # Prepare transcript data for frontend
         transcript_data = {
             "transcript": audio_features["transcript"],
             "duration": audio_features["duration"],
             "audio_format": "WAV",
-            "sample_rate": "16000 Hz",
-            "model": "whisper-1",
+            "sample_rate": f"{tier.audio_sample_rate} Hz",
+            "model": tier.asr_model,
             "language": "en",
-            "word_count": len(audio_features["transcript"].split()),
+            "word_count": document.word_count,
             "speaking_rate_wpm": audio_features["speaking_rate"]["wpm"]
         }
         
@@ -176,53 +513,395 @@ async def process_video_async(assessment_id: str, video_path: str):
             storytelling_score=scores["storytelling_score"],
             buckets=scores["buckets"],
             llm_report=llm_report,
-            transcript_data=transcript_data
+            transcript_data=transcript_data,
+            processing_tier=tier.name
         )
         
-        # Store report
-        assessment_reports[assessment_id] = report
+        # Store report and mark the job complete
+        job_store.complete_job(report)
+        job_store.clear_checkpoints(assessment_id)
+        if source is not None:
+            content_hash = source.content_hash
+        if content_hash:
+            job_store.set_content_result(content_key(content_hash, tier.name), assessment_id)
         
-        # Update status: Complete
-        assessment_statuses[assessment_id].status = "completed"
-        assessment_statuses[assessment_id].progress = 100
-        assessment_statuses[assessment_id].message = "Assessment complete!"
-        
-        # Delete video file
-        if os.path.exists(video_path):
+        # Delete video file (an upload that never fully arrived is left to /complete)
+        if os.path.exists(video_path) and (source is None or source.completed):
             os.remove(video_path)
+        # Staged batch objects belong to the caller and are kept
+        if object_key and object_key.startswith(UPLOAD_KEY_PREFIX):
+            delete_uploaded_object(object_key)
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
         
     except Exception as e:
-        assessment_statuses[assessment_id].status = "failed"
-        assessment_statuses[assessment_id].message = "Processing failed"
-        assessment_statuses[assessment_id].error = str(e)
+        # The upload and completed checkpoints are kept for /retry; the sweeper
+        # reclaims the files if the job is never retried
+        if isinstance(e, JobCancelled):
+            job_store.update_status(assessment_id, status="cancelled", message="Assessment cancelled", error=None)
+        else:
+            job_store.update_status(assessment_id, status="failed", message="Processing failed", error=str(e))
         
-        # Clean up on error
-        if os.path.exists(video_path):
-            os.remove(video_path)
+        # A partially written analysis track is useless without its checkpoint
+        if demux and demux.audio_path and "audio_extraction" not in checkpoints and os.path.exists(demux.audio_path):
+            os.remove(demux.audio_path)
+    
+    finally:
+        # Stops worker threads still running for this job (e.g. after the task was cancelled)
+        token.cancel()
+        watcher.cancel()
+        running_jobs.pop(assessment_id, None)
+        admission_controller.release(assessment_id)
+        if demux:
+            demux.close()
+
+async def probe_duration(video_path: str) -> Optional[float]:
+    """Media duration from the container header, if ffprobe can read it"""
+    try:
+        info = await asyncio.to_thread(media_ingestor.probe, video_path)
+    except Exception:
+        return None
+    return info["duration"] or None
+
+async def watch_job(assessment_id: str, token: CancellationToken):
+    """Fire a running job's token on a cancel request (from any worker) or an overdue stage"""
+    while not token.fired:
+        if await asyncio.to_thread(job_store.is_cancel_requested, assessment_id):
+            token.cancel()
+            return
+        await asyncio.sleep(CANCEL_POLL_INTERVAL)
+        token.expire_if_overdue()
+
+def submit_job(assessment_id: str, video_path: str, tier_name: str = DEFAULT_TIER,
+               content_hash: Optional[str] = None, object_key: Optional[str] = None,
+               upload_id: Optional[str] = None, priority: int = INTERACTIVE_PRIORITY,
+               tenant: str = DEFAULT_TENANT):
+    """Put an assessment on the work queue"""
+    work_queue.enqueue(assessment_id, {
+        "video_path": video_path,
+        "tier": tier_name,
+        "content_hash": content_hash,
+        "object_key": object_key,
+        "upload_id": upload_id,
+        "tenant": tenant
+    }, priority=priority, tenant=tenant)
+
+def submit_upload(assessment_id: str, video_path: str, tier_name: str = DEFAULT_TIER,
+                  content_hash: Optional[str] = None, upload_id: Optional[str] = None,
+                  priority: int = INTERACTIVE_PRIORITY, tenant: str = DEFAULT_TENANT):
+    """Queue a job for an upload saved under UPLOAD_DIR
+    
+    With ANALYSIS_PROXY_ENABLED the original is replaced by its analysis proxy
+    first, so it does not sit on disk while the job waits for a worker.
+    """
+    if not ANALYSIS_PROXY_ENABLED:
+        submit_job(assessment_id, video_path, tier_name, content_hash,
+                   upload_id=upload_id, priority=priority, tenant=tenant)
+        return
+    
+    # Recorded first so a restart during the transcode re-queues the job
+    job_store.set_job_input(assessment_id, {
+        "video_path": video_path,
+        "tier": tier_name,
+        "content_hash": content_hash,
+        "object_key": None,
+        "upload_id": upload_id,
+        "tenant": tenant
+    }, owner=WORKER_ID)
+    asyncio.create_task(proxy_and_submit(
+        assessment_id, video_path, tier_name, content_hash, upload_id, priority, tenant
+    ))
+
+async def proxy_and_submit(assessment_id: str, video_path: str, tier_name: str, content_hash: Optional[str],
+                           upload_id: Optional[str], priority: int, tenant: str):
+    """Transcode an upload to its analysis proxy, then put the job on the work queue"""
+    proxy_key = f"proxy:{assessment_id}"
+    try:
+        # The proxy is never larger than the original it replaces
+        admission_controller.reserve_disk(proxy_key, os.path.getsize(video_path))
+        ingested_path = await ingest_upload(
+            assessment_id, video_path, get_tier(tier_name), timeout=stage_budget("ingest")
+        )
+        # The worker skips its ingest stage; a failed transcode analyses the original
+        job_store.save_checkpoint(assessment_id, "ingest", {"video_path": ingested_path})
+    except AdmissionError as e:
+        print(f"Warning: no disk headroom to proxy {assessment_id} before queueing: {e.detail}")
+    except Exception as e:
+        print(f"Warning: proxying {assessment_id} before queueing failed: {e}")
+    finally:
+        admission_controller.release(proxy_key)
+    
+    if job_store.is_cancel_requested(assessment_id):
+        job_store.update_status(assessment_id, status="cancelled", message="Assessment cancelled", error=None)
+        return
+    job_store.update_status(assessment_id, message="Video uploaded, starting analysis...")
+    submit_job(assessment_id, video_path, tier_name, content_hash,
+               upload_id=upload_id, priority=priority, tenant=tenant)
+
+def growing_upload_source(upload_id: str) -> Optional[GrowingFileSource]:
+    """Source for an incrementally ingested upload that is still arriving (None once it is in)
+    
+    The received prefix is read from the session registry, so the job can run on
+    any worker that shares the upload directory.
+    """
+    session = upload_registry.get_session(upload_id)
+    if session is None or session["status"] == "completed":
+        return None
+    return GrowingFileSource(
+        session["target_path"],
+        session["file_size"],
+        partial(upload_registry.contiguous_bytes, upload_id)
+    )
+
+async def run_queued_job(assessment_id: str, payload: Dict):
+    """Run a job claimed from the work queue"""
+    video_path = payload["video_path"]
+    source = None
+    if payload.get("object_key"):
+        # A read URL presigned at submission may have expired while queued
+        video_path = await asyncio.to_thread(object_store.presign_read_url, payload["object_key"])
+    elif payload.get("upload_id"):
+        source = await asyncio.to_thread(growing_upload_source, payload["upload_id"])
+    await process_video_async(
+        assessment_id,
+        video_path,
+        payload["tier"],
+        payload.get("content_hash"),
+        source=source,
+        object_key=payload.get("object_key"),
+        upload_id=payload.get("upload_id"),
+        tenant=payload.get("tenant") or DEFAULT_TENANT
+    )
+
+def job_input_args(job_input: Dict) -> Dict:
+    return {
+        "video_path": job_input["video_path"],
+        "tier_name": job_input["tier"],
+        "content_hash": job_input.get("content_hash"),
+        "object_key": job_input.get("object_key"),
+        "upload_id": job_input.get("upload_id"),
+        "tenant": job_input.get("tenant") or DEFAULT_TENANT
+    }
+
+def upload_finished(job_input: Dict) -> bool:
+    """False while an incrementally ingested upload is still arriving"""
+    if not job_input.get("upload_id"):
+        return True
+    session = upload_registry.get_session(job_input["upload_id"])
+    return session is not None and session["status"] == "completed"
+
+@router.post("/retry/{assessment_id}", response_model=AssessmentStatus)
+async def retry_assessment(assessment_id: str):
+    """Re-run a failed or cancelled assessment from its last completed stage"""
+    status = job_store.get_status(assessment_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    if status.status not in ("failed", "cancelled"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Assessment is {status.status}, only failed or cancelled assessments can be retried"
+        )
+    
+    job_input = job_store.get_job_input(assessment_id)
+    if job_input is None:
+        raise HTTPException(status_code=409, detail="Assessment has no recorded input to retry from")
+    if not upload_finished(job_input):
+        raise HTTPException(status_code=409, detail="Upload has not finished yet")
+    # An analysis proxy replaces the original upload
+    video_path = job_store.get_checkpoints(assessment_id).get("ingest", job_input)["video_path"]
+    if not job_input.get("object_key") and not os.path.exists(video_path):
+        raise HTTPException(status_code=410, detail="The uploaded video is no longer available")
+    
+    try:
+        admission_controller.check_memory()
+    except AdmissionError as e:
+        raise admission_http_error(e)
+    
+    job_store.set_cancel_requested(assessment_id, False)
+    job_store.update_status(
+        assessment_id, status="processing", message="Retrying from the last completed stage...", error=None
+    )
+    submit_job(assessment_id, **job_input_args(job_input))
+    logger.info(f"Retrying assessment {assessment_id}")
+    
+    return job_store.get_status(assessment_id)
+
+@router.post("/cancel/{assessment_id}", response_model=AssessmentStatus)
+async def cancel_assessment(assessment_id: str):
+    """Cancel a queued or running assessment
+    
+    A queued job is withdrawn at once. A running job stops at its next frame or
+    analysis step, on whichever worker runs it, and releases its slot; completed
+    stages are kept, so /retry resumes it later.
+    """
+    status = job_store.get_status(assessment_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    if status.status != "processing":
+        raise HTTPException(status_code=409, detail=f"Assessment is {status.status}, it cannot be cancelled")
+    
+    # The flag reaches the job wherever it runs; the queue only knows unclaimed jobs
+    job_store.set_cancel_requested(assessment_id)
+    if work_queue.cancel(assessment_id):
+        job_store.update_status(assessment_id, status="cancelled", message="Assessment cancelled", error=None)
+    elif assessment_id in running_jobs:
+        running_jobs[assessment_id].cancel()
+    else:
+        job_store.update_status(assessment_id, message="Cancelling...")
+    logger.info(f"Cancellation requested for assessment {assessment_id}")
+    
+    return job_store.get_status(assessment_id)
+
+def owner_is_alive(owner: Optional[str]) -> bool:
+    """Whether the worker process that owns a job is still running (assumed for other hosts)"""
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+def resume_interrupted_jobs() -> int:
+    """Re-queue jobs whose process died before they reached the work queue (while
+    their upload was being proxied); queued jobs are re-delivered by their lease.
+    Returns how many.
+    """
+    resumed = 0
+    for assessment_id in job_store.list_job_ids("processing"):
+        if work_queue.is_pending(assessment_id):
+            continue
+        owner = job_store.get_owner(assessment_id)
+        job_input = job_store.get_job_input(assessment_id)
+        if owner == WORKER_ID or owner_is_alive(owner) or job_input is None:
+            continue
+        # Several workers start together; only one may take over each job
+        if not job_store.claim_job(assessment_id, WORKER_ID, owner):
+            continue
+        
+        if not upload_finished(job_input):
+            # /complete reprocesses a failed incremental job once the upload is in
+            job_store.update_status(
+                assessment_id, status="failed", message="Processing failed",
+                error="Interrupted by a server restart while the upload was arriving"
+            )
+            continue
+        
+        job_store.update_status(assessment_id, message="Resuming after a server restart...")
+        submit_job(assessment_id, **job_input_args(job_input))
+        resumed += 1
+    
+    if resumed:
+        logger.info(f"Resumed {resumed} interrupted assessments")
+    return resumed
 
 @router.get("/status/{assessment_id}", response_model=AssessmentStatus)
-async def get_status(assessment_id: str):
-    """Get processing status"""
-    if assessment_id not in assessment_statuses:
+async def get_status(assessment_id: str, wait: float = 0, since: int = -1):
+    """Get processing status
+    
+    Long-poll with `wait` (seconds, capped at 30): the response is held until the
+    status revision is past `since` or the job finishes. `queue_position` is set
+    while the job waits for a worker.
+    """
+    if wait > 0:
+        status = await progress_broker.wait_for_change(
+            assessment_id, since, min(wait, MAX_STATUS_WAIT_SECONDS)
+        )
+    else:
+        status = job_store.get_status(assessment_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    
+    return with_queue_position(status)
+
+def with_queue_position(status: AssessmentStatus) -> AssessmentStatus:
+    """The status with the job's current place in the work queue"""
+    if status.status != "processing":
+        return status
+    return status.model_copy(update={"queue_position": work_queue.position(status.assessment_id)})
+
+@router.get("/events/{assessment_id}")
+async def stream_status(request: Request, assessment_id: str, last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events stream of status changes, ending once the job finishes"""
+    if job_store.get_status(assessment_id) is None:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
-    return assessment_statuses[assessment_id]
+    # EventSource resends the last revision it saw when it reconnects
+    since = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+    
+    async def events():
+        revision = since
+        position = None
+        while not await request.is_disconnected():
+            status = await progress_broker.wait_for_change(assessment_id, revision, KEEPALIVE_SECONDS)
+            if status is None:
+                return
+            status = with_queue_position(status)
+            # A queued job's position changes without a new revision
+            if status.revision > revision or status.queue_position != position:
+                revision = status.revision
+                position = status.queue_position
+                yield f"id: {revision}\nevent: status\ndata: {status.model_dump_json()}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if status.status in TERMINAL_STATUSES:
+                return
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws/{assessment_id}")
+async def status_websocket(websocket: WebSocket, assessment_id: str):
+    """WebSocket stream of status changes, closed once the job finishes"""
+    await websocket.accept()
+    revision = -1
+    position = None
+    try:
+        while True:
+            status = await progress_broker.wait_for_change(assessment_id, revision, KEEPALIVE_SECONDS)
+            if status is None:
+                await websocket.close(code=4404, reason="Assessment not found")
+                return
+            status = with_queue_position(status)
+            if status.revision > revision or status.queue_position != position:
+                revision = status.revision
+                position = status.queue_position
+                await websocket.send_json(status.model_dump())
+            else:
+                await websocket.send_json({"type": "keep-alive"})
+            if status.status in TERMINAL_STATUSES:
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
 
 @router.get("/report/{assessment_id}", response_model=AssessmentReport)
 async def get_report(assessment_id: str):
     """Get assessment report"""
-    if assessment_id not in assessment_reports:
+    report = job_store.get_report(assessment_id)
+    if report is None:
         # Check if still processing
-        if assessment_id in assessment_statuses:
-            status = assessment_statuses[assessment_id]
+        status = job_store.get_status(assessment_id)
+        if status is not None:
             if status.status == "processing":
                 raise HTTPException(status_code=202, detail="Assessment still processing")
             elif status.status == "failed":
                 raise HTTPException(status_code=500, detail=f"Assessment failed: {status.error}")
+            elif status.status == "cancelled":
+                raise HTTPException(status_code=409, detail="Assessment was cancelled")
         
         raise HTTPException(status_code=404, detail="Report not found")
     
-    return assessment_reports[assessment_id]
+    return report
 
 @router.get("/health")
 async def health_check():
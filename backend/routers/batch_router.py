@@ -0,0 +1,206 @@
+"""
+Batch assessment submission
+A cohort of recordings is submitted under one batch ID, by direct upload, by
+reference to videos staged in the upload bucket under the batch's key prefix, or by
+completing chunked uploads with `batch_id`. Batch jobs queue behind interactive uploads, and one
+status call returns every item with aggregate progress.
+"""
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+import os
+import uuid
+import asyncio
+import logging
+from typing import List, Optional
+
+from routers.assessment_router import (
+    UPLOAD_DIR,
+    BATCH_PRIORITY,
+    admission_controller,
+    admission_http_error,
+    save_upload_file,
+    record_video_upload,
+    reuse_completed_assessment,
+    submit_job,
+    submit_upload,
+    tenant_key
+)
+from services.processing_tiers import DEFAULT_TIER, get_tier
+from services.object_store import batch_key_prefix, object_store
+from services.admission import AdmissionError
+from models.assessment_models import (
+    AssessmentStatus,
+    BatchCreateResponse,
+    BatchObjectsRequest,
+    BatchSubmitResponse,
+    BatchItem,
+    BatchStatus
+)
+from job_store import job_store
+from work_queue import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.MP4', '.MOV')
+
+def get_batch_or_404(batch_id: str) -> dict:
+    batch = job_store.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+def queue_batch_job(batch: dict, assessment_id: str, video_path: str, **job_args):
+    tier_name = batch["tier"] or DEFAULT_TIER
+    job_store.create_job(AssessmentStatus(
+        assessment_id=assessment_id,
+        status="processing",
+        progress=0,
+        message="Queued with batch..."
+    ), tier=tier_name)
+    job_store.assign_batch(assessment_id, batch["batch_id"])
+    # Local uploads may be proxied before they queue; staged objects are read in place
+    submit = submit_job if job_args.get("object_key") else submit_upload
+    submit(
+        assessment_id, video_path, tier_name, priority=BATCH_PRIORITY,
+        tenant=batch["tenant"] or DEFAULT_TENANT, **job_args
+    )
+
+@router.post("", response_model=BatchCreateResponse)
+async def create_batch(tier: str = Form(DEFAULT_TIER), tenant: Optional[str] = Form(None)):
+    """Open a batch; every assessment added to it uses the batch's processing tier and tenant"""
+    try:
+        processing_tier = get_tier(tier)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tenant_name = tenant_key(tenant)
+
+    batch_id = str(uuid.uuid4())
+    job_store.create_batch(batch_id, processing_tier.name, tenant_name)
+    return BatchCreateResponse(
+        batch_id=batch_id, tier=processing_tier.name, tenant=tenant_name, object_prefix=batch_key_prefix(batch_id)
+    )
+
+@router.post("/{batch_id}/upload", response_model=BatchSubmitResponse)
+async def upload_batch(request: Request, batch_id: str, files: List[UploadFile] = File(...)):
+    """Upload several videos into a batch in one request (may be repeated for large cohorts)"""
+    batch = get_batch_or_404(batch_id)
+    tier_name = batch["tier"] or DEFAULT_TIER
+
+    # One reservation covers the whole request body
+    upload_key = f"upload:batch:{uuid.uuid4()}"
+    try:
+        admission_controller.check_memory()
+        admission_controller.reserve_disk(
+            upload_key, int(request.headers.get("content-length") or 1024 * 1024 * 1024)
+        )
+    except AdmissionError as e:
+        raise admission_http_error(e)
+
+    assessment_ids = []
+    rejected = []
+    try:
+        for file in files:
+            if not file.filename.endswith(VIDEO_EXTENSIONS):
+                rejected.append({"name": file.filename, "detail": "Only MP4 and MOV files are supported"})
+                continue
+
+            assessment_id = str(uuid.uuid4())
+            video_path = os.path.join(UPLOAD_DIR, f"{assessment_id}{os.path.splitext(file.filename)[1]}")
+            try:
+                file_size, content_hash = await save_upload_file(file, video_path)
+            except HTTPException as e:
+                rejected.append({"name": file.filename, "detail": e.detail})
+                continue
+
+            record_video_upload(assessment_id, file, video_path, file_size, tier_name, content_hash, "batch")
+            assessment_ids.append(assessment_id)
+
+            if reuse_completed_assessment(assessment_id, content_hash, tier_name):
+                job_store.assign_batch(assessment_id, batch_id)
+                os.remove(video_path)
+                continue
+            queue_batch_job(batch, assessment_id, video_path, content_hash=content_hash)
+    finally:
+        admission_controller.release(upload_key)
+
+    logger.info(f"Batch {batch_id}: accepted {len(assessment_ids)} uploads, rejected {len(rejected)}")
+    return BatchSubmitResponse(batch_id=batch_id, assessment_ids=assessment_ids, rejected=rejected)
+
+@router.post("/{batch_id}/objects", response_model=BatchSubmitResponse)
+async def submit_batch_objects(batch_id: str, request: BatchObjectsRequest):
+    """Add videos staged in the upload bucket to a batch (processed in place and kept)
+
+    Only keys under the prefix issued with the batch are accepted, so a batch cannot
+    reach other batches' objects or the service's own multipart uploads.
+    """
+    batch = get_batch_or_404(batch_id)
+    if not object_store.enabled:
+        raise HTTPException(status_code=400, detail="Object storage is not configured")
+    try:
+        admission_controller.check_memory()
+    except AdmissionError as e:
+        raise admission_http_error(e)
+
+    prefix = batch_key_prefix(batch_id)
+    assessment_ids = []
+    rejected = []
+    for object_key in request.object_keys:
+        if not object_key.startswith(prefix) or len(object_key) == len(prefix):
+            rejected.append({"name": object_key, "detail": f"Object keys must be under {prefix}"})
+            continue
+        if not object_key.endswith(VIDEO_EXTENSIONS):
+            rejected.append({"name": object_key, "detail": "Only MP4 and MOV files are supported"})
+            continue
+        if await asyncio.to_thread(object_store.object_size, object_key) is None:
+            rejected.append({"name": object_key, "detail": "Object not found"})
+            continue
+
+        assessment_id = str(uuid.uuid4())
+        assessment_ids.append(assessment_id)
+        queue_batch_job(batch, assessment_id, object_key, object_key=object_key)
+
+    logger.info(f"Batch {batch_id}: accepted {len(assessment_ids)} staged objects, rejected {len(rejected)}")
+    return BatchSubmitResponse(batch_id=batch_id, assessment_ids=assessment_ids, rejected=rejected)
+
+@router.get("/{batch_id}", response_model=BatchStatus)
+async def get_batch_status(batch_id: str, include_results: bool = False):
+    """Status of every assessment in the batch, with aggregate progress
+
+    With `include_results`, completed items also carry their scores.
+    """
+    batch = get_batch_or_404(batch_id)
+    statuses = job_store.get_batch_statuses(batch_id)
+
+    items = []
+    for status in statuses:
+        item = BatchItem(**status.model_dump())
+        if include_results and status.status == "completed":
+            report = job_store.get_report(status.assessment_id)
+            if report:
+                item.overall_score = report.overall_score
+                item.communication_score = report.communication_score
+                item.appearance_score = report.appearance_score
+                item.storytelling_score = report.storytelling_score
+        items.append(item)
+
+    counts = {"completed": 0, "failed": 0, "cancelled": 0, "processing": 0}
+    for status in statuses:
+        counts[status.status] = counts.get(status.status, 0) + 1
+    # Failed and cancelled items are finished too, so they count as fully progressed
+    progress = sum(
+        100 if s.status in ("failed", "cancelled") else s.progress for s in statuses
+    ) / len(statuses) if statuses else 0
+
+    return BatchStatus(
+        batch_id=batch_id,
+        tier=batch["tier"],
+        tenant=batch["tenant"],
+        total=len(statuses),
+        completed=counts["completed"],
+        failed=counts["failed"],
+        cancelled=counts["cancelled"],
+        processing=counts["processing"],
+        progress=round(progress, 1),
+        items=items
+    )
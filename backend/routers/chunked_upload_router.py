@@ -2,16 +2,19 @@
 Alternative upload endpoint using multi-request chunked upload
 This bypasses ingress body size limits by splitting uploads into smaller chunks
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Header, Request
 from fastapi.responses import JSONResponse
 import os
 import uuid
 import aiofiles
 import asyncio
+import hashlib
+import json
 import logging
-from typing import Dict
+import shutil
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -20,11 +23,25 @@ logger = logging.getLogger(__name__)
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from routers.assessment_router import (
-    process_video_async,
-    assessment_statuses,
+    cancel_assessment,
+    submit_job,
+    submit_upload,
+    BATCH_PRIORITY,
+    INTERACTIVE_PRIORITY,
+    reuse_completed_assessment,
+    admission_controller,
+    admission_http_error,
+    tenant_key,
     AssessmentStatus
 )
-from supabase_client import supabase_service
+from services.processing_tiers import DEFAULT_TIER, get_tier
+from services.content_hash import BLOCK_SIZE, combine_block_digests
+from services.incremental_ingest import is_streamable_mp4
+from services.object_store import UPLOAD_KEY_PREFIX, object_store
+from services.admission import AdmissionError
+from session_registry import upload_registry, supabase_write_behind
+from job_store import job_store
+from work_queue import DEFAULT_TENANT
 
 router = APIRouter(prefix="/chunked-upload", tags=["chunked-upload"])
 
@@ -33,10 +50,43 @@ UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
 TEMP_CHUNK_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "temp_chunks")
 os.makedirs(TEMP_CHUNK_DIR, exist_ok=True)
 
+CHUNK_SIZE = 10 * 1024 * 1024  # 10MB chunks for better performance
+STREAM_BUFFER_SIZE = 1024 * 1024  # Chunk bodies are written to disk 1MB at a time
+
+# Idle sessions expire this long after their last chunk; the sweeper then reclaims their files
+SESSION_TTL = timedelta(hours=float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "2")))
+
+def preallocate_file(path: str, size: int):
+    """Create the upload target at its final size so chunks can be written at their offsets"""
+    fd = os.open(path, os.O_CREAT | os.O_WRONLY, 0o644)
+    try:
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(fd, 0, size)
+        else:
+            os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+def session_expiry() -> str:
+    return (datetime.utcnow() + SESSION_TTL).isoformat()
+
+def chunk_length(session: Dict, chunk_index: int) -> int:
+    """Expected byte length of a chunk (only the last chunk may be short)"""
+    chunk_size = session.get("chunk_size") or CHUNK_SIZE
+    return min(chunk_size, session["file_size"] - chunk_index * chunk_size)
+
+def remove_upload_target(session: Dict):
+    """Delete the partially written target file of an upload session"""
+    target_path = session.get("target_path")
+    if target_path and os.path.exists(target_path):
+        os.remove(target_path)
+
 class InitUploadResponse(BaseModel):
     upload_id: str
     chunk_size: int
     message: str
+    upload_type: str = "chunked"
+    part_urls: Optional[List[str]] = None  # s3_multipart: presigned PUT URL per part, in order
 
 class ChunkUploadResponse(BaseModel):
     upload_id: str
@@ -45,6 +95,17 @@ class ChunkUploadResponse(BaseModel):
     total_chunks: int
     message: str
 
+class UploadStatusResponse(BaseModel):
+    upload_id: str
+    status: str
+    file_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: int
+    received_bitmap: str  # one '0'/'1' character per chunk, in index order
+    missing_chunks: List[int]
+    assessment_id: Optional[str] = None
+
 class CompleteUploadResponse(BaseModel):
     assessment_id: str
     filename: str
@@ -54,63 +115,163 @@ class CompleteUploadResponse(BaseModel):
 async def init_upload(
     filename: str = Form(...),
     file_size: int = Form(...),
-    total_chunks: int = Form(...)
+    total_chunks: int = Form(...),
+    tier: str = Form(DEFAULT_TIER),
+    incremental: bool = Form(False),
+    upload_type: str = Form("chunked"),
+    tenant: Optional[str] = Form(None)
 ):
-    """Initialize a chunked upload session"""
+    """Initialize a chunked upload session
+    
+    With `incremental`, analysis of a faststart or fragmented MP4 starts as soon as
+    its header and a contiguous prefix of chunks have arrived. With
+    `upload_type=s3_multipart`, parts go straight to the object store through the
+    returned presigned URLs and never pass through this API.
+    """
     
     # Validate file type
     if not filename.endswith(('.mp4', '.mov', '.MP4', '.MOV')):
         raise HTTPException(status_code=400, detail="Only MP4 and MOV files are supported")
     
+    # Validate processing tier
+    try:
+        processing_tier = get_tier(tier)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tenant_name = tenant_key(tenant)
+    
     # Validate file size
     if file_size > 1024 * 1024 * 1024:  # Increase limit to 1GB
         raise HTTPException(status_code=400, detail="File size must be less than 1GB")
     
+    # Chunk offsets are derived from the fixed chunk size
+    expected_chunks = max(1, -(-file_size // CHUNK_SIZE))
+    if total_chunks != expected_chunks:
+        raise HTTPException(
+            status_code=400,
+            detail=f"total_chunks must be {expected_chunks} for {file_size} bytes with {CHUNK_SIZE} byte chunks"
+        )
+    
+    if upload_type not in ("chunked", "s3_multipart"):
+        raise HTTPException(status_code=400, detail="upload_type must be 'chunked' or 's3_multipart'")
+    if upload_type == "s3_multipart" and not object_store.enabled:
+        raise HTTPException(status_code=400, detail="Object-store uploads are not configured")
+    
     # Generate upload session ID
     upload_id = str(uuid.uuid4())
-    chunk_dir = os.path.join(TEMP_CHUNK_DIR, upload_id)
     
-    # Store session metadata in Supabase
+    # Refuse up front when this node cannot hold the upload or run its job
+    try:
+        admission_controller.check_memory()
+        if upload_type == "s3_multipart":
+            return await init_object_upload(
+                upload_id, filename, file_size, total_chunks, processing_tier.name, tenant_name
+            )
+        admission_controller.reserve_disk(f"upload:{upload_id}", file_size)
+    except AdmissionError as e:
+        raise admission_http_error(e)
+    
+    target_path = os.path.join(TEMP_CHUNK_DIR, f"{upload_id}.part")
+    
+    # Session metadata lives in the local registry; Supabase gets a write-behind copy
     session_data = {
         "session_id": upload_id,
         "filename": filename,
         "file_size": file_size,
         "total_chunks": total_chunks,
-        "chunk_data": [],  # List to track received chunks
-        "chunk_dir": chunk_dir,
+        "chunk_data": [],  # Received chunks are tracked in the registry
+        "chunk_size": CHUNK_SIZE,
+        "target_path": target_path,
+        "tier": processing_tier.name,
+        "tenant": tenant_name,
+        "upload_type": "chunked",
+        "incremental": incremental,
         "status": "active",
         "created_at": datetime.utcnow().isoformat(),
-        "expires_at": (datetime.utcnow().replace(year=datetime.utcnow().year + 1)).isoformat()  # Expire in 1 year
+        "expires_at": session_expiry()
     }
     
-    # Create session in Supabase
-    session_record = supabase_service.create_upload_session(session_data)
-    if not session_record:
+    try:
+        upload_registry.create_session(session_data)
+    except Exception as e:
+        admission_controller.release(f"upload:{upload_id}")
+        logger.error(f"Failed to create upload session: {e}")
         raise HTTPException(status_code=500, detail="Failed to create upload session")
+    supabase_write_behind.create(session_data)
+    
+    # Preallocate the target file; chunks are written straight to their offsets
+    try:
+        await asyncio.to_thread(preallocate_file, target_path, file_size)
+    except OSError as e:
+        admission_controller.release(f"upload:{upload_id}")
+        upload_registry.update_session(upload_id, {"status": "failed"})
+        supabase_write_behind.update(upload_id, {"status": "failed"})
+        raise HTTPException(status_code=507, detail=f"Failed to allocate upload space: {str(e)}")
     
-    # Create directory for chunks
-    os.makedirs(chunk_dir, exist_ok=True)
+    # Allocated blocks already show in free space; sparse files keep their reservation until /complete
+    if hasattr(os, "posix_fallocate"):
+        admission_controller.release(f"upload:{upload_id}")
     
     logger.info(f"Initialized upload session {upload_id} for {filename} ({file_size} bytes, {total_chunks} chunks)")
     
     return InitUploadResponse(
         upload_id=upload_id,
-        chunk_size=10 * 1024 * 1024,  # 10MB chunks for better performance
+        chunk_size=CHUNK_SIZE,
         message="Upload session initialized"
     )
 
-@router.post("/chunk", response_model=ChunkUploadResponse)
-async def upload_chunk(
-    upload_id: str = Form(...),
-    chunk_index: int = Form(...),
-    chunk: UploadFile = File(...)
-):
-    """Upload a single chunk"""
+async def init_object_upload(upload_id: str, filename: str, file_size: int, total_chunks: int,
+                             tier: str, tenant: str = DEFAULT_TENANT) -> InitUploadResponse:
+    """Start a multipart upload in the object store and presign a URL per part"""
+    file_extension = os.path.splitext(filename)[1]
+    s3_key = f"{UPLOAD_KEY_PREFIX}{upload_id}{file_extension.lower()}"
+    content_type = "video/quicktime" if file_extension.lower() == ".mov" else "video/mp4"
     
-    logger.info(f"Chunk upload request for session {upload_id}, chunk {chunk_index}")
+    try:
+        s3_upload_id = await asyncio.to_thread(object_store.create_multipart_upload, s3_key, content_type)
+        part_urls = await asyncio.to_thread(object_store.presign_part_urls, s3_key, s3_upload_id, total_chunks)
+    except Exception as e:
+        logger.error(f"Failed to start object-store upload: {e}")
+        raise HTTPException(status_code=502, detail="Failed to start object-store upload")
     
-    # Get session from Supabase
-    session = supabase_service.get_upload_session(upload_id)
+    session_data = {
+        "session_id": upload_id,
+        "filename": filename,
+        "file_size": file_size,
+        "total_chunks": total_chunks,
+        "chunk_data": [],
+        "chunk_size": CHUNK_SIZE,
+        "target_path": "",
+        "tier": tier,
+        "tenant": tenant,
+        "upload_type": "s3_multipart",
+        "s3_upload_id": s3_upload_id,
+        "s3_key": s3_key,
+        "status": "active",
+        "created_at": datetime.utcnow().isoformat(),
+        "expires_at": session_expiry()
+    }
+    
+    try:
+        upload_registry.create_session(session_data)
+    except Exception as e:
+        logger.error(f"Failed to create upload session: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create upload session")
+    supabase_write_behind.create(session_data)
+    
+    logger.info(f"Initialized object-store upload {upload_id} for {filename} ({file_size} bytes, {total_chunks} parts)")
+    
+    return InitUploadResponse(
+        upload_id=upload_id,
+        chunk_size=CHUNK_SIZE,
+        message="Upload session initialized. PUT each part to its URL.",
+        upload_type="s3_multipart",
+        part_urls=part_urls
+    )
+
+def get_active_session(upload_id: str, chunk_index: int) -> Dict:
+    """Load an upload session and validate it can accept the given chunk"""
+    session = upload_registry.get_session(upload_id)
     
     if not session:
         logger.error(f"Upload session {upload_id} not found in database")
@@ -119,44 +280,239 @@ async def upload_chunk(
     if session.get("status") != "active":
         raise HTTPException(status_code=400, detail="Upload session is not active")
     
+    if session.get("upload_type") == "s3_multipart":
+        raise HTTPException(status_code=400, detail="Parts of this upload go directly to the object store")
+    
     # Validate chunk index
     if chunk_index >= session["total_chunks"] or chunk_index < 0:
         raise HTTPException(status_code=400, detail="Invalid chunk index")
     
-    # Save chunk
-    chunk_path = os.path.join(session["chunk_dir"], f"chunk_{chunk_index:04d}")
+    return session
+
+async def iter_upload_file(upload: UploadFile) -> AsyncIterator[bytes]:
+    """Read a multipart file field in small buffers"""
+    while data := await upload.read(STREAM_BUFFER_SIZE):
+        yield data
+
+async def write_chunk_stream(session: Dict, chunk_index: int, stream: AsyncIterator[bytes],
+                             expected_sha256: Optional[str] = None) -> Tuple[int, str]:
+    """Stream chunk bytes to their offset in the preallocated target, buffering at most ~1MB
     
+    Returns the number of bytes written and their SHA-256. If the client supplied a
+    digest and it does not match, the chunk is rejected and must be re-sent.
+    """
+    # Write chunk at its offset in the preallocated target (chunks may arrive in any order)
+    offset = chunk_index * (session.get("chunk_size") or CHUNK_SIZE)
+    expected_length = chunk_length(session, chunk_index)
+    
+    digest = hashlib.sha256()
+    written = 0
     try:
-        async with aiofiles.open(chunk_path, 'wb') as out_file:
-            content = await chunk.read()
-            await out_file.write(content)
+        async with aiofiles.open(session["target_path"], 'r+b') as out_file:
+            await out_file.seek(offset)
+            
+            # Coalesce small network reads into buffer-sized writes
+            pending = bytearray()
+            async for data in stream:
+                if written + len(pending) + len(data) > expected_length:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Chunk {chunk_index} exceeds its expected size of {expected_length} bytes"
+                    )
+                pending += data
+                if len(pending) >= STREAM_BUFFER_SIZE:
+                    digest.update(pending)
+                    await out_file.write(pending)
+                    written += len(pending)
+                    pending = bytearray()
+            
+            if pending:
+                digest.update(pending)
+                await out_file.write(pending)
+                written += len(pending)
+        
+        if written != expected_length:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk {chunk_index} must be {expected_length} bytes, got {written}"
+            )
+        
+        sha256 = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk {chunk_index} checksum mismatch, please re-send it"
+            )
     except Exception as e:
+        # The region may hold a partial write now, so a previously received copy is no longer valid
+        upload_registry.discard_chunk(session["session_id"], chunk_index)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=f"Failed to save chunk: {str(e)}")
     
-    # Mark chunk as received in Supabase
-    chunk_data = session.get("chunk_data", [])
-    if chunk_index not in chunk_data:
-        chunk_data.append(chunk_index)
-        update_data = {
-            "chunk_data": chunk_data,
-            "uploaded_chunks": len(chunk_data)
-        }
-        supabase_service.update_upload_session(upload_id, update_data)
+    return written, sha256
+
+def already_received(upload_id: str, chunk_index: int, expected_sha256: Optional[str]) -> bool:
+    """True if this exact chunk (same digest) was already stored, so a re-send can be skipped"""
+    if not expected_sha256:
+        return False
+    return upload_registry.get_chunk_digest(upload_id, chunk_index) == expected_sha256.lower()
+
+def record_chunk(upload_id: str, session: Dict, chunk_index: int, size: int,
+                 sha256: Optional[str] = None) -> ChunkUploadResponse:
+    """Mark a chunk as received and build the acknowledgement"""
+    # Atomic in the local registry, so parallel chunks cannot lose each other's updates
+    received_chunks = upload_registry.mark_chunk_received(
+        upload_id, chunk_index, size, sha256, expires_at=session_expiry()
+    )
+    supabase_write_behind.update(upload_id, {"uploaded_chunks": received_chunks})
+    maybe_start_incremental(upload_id, session)
     
     return ChunkUploadResponse(
         upload_id=upload_id,
         chunk_index=chunk_index,
-        received_chunks=len(chunk_data),
+        received_chunks=received_chunks,
         total_chunks=session["total_chunks"],
         message=f"Chunk {chunk_index + 1}/{session['total_chunks']} received"
     )
 
+def maybe_start_incremental(upload_id: str, session: Dict):
+    """Queue analysis of the received prefix once the container layout allows streaming
+    
+    The job goes through the work queue like any other; the worker that claims it
+    streams the prefix as the session registry reports more chunks.
+    """
+    if not session.get("incremental") or session.get("video_id"):
+        return
+    
+    available = upload_registry.contiguous_bytes(upload_id)
+    if available == 0:
+        return
+    
+    with open(session["target_path"], 'rb') as f:
+        streamable = is_streamable_mp4(f, available)
+    if streamable is None and available < session["file_size"]:
+        return  # Need more of the header
+    
+    if not streamable:
+        logger.info(f"Upload {upload_id} is not faststart/fragmented, processing after /complete")
+        upload_registry.update_session(upload_id, {"incremental": False})
+        return
+    
+    # Chunks arrive concurrently, possibly on several workers; only one starts the job
+    assessment_id = str(uuid.uuid4())
+    if not upload_registry.claim_incremental(upload_id, assessment_id):
+        return
+    supabase_write_behind.update(upload_id, {"video_id": assessment_id})
+    
+    job_store.create_job(AssessmentStatus(
+        assessment_id=assessment_id,
+        status="processing",
+        progress=0,
+        message="Analyzing video while the upload finishes..."
+    ), tier=session.get("tier"))
+    
+    logger.info(f"Queueing incremental ingest of upload {upload_id} as assessment {assessment_id}")
+    submit_job(assessment_id, session["target_path"], session.get("tier") or DEFAULT_TIER,
+               upload_id=upload_id, tenant=session.get("tenant") or DEFAULT_TENANT)
+
+@router.post("/chunk", response_model=ChunkUploadResponse)
+async def upload_chunk(
+    upload_id: str = Form(...),
+    chunk_index: int = Form(...),
+    chunk: UploadFile = File(...),
+    chunk_sha256: Optional[str] = Form(None)
+):
+    """Upload a single chunk (multipart form)"""
+    
+    logger.info(f"Chunk upload request for session {upload_id}, chunk {chunk_index}")
+    
+    session = get_active_session(upload_id, chunk_index)
+    if already_received(upload_id, chunk_index, chunk_sha256):
+        return record_chunk(upload_id, session, chunk_index, chunk_length(session, chunk_index), chunk_sha256.lower())
+    
+    size, sha256 = await write_chunk_stream(session, chunk_index, iter_upload_file(chunk), chunk_sha256)
+    
+    return record_chunk(upload_id, session, chunk_index, size, sha256)
+
+@router.put("/chunk", response_model=ChunkUploadResponse)
+async def upload_chunk_raw(
+    request: Request,
+    upload_id: str = Header(..., alias="X-Upload-Id"),
+    chunk_index: int = Header(..., alias="X-Chunk-Index"),
+    chunk_sha256: Optional[str] = Header(None, alias="X-Chunk-SHA256")
+):
+    """Upload a single chunk as a raw application/octet-stream body
+    
+    The body is streamed straight to disk without multipart parsing; the session
+    and chunk index are passed in the X-Upload-Id and X-Chunk-Index headers, and
+    an optional X-Chunk-SHA256 digest is verified on receipt.
+    """
+    
+    logger.info(f"Raw chunk upload request for session {upload_id}, chunk {chunk_index}")
+    
+    session = get_active_session(upload_id, chunk_index)
+    if already_received(upload_id, chunk_index, chunk_sha256):
+        return record_chunk(upload_id, session, chunk_index, chunk_length(session, chunk_index), chunk_sha256.lower())
+    
+    size, sha256 = await write_chunk_stream(session, chunk_index, request.stream(), chunk_sha256)
+    
+    return record_chunk(upload_id, session, chunk_index, size, sha256)
+
+@router.get("/status/{upload_id}", response_model=UploadStatusResponse)
+async def get_upload_status(upload_id: str):
+    """Report which chunks have been received so a client can resume an upload"""
+    
+    session = upload_registry.get_session(upload_id)
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    received = set(session["chunk_data"])
+    total_chunks = session["total_chunks"]
+    
+    # Object-store parts are tracked by the store itself
+    if session.get("upload_type") == "s3_multipart" and session["status"] == "active":
+        try:
+            part_numbers = await asyncio.to_thread(
+                object_store.list_uploaded_parts, session["s3_key"], session["s3_upload_id"]
+            )
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Failed to list uploaded parts: {str(e)}")
+        received = {part_number - 1 for part_number in part_numbers}
+    
+    return UploadStatusResponse(
+        upload_id=upload_id,
+        status=session["status"],
+        file_size=session["file_size"],
+        chunk_size=session["chunk_size"],
+        total_chunks=total_chunks,
+        received_chunks=len(received),
+        received_bitmap="".join("1" if i in received else "0" for i in range(total_chunks)),
+        missing_chunks=[i for i in range(total_chunks) if i not in received],
+        assessment_id=session.get("video_id")
+    )
+
 @router.post("/complete", response_model=CompleteUploadResponse)
-async def complete_upload(upload_id: str = Form(...)):
-    """Complete upload by reassembling chunks"""
+async def complete_upload(upload_id: str = Form(...), parts: Optional[str] = Form(None),
+                          batch_id: Optional[str] = Form(None)):
+    """Complete upload by verifying the target file and moving it into place
+    
+    Object-store uploads pass `parts`, a JSON list of {"part_number", "etag"} objects.
+    With `batch_id` (from POST /batch) the assessment joins that batch and is queued
+    behind interactive uploads.
+    """
+    if batch_id and job_store.get_batch(batch_id) is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
     
-    # Get session from Supabase
-    session = supabase_service.get_upload_session(upload_id)
+    priority = BATCH_PRIORITY if batch_id else INTERACTIVE_PRIORITY
+    response = await finish_upload(upload_id, parts, priority)
+    if batch_id:
+        job_store.assign_batch(response.assessment_id, batch_id)
+    return response
+
+async def finish_upload(upload_id: str, parts: Optional[str], priority: int) -> CompleteUploadResponse:
+    session = upload_registry.get_session(upload_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Upload session not found")
@@ -164,6 +520,9 @@ async def complete_upload(upload_id: str = Form(...)):
     if session.get("status") != "active":
         raise HTTPException(status_code=400, detail="Upload session is not active")
     
+    if session.get("upload_type") == "s3_multipart":
+        return await complete_object_upload(upload_id, session, parts, priority)
+    
     # Verify all chunks received
     chunk_data = session.get("chunk_data", [])
     if len(chunk_data) != session["total_chunks"]:
@@ -173,84 +532,201 @@ async def complete_upload(upload_id: str = Form(...)):
             detail=f"Missing chunks: {sorted(missing)}"
         )
     
+    target_path = session["target_path"]
+    if not os.path.exists(target_path) or os.path.getsize(target_path) != session["file_size"]:
+        raise HTTPException(status_code=500, detail="Uploaded file is incomplete")
+    
+    # Claim the session so a duplicate /complete cannot start a second job
+    if not upload_registry.transition_status(upload_id, "active", "completing"):
+        raise HTTPException(status_code=400, detail="Upload session is not active")
+    admission_controller.release(f"upload:{upload_id}")
+    
     # Generate assessment ID
     assessment_id = str(uuid.uuid4())
+    tier_name = session.get("tier") or DEFAULT_TIER
+    
+    # Chunks are hash blocks, so the content hash comes from the per-chunk digests
+    content_hash = None
+    chunk_digests = upload_registry.get_chunk_digests(upload_id)
+    if session["chunk_size"] == BLOCK_SIZE and all(chunk_digests):
+        content_hash = combine_block_digests(chunk_digests)
+    
+    # Incremental ingest already running on this upload: let it finish the file
+    # (the worker running it sees the session complete)
+    if session.get("video_id"):
+        assessment_id = session["video_id"]
+        job_status = job_store.get_status(assessment_id)
+        if job_status and job_status.status != "failed":
+            update_data = {
+                "status": "completed",
+                "video_id": assessment_id
+            }
+            upload_registry.update_session(upload_id, update_data)
+            upload_registry.delete_chunks(upload_id)
+            supabase_write_behind.update(upload_id, {**update_data, "chunk_data": chunk_data})
+            
+            if job_status.status == "completed":
+                remove_upload_target(session)
+            
+            return CompleteUploadResponse(
+                assessment_id=assessment_id,
+                filename=session["filename"],
+                message="File uploaded successfully. Processing already under way."
+            )
+        # The incremental run failed; reprocess the complete file under the same ID
+    
+    # Identical video already assessed: reuse its report instead of reprocessing
+    if reuse_completed_assessment(assessment_id, content_hash, tier_name):
+        remove_upload_target(session)
+        update_data = {
+            "status": "completed",
+            "video_id": assessment_id
+        }
+        upload_registry.update_session(upload_id, update_data)
+        upload_registry.delete_chunks(upload_id)
+        supabase_write_behind.update(upload_id, {**update_data, "chunk_data": chunk_data})
+        
+        return CompleteUploadResponse(
+            assessment_id=assessment_id,
+            filename=session["filename"],
+            message="Identical video already assessed. Report is ready."
+        )
     
-    # Reassemble file
+    # Chunks were written in place, so completing is just a rename
     file_extension = os.path.splitext(session["filename"])[1]
     video_filename = f"{assessment_id}{file_extension}"
     video_path = os.path.join(UPLOAD_DIR, video_filename)
     
     try:
-        async with aiofiles.open(video_path, 'wb') as out_file:
-            for chunk_index in range(session["total_chunks"]):
-                chunk_path = os.path.join(session["chunk_dir"], f"chunk_{chunk_index:04d}")
-                async with aiofiles.open(chunk_path, 'rb') as chunk_file:
-                    chunk_data = await chunk_file.read()
-                    await out_file.write(chunk_data)
-        
-        # Clean up chunks
-        for chunk_index in range(session["total_chunks"]):
-            chunk_path = os.path.join(session["chunk_dir"], f"chunk_{chunk_index:04d}")
-            if os.path.exists(chunk_path):
-                os.remove(chunk_path)
-        os.rmdir(session["chunk_dir"])
+        await asyncio.to_thread(shutil.move, target_path, video_path)
         
-        # Mark session as completed in Supabase
+        # Mark session as completed
         update_data = {
             "status": "completed",
             "video_id": assessment_id
         }
-        supabase_service.update_upload_session(upload_id, update_data)
+        upload_registry.update_session(upload_id, update_data)
+        upload_registry.delete_chunks(upload_id)
+        supabase_write_behind.update(upload_id, {**update_data, "chunk_data": chunk_data})
         
         # Initialize status for processing
-        assessment_statuses[assessment_id] = AssessmentStatus(
+        job_store.create_job(AssessmentStatus(
             assessment_id=assessment_id,
             status="processing",
             progress=0,
             message="Video uploaded, starting analysis..."
-        )
+        ), tier=tier_name)
         
-        # Start processing in background (same as main upload)
-        asyncio.create_task(process_video_async(assessment_id, video_path))
+        # Queue for processing (same as main upload)
+        submit_upload(assessment_id, video_path, tier_name, content_hash, priority=priority,
+                      tenant=session.get("tenant") or DEFAULT_TENANT)
         
         return CompleteUploadResponse(
             assessment_id=assessment_id,
             filename=session["filename"],
-            message="File uploaded and reassembled successfully. Processing started."
+            message="File uploaded successfully. Processing started."
         )
         
     except Exception as e:
         # Clean up on error
         if os.path.exists(video_path):
             os.remove(video_path)
-        raise HTTPException(status_code=500, detail=f"Failed to reassemble file: {str(e)}")
+        upload_registry.update_session(upload_id, {"status": "failed"})
+        supabase_write_behind.update(upload_id, {"status": "failed"})
+        raise HTTPException(status_code=500, detail=f"Failed to finalize file: {str(e)}")
+
+async def complete_object_upload(upload_id: str, session: Dict, parts: Optional[str],
+                                 priority: int = INTERACTIVE_PRIORITY) -> CompleteUploadResponse:
+    """Finalize an object-store multipart upload and process the object in place"""
+    try:
+        part_list = [
+            {"PartNumber": int(part["part_number"]), "ETag": part["etag"]}
+            for part in json.loads(parts or "[]")
+        ]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="parts must be a JSON list of {part_number, etag}")
+    
+    part_numbers = sorted(part["PartNumber"] for part in part_list)
+    if part_numbers != list(range(1, session["total_chunks"] + 1)):
+        missing = set(range(1, session["total_chunks"] + 1)) - set(part_numbers)
+        raise HTTPException(status_code=400, detail=f"Missing chunks: {sorted(n - 1 for n in missing)}")
+    
+    # Claim the session so a duplicate /complete cannot start a second job
+    if not upload_registry.transition_status(upload_id, "active", "completing"):
+        raise HTTPException(status_code=400, detail="Upload session is not active")
+    
+    s3_key = session["s3_key"]
+    try:
+        await asyncio.to_thread(
+            object_store.complete_multipart_upload, s3_key, session["s3_upload_id"], part_list
+        )
+        object_size = await asyncio.to_thread(object_store.object_size, s3_key)
+        if object_size != session["file_size"]:
+            await asyncio.to_thread(object_store.delete_object, s3_key)
+            raise Exception(f"expected {session['file_size']} bytes, object has {object_size}")
+    except Exception as e:
+        upload_registry.update_session(upload_id, {"status": "failed"})
+        supabase_write_behind.update(upload_id, {"status": "failed"})
+        raise HTTPException(status_code=500, detail=f"Failed to finalize object upload: {str(e)}")
+    
+    assessment_id = str(uuid.uuid4())
+    update_data = {
+        "status": "completed",
+        "video_id": assessment_id
+    }
+    upload_registry.update_session(upload_id, update_data)
+    supabase_write_behind.update(upload_id, update_data)
+    
+    job_store.create_job(AssessmentStatus(
+        assessment_id=assessment_id,
+        status="processing",
+        progress=0,
+        message="Video uploaded, starting analysis..."
+    ), tier=session.get("tier"))
+    
+    # The worker streams the object through a presigned URL; nothing is copied to this node
+    submit_job(assessment_id, s3_key, session.get("tier") or DEFAULT_TIER, object_key=s3_key, priority=priority,
+               tenant=session.get("tenant") or DEFAULT_TENANT)
+    
+    return CompleteUploadResponse(
+        assessment_id=assessment_id,
+        filename=session["filename"],
+        message="File uploaded successfully. Processing started."
+    )
 
 @router.delete("/cancel/{upload_id}")
 async def cancel_upload(upload_id: str):
     """Cancel an upload and clean up chunks"""
     
-    # Get session from Supabase
-    session = supabase_service.get_upload_session(upload_id)
+    session = upload_registry.get_session(upload_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Upload session not found")
     
-    # Clean up chunks
+    admission_controller.release(f"upload:{upload_id}")
+    
+    # Stop any analysis running on the partial upload, on whichever worker has it
+    if session["status"] == "active" and session.get("video_id"):
+        job_status = job_store.get_status(session["video_id"])
+        if job_status and job_status.status == "processing":
+            await cancel_assessment(session["video_id"])
+    
+    # Clean up the partially written file (or the parts held by the object store)
     try:
-        chunk_data = session.get("chunk_data", [])
-        for chunk_index in chunk_data:
-            chunk_path = os.path.join(session["chunk_dir"], f"chunk_{chunk_index:04d}")
-            if os.path.exists(chunk_path):
-                os.remove(chunk_path)
-        if os.path.exists(session["chunk_dir"]):
-            os.rmdir(session["chunk_dir"])
+        if session.get("upload_type") == "s3_multipart":
+            await asyncio.to_thread(
+                object_store.abort_multipart_upload, session["s3_key"], session["s3_upload_id"]
+            )
+        else:
+            remove_upload_target(session)
         
-        # Mark session as cancelled in Supabase
+        # Mark session as cancelled
         update_data = {
             "status": "cancelled"
         }
-        supabase_service.update_upload_session(upload_id, update_data)
+        upload_registry.update_session(upload_id, update_data)
+        upload_registry.delete_chunks(upload_id)
+        supabase_write_behind.update(upload_id, update_data)
         
         return {"message": "Upload cancelled and cleaned up"}
     except Exception as e:
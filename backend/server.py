@@ -2,6 +2,7 @@ from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
@@ -20,6 +21,13 @@ except Exception as e:
 # Import routers
 from routers.assessment_router import router as assessment_router
 from routers.chunked_upload_router import router as chunked_upload_router
+from routers.batch_router import router as batch_router
+from session_registry import supabase_write_behind
+from progress_events import progress_broker
+from worker import embedded_worker
+from cleanup_sessions import upload_sweeper
+from routers.assessment_router import admission_controller, resume_interrupted_jobs
+from services.stage_runner import stage_runner
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -64,9 +72,25 @@ async def get_status_checks():
     # Return empty list for now
     return []
 
+@api_router.get("/maintenance/sweeper")
+async def get_sweeper_metrics():
+    """Cumulative results of the upload sweeper"""
+    return upload_sweeper.metrics
+
+@api_router.get("/maintenance/admission")
+async def get_admission_state():
+    """Disk and memory currently reserved for uploads and jobs"""
+    return admission_controller.snapshot()
+
+@api_router.get("/maintenance/workers")
+async def get_worker_state():
+    """Work queue depth, the jobs held by this process's embedded worker and its stage processes"""
+    return {**embedded_worker.snapshot(), "stage_processes": stage_runner.snapshot()}
+
 # Include routers
 api_router.include_router(assessment_router)
 api_router.include_router(chunked_upload_router)
+api_router.include_router(batch_router)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -89,7 +113,18 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up Executive Presence Assessment API")
+    supabase_write_behind.start()
+    upload_sweeper.start()
+    progress_broker.start()
+    # Pick up jobs left behind by a worker that died, from their last checkpoint
+    resume_interrupted_jobs()
+    embedded_worker.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info("Shutting down Executive Presence Assessment API")
\ No newline at end of file
+    logger.info("Shutting down Executive Presence Assessment API")
+    await embedded_worker.stop()
+    await asyncio.to_thread(stage_runner.stop)
+    await progress_broker.stop()
+    await upload_sweeper.stop()
+    await supabase_write_behind.stop()
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class AdmissionError(Exception):
+    """The node is too close to its disk or memory limits to accept more work right now"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def available_memory_bytes() -> Optional[int]:
+    """MemAvailable from /proc/meminfo (None where it is not available)"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class AdmissionController:
+    """Tracks disk and memory promised to in-flight uploads and jobs
+
+    Uploads reserve their declared size until the bytes are actually on disk.
+    Jobs reserve an estimated working set; a running job's reservation is held
+    for `job_ramp_seconds`, after which its real usage shows up in MemAvailable.
+    New uploads are rejected (507 disk / 503 memory) and new jobs wait while the
+    node is near its limits.
+    """
+
+    def __init__(self, disk_path: str, min_free_disk_bytes: int, job_disk_bytes: int,
+                 job_memory_bytes: int, min_free_memory_bytes: int,
+                 job_ramp_seconds: float = 60, retry_after: int = 30):
+        self.disk_path = disk_path
+        self.min_free_disk_bytes = min_free_disk_bytes
+        self.job_disk_bytes = job_disk_bytes
+        self.job_memory_bytes = job_memory_bytes
+        self.min_free_memory_bytes = min_free_memory_bytes
+        self.job_ramp_seconds = job_ramp_seconds
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._disk: Dict[str, int] = {}
+        self._jobs_started: Dict[str, float] = {}
+        self._jobs_waiting = 0
+
+    def _reserved_disk(self) -> int:
+        return sum(self._disk.values())
+
+    def _reserved_memory(self) -> int:
+        now = time.monotonic()
+        ramping = sum(1 for started in self._jobs_started.values() if now - started < self.job_ramp_seconds)
+        return (ramping + self._jobs_waiting) * self.job_memory_bytes
+
+    def _disk_headroom(self) -> int:
+        free = shutil.disk_usage(self.disk_path).free
+        return free - self._reserved_disk() - self.min_free_disk_bytes
+
+    def _memory_headroom(self) -> Optional[int]:
+        available = available_memory_bytes()
+        if available is None:
+            return None
+        return available - self._reserved_memory() - self.min_free_memory_bytes
+
+    def reserve_disk(self, key: str, nbytes: int):
+        """Promise `nbytes` of disk to `key`, or raise AdmissionError (507)"""
+        with self._lock:
+            if self._disk_headroom() < nbytes:
+                raise AdmissionError(
+                    507, "Not enough free disk space to accept this upload right now", self.retry_after
+                )
+            self._disk[key] = self._disk.get(key, 0) + nbytes
+
+    def check_memory(self):
+        """Raise AdmissionError (503) if another job could not start soon"""
+        with self._lock:
+            headroom = self._memory_headroom()
+            if headroom is not None and headroom < self.job_memory_bytes:
+                raise AdmissionError(
+                    503, "Server is at capacity, please retry shortly", self.retry_after
+                )
+
+    def _try_start_job(self, key: str, waiting: bool) -> bool:
+        with self._lock:
+            memory_headroom = self._memory_headroom()
+            if memory_headroom is not None:
+                # A waiting job's own reservation does not count against it
+                if waiting:
+                    memory_headroom += self.job_memory_bytes
+                if memory_headroom < self.job_memory_bytes:
+                    return False
+            if self._disk_headroom() < self.job_disk_bytes:
+                return False
+            self._disk[key] = self._disk.get(key, 0) + self.job_disk_bytes
+            self._jobs_started[key] = time.monotonic()
+            return True
+
+    async def acquire_job(self, key: str, on_wait: Optional[Callable[[], None]] = None,
+                          poll_interval: float = 2.0, check: Optional[Callable[[], None]] = None):
+        """Wait until the node can take another job, then reserve for it
+
+        `check` is called on every poll and may raise to stop waiting.
+        """
+        waiting = False
+        try:
+            while not self._try_start_job(key, waiting):
+                if check:
+                    check()
+                if not waiting:
+                    with self._lock:
+                        self._jobs_waiting += 1
+                    waiting = True
+                    if on_wait:
+                        on_wait()
+                await asyncio.sleep(poll_interval)
+        finally:
+            if waiting:
+                with self._lock:
+                    self._jobs_waiting -= 1
+
+    def release(self, key: str):
+        with self._lock:
+            self._disk.pop(key, None)
+            self._jobs_started.pop(key, None)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "reserved_disk_bytes": self._reserved_disk(),
+                "reserved_memory_bytes": self._reserved_memory(),
+                "running_jobs": len(self._jobs_started),
+                "waiting_jobs": self._jobs_waiting,
+                "free_disk_bytes": shutil.disk_usage(self.disk_path).free,
+                "available_memory_bytes": available_memory_bytes()
+            }
+
+
+def _env_mb(name: str, default: float) -> int:
+    return int(float(os.getenv(name, default)) * 1024 * 1024)
+
+
+def create_admission_controller(disk_path: str) -> AdmissionController:
+    return AdmissionController(
+        disk_path=disk_path,
+        min_free_disk_bytes=_env_mb("ADMISSION_MIN_FREE_DISK_MB", 2048),
+        job_disk_bytes=_env_mb("ADMISSION_JOB_DISK_MB", 256),
+        job_memory_bytes=_env_mb("ADMISSION_JOB_MEMORY_MB", 1536),
+        min_free_memory_bytes=_env_mb("ADMISSION_MIN_FREE_MEMORY_MB", 512),
+        retry_after=int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "30"))
+    )
@@ -1,18 +1,31 @@
 import os
+import asyncio
+import time
 import librosa
 import numpy as np
 import parselmouth
 from parselmouth.praat import call
 import soundfile as sf
 from pydub import AudioSegment
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import re
 import openai
 from dotenv import load_dotenv
 import tempfile
 
+from models.assessment_models import ProcessingTier
+from services.cancellation import CancellationToken
+from services.transcript_document import TranscriptDocument
+
 load_dotenv()
 
+# Recordings are transcribed in windows of about this length, several at a time, so
+# the transcript (and the storytelling analysis that follows it) arrives in pieces
+TRANSCRIBE_WINDOW_SECONDS = float(os.getenv("TRANSCRIBE_WINDOW_SECONDS", "120"))
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "3"))
+# Windows end at the quietest 100ms in this many seconds before the nominal cut
+TRANSCRIBE_CUT_SEARCH_SECONDS = 5.0
+
 class AudioProcessor:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
@@ -39,47 +52,146 @@ class AudioProcessor:
             r'i know', r'we know', r'clearly', r'obviously'
         ]
     
-    async def extract_audio_from_video(self, video_path: str) -> str:
-        """Extract audio from video file and save as WAV"""
-        # Handle both uppercase and lowercase extensions
-        audio_path = video_path
-        for ext in ['.mp4', '.MP4', '.mov', '.MOV']:
-            audio_path = audio_path.replace(ext, '.wav')
+    async def extract_audio_from_video(self, video_path: str, sample_rate: int = 16000,
+                                       audio_path: Optional[str] = None) -> str:
+        """Extract mono analysis-rate audio from video file and save as WAV"""
+        # Swap the extension (inputs may also be .mkv analysis proxies)
+        if audio_path is None:
+            audio_path = f"{os.path.splitext(video_path)[0]}.wav"
         
         try:
             video = AudioSegment.from_file(video_path)
-            video.export(audio_path, format="wav")
+            video.set_channels(1).set_frame_rate(sample_rate).export(audio_path, format="wav")
             return audio_path
         except Exception as e:
             raise Exception(f"Failed to extract audio: {str(e)}")
     
-    async def transcribe_audio(self, audio_path: str) -> Dict:
-        """Transcribe audio using OpenAI Whisper API"""
-        try:
-            with open(audio_path, "rb") as audio_file:
-                response = self.client.audio.transcriptions.create(
+    def split_for_transcription(self, audio_path: str,
+                                window_seconds: float = TRANSCRIBE_WINDOW_SECONDS) -> List[Tuple[float, str]]:
+        """Cut a WAV into windows that end in a pause; returns (start seconds, path) per window
+        
+        A recording shorter than one and a half windows is returned whole.
+        """
+        info = sf.info(audio_path)
+        window = int(window_seconds * info.samplerate)
+        if window <= 0 or info.frames <= window * 1.5:
+            return [(0.0, audio_path)]
+        
+        search = min(int(TRANSCRIBE_CUT_SEARCH_SECONDS * info.samplerate), window // 2)
+        frame = max(1, info.samplerate // 10)
+        cuts = [0]
+        while info.frames - cuts[-1] > window * 1.5:
+            nominal = cuts[-1] + window
+            region, _ = sf.read(audio_path, start=nominal - search, stop=nominal, dtype="float32", always_2d=True)
+            energy = [
+                float(np.mean(region[i:i + frame] ** 2))
+                for i in range(0, len(region) - frame + 1, frame)
+            ]
+            cuts.append(nominal - search + int(np.argmin(energy)) * frame if energy else nominal)
+        cuts.append(info.frames)
+        
+        base = os.path.splitext(audio_path)[0]
+        pieces = []
+        for index, (start, stop) in enumerate(zip(cuts, cuts[1:])):
+            data, sample_rate = sf.read(audio_path, start=start, stop=stop, dtype="int16")
+            piece_path = f"{base}.part{index}.wav"
+            sf.write(piece_path, data, sample_rate, subtype=info.subtype)
+            pieces.append((start / info.samplerate, piece_path))
+        return pieces
+    
+    def _request_transcript(self, audio_path: str, model: str, timeout: Optional[float] = None) -> Dict:
+        """One transcription request; segments and words come back as plain dicts"""
+        request_options = {"timeout": timeout, "max_retries": 0} if timeout else {}
+        with open(audio_path, "rb") as audio_file:
+            if model == "whisper-1":
+                response = self.client.with_options(**request_options).audio.transcriptions.create(
                     file=audio_file,
-                    model="whisper-1",
+                    model=model,
                     response_format="verbose_json",
                     timestamp_granularities=["segment", "word"]
                 )
+            else:
+                # Newer transcription models only return plain text
+                response = self.client.with_options(**request_options).audio.transcriptions.create(
+                    file=audio_file,
+                    model=model,
+                    response_format="json"
+                )
+        
+        def as_dicts(items) -> List[Dict]:
+            return [item.model_dump() if hasattr(item, "model_dump") else dict(item) for item in items or []]
+        
+        return {
+            "transcript": response.text,
+            "segments": as_dicts(getattr(response, "segments", None)),
+            "words": as_dicts(getattr(response, "words", None))
+        }
+    
+    async def transcribe_audio(self, audio_path: str, model: str = "whisper-1",
+                               timeout: Optional[float] = None,
+                               on_segment: Optional[Callable[[str], None]] = None) -> Dict:
+        """Transcribe audio using OpenAI Whisper API (`timeout` bounds the whole transcription)
+        
+        Long recordings are sent as windows cut at pauses, TRANSCRIBE_CONCURRENCY
+        requests at a time. `on_segment` receives the text of each transcript segment,
+        in order, as soon as the window holding it is back, so it runs while later
+        windows are still being transcribed.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        transcript_data = {"transcript": "", "segments": [], "words": []}
+        pieces = [(0.0, audio_path)]
+        tasks = []
+        try:
+            pieces = await asyncio.to_thread(self.split_for_transcription, audio_path)
+            slots = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
             
-            transcript = response.text
-            segments = response.segments if hasattr(response, 'segments') else []
-            words = response.words if hasattr(response, 'words') else []
+            async def transcribe_piece(path: str) -> Dict:
+                async with slots:
+                    remaining = max(1.0, deadline - time.monotonic()) if deadline else None
+                    return await asyncio.to_thread(self._request_transcript, path, model, remaining)
             
-            return {
-                "transcript": transcript,
-                "segments": segments,
-                "words": words
-            }
+            tasks = [asyncio.create_task(transcribe_piece(path)) for _, path in pieces]
+            texts = []
+            for (offset, _), task in zip(pieces, tasks):
+                piece = await task
+                texts.append(piece["transcript"].strip())
+                
+                # Window timestamps are relative to the window's start
+                for segment in piece["segments"]:
+                    segment.update(
+                        id=len(transcript_data["segments"]),
+                        start=segment.get("start", 0) + offset,
+                        end=segment.get("end", 0) + offset
+                    )
+                    transcript_data["segments"].append(segment)
+                for word in piece["words"]:
+                    word.update(start=word.get("start", 0) + offset, end=word.get("end", 0) + offset)
+                    transcript_data["words"].append(word)
+                
+                if on_segment:
+                    for text in self.segment_texts(piece):
+                        on_segment(text)
+            transcript_data["transcript"] = " ".join(text for text in texts if text)
         except Exception as e:
             raise Exception(f"Transcription failed: {str(e)}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            for _, path in pieces:
+                if path != audio_path and os.path.exists(path):
+                    os.remove(path)
+        
+        return transcript_data
+    
+    def segment_texts(self, transcript_data: Dict) -> List[str]:
+        """Text of each transcript segment (the whole transcript for plain-text models)"""
+        segments = transcript_data.get("segments") or []
+        texts = [s["text"] if isinstance(s, dict) else s.text for s in segments]
+        return texts or [transcript_data["transcript"]]
     
-    def calculate_speaking_rate(self, transcript: str, duration: float) -> Dict:
+    def calculate_speaking_rate(self, document: TranscriptDocument, duration: float) -> Dict:
         """Calculate words per minute"""
-        words = transcript.split()
-        word_count = len(words)
+        word_count = document.word_count
         duration_minutes = duration / 60.0
         
         wpm = word_count / duration_minutes if duration_minutes > 0 else 0
@@ -104,11 +216,11 @@ class AudioProcessor:
             "description": f"Speaking rate of {round(wpm, 1)} WPM"
         }
     
-    def analyze_pitch(self, audio_path: str) -> Dict:
+    def analyze_pitch(self, audio_path: str, time_step: float = 0.0) -> Dict:
         """Analyze pitch using Parselmouth"""
         try:
             sound = parselmouth.Sound(audio_path)
-            pitch = call(sound, "To Pitch", 0.0, 75, 500)
+            pitch = call(sound, "To Pitch", time_step, 75, 500)
             
             # Extract pitch values
             pitch_values = pitch.selected_array['frequency']
@@ -261,10 +373,10 @@ class AudioProcessor:
                 "score": 50
             }
     
-    def detect_fillers(self, transcript: str) -> Dict:
+    def detect_fillers(self, document: TranscriptDocument) -> Dict:
         """Detect filler words"""
-        transcript_lower = transcript.lower()
-        word_count = len(transcript.split())
+        transcript_lower = document.lower
+        word_count = document.word_count
         
         filler_count = 0
         for pattern in self.filler_words:
@@ -290,16 +402,15 @@ class AudioProcessor:
             "score": round(score, 1)
         }
     
-    def analyze_clarity(self, transcript: str) -> Dict:
+    def analyze_clarity(self, document: TranscriptDocument) -> Dict:
         """Analyze verbal clarity and readability"""
-        sentences = transcript.split('.')
-        sentences = [s.strip() for s in sentences if s.strip()]
+        # Same sentence boundaries as the storytelling analysis
+        sentence_count = document.sentence_count
         
-        if len(sentences) == 0:
+        if sentence_count == 0:
             return {"avg_sentence_length": 0, "score": 50}
         
-        words = transcript.split()
-        avg_sentence_length = len(words) / len(sentences)
+        avg_sentence_length = document.word_count / sentence_count
         
         # Ideal: 15-20 words per sentence
         if 15 <= avg_sentence_length <= 20:
@@ -313,13 +424,13 @@ class AudioProcessor:
         
         return {
             "avg_sentence_length": round(avg_sentence_length, 1),
-            "sentence_count": len(sentences),
+            "sentence_count": sentence_count,
             "score": round(score, 1)
         }
     
-    def analyze_confidence(self, transcript: str) -> Dict:
+    def analyze_confidence(self, document: TranscriptDocument) -> Dict:
         """Analyze confidence vs hedging language"""
-        transcript_lower = transcript.lower()
+        transcript_lower = document.lower
         
         hedging_count = 0
         for pattern in self.hedging_phrases:
@@ -355,40 +466,75 @@ class AudioProcessor:
             "score": round(score, 1)
         }
     
-    async def process_audio(self, video_path: str) -> Dict:
-        """Main audio processing pipeline"""
+    async def process_audio(self, video_path: str, audio_path: Optional[str] = None,
+                            tier: Optional[ProcessingTier] = None) -> Dict:
+        """Main audio processing pipeline
+        
+        `audio_path` may point to audio already demuxed by MediaIngestor; otherwise
+        the audio track is extracted from `video_path`.
+        """
+        sample_rate = tier.audio_sample_rate if tier else 16000
+        asr_model = tier.asr_model if tier else "whisper-1"
+        
         # Extract audio
-        audio_path = await self.extract_audio_from_video(video_path)
+        if audio_path is None:
+            audio_path = await self.extract_audio_from_video(video_path, sample_rate)
         
         # Get duration
-        y, sr = librosa.load(audio_path, sr=None)
-        duration = librosa.get_duration(y=y, sr=sr)
+        duration = self.measure_duration(audio_path)
         
         # Transcribe
-        transcript_data = await self.transcribe_audio(audio_path)
-        transcript = transcript_data["transcript"]
+        transcript_data = await self.transcribe_audio(audio_path, asr_model)
         
         # Analyze all parameters
-        speaking_rate = self.calculate_speaking_rate(transcript, duration)
-        pitch_analysis = self.analyze_pitch(audio_path)
-        volume_analysis = self.analyze_volume(audio_path)
-        pause_analysis = self.detect_pauses(audio_path, transcript_data)
-        filler_analysis = self.detect_fillers(transcript)
-        clarity_analysis = self.analyze_clarity(transcript)
-        confidence_analysis = self.analyze_confidence(transcript)
+        features = {
+            **self.analyze_transcript(TranscriptDocument(transcript_data["transcript"]), duration),
+            **self.analyze_acoustics(audio_path, transcript_data, duration, tier)
+        }
         
         # Clean up audio file
         if os.path.exists(audio_path):
             os.remove(audio_path)
         
+        return features
+    
+    def measure_duration(self, audio_path: str) -> float:
+        """Duration of an audio file in seconds"""
+        y, sr = librosa.load(audio_path, sr=None)
+        return librosa.get_duration(y=y, sr=sr)
+    
+    def analyze_acoustics(self, audio_path: str, transcript_data: Dict, duration: float,
+                          tier: Optional[ProcessingTier] = None,
+                          token: Optional[CancellationToken] = None) -> Dict:
+        """Signal features (pitch, volume, pauses) that can be computed once the transcript is known
+        
+        Split from process_audio so the pipeline can checkpoint the transcript
+        separately and never re-run Whisper because a later step failed. `token`
+        is checked between the signal analyses.
+        """
+        check = token.check if token else (lambda: None)
+        pitch_time_step = tier.pitch_time_step if tier else 0.0
+        
+        pitch_analysis = self.analyze_pitch(audio_path, pitch_time_step)
+        check()
+        volume_analysis = self.analyze_volume(audio_path)
+        check()
+        pause_analysis = self.detect_pauses(audio_path, transcript_data)
+        check()
+        
         return {
-            "transcript": transcript,
-            "duration": round(duration, 1),
-            "speaking_rate": speaking_rate,
             "pitch": pitch_analysis,
             "volume": volume_analysis,
-            "pauses": pause_analysis,
-            "fillers": filler_analysis,
-            "clarity": clarity_analysis,
-            "confidence": confidence_analysis
-        }
\ No newline at end of file
+            "pauses": pause_analysis
+        }
+    
+    def analyze_transcript(self, document: TranscriptDocument, duration: float) -> Dict:
+        """Speech features read from the transcript alone (rate, fillers, clarity, confidence)"""
+        return {
+            "transcript": document.text,
+            "duration": round(duration, 1),
+            "speaking_rate": self.calculate_speaking_rate(document, duration),
+            "fillers": self.detect_fillers(document),
+            "clarity": self.analyze_clarity(document),
+            "confidence": self.analyze_confidence(document)
+        }
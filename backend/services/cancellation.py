@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class JobCancelled(Exception):
+    """The assessment was cancelled by the user"""
+
+
+class StageTimeout(Exception):
+    """A pipeline stage ran past its deadline"""
+
+
+# Per-stage budget: (base seconds, seconds per second of media)
+STAGE_BUDGETS: Dict[str, Tuple[float, float]] = {
+    "ingest": (120, 1.0),
+    "video_landmarks": (120, 4.0),
+    "audio_extraction": (60, 0.5),
+    "transcription": (120, 1.0),
+    "acoustic_features": (60, 1.0),
+    "nlp": (30, 0.2),
+    "scoring": (30, 0.0),
+    "report": (120, 0.0),
+}
+
+# Assumed media length until the real duration is known
+DEFAULT_MEDIA_SECONDS = float(os.getenv("STAGE_DEFAULT_MEDIA_SECONDS", "600"))
+STAGE_TIMEOUT_SCALE = float(os.getenv("STAGE_TIMEOUT_SCALE", "1"))
+
+
+def stage_budget(stage: str, media_seconds: Optional[float] = None) -> float:
+    """Seconds a stage may run for media of the given length"""
+    base, per_second = STAGE_BUDGETS[stage]
+    return (base + per_second * (media_seconds or DEFAULT_MEDIA_SECONDS)) * STAGE_TIMEOUT_SCALE
+
+
+class CancellationToken:
+    """Cooperative stop signal shared by a job's coroutine and its worker threads
+
+    Long-running loops call check() between frames or analysis windows; it raises
+    JobCancelled once cancel() was called and StageTimeout once the current stage's
+    deadline has passed. Callbacks registered with on_cancel (e.g. killing ffmpeg)
+    run when the token fires, so blocked I/O is interrupted too.
+    """
+
+    def __init__(self):
+        self._error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.stage: Optional[str] = None
+        self.deadline: Optional[float] = None
+
+    @property
+    def fired(self) -> bool:
+        return self._error is not None
+
+    def start_stage(self, stage: str, budget_seconds: float):
+        self.stage = stage
+        self.deadline = time.monotonic() + budget_seconds
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the current stage"""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def on_cancel(self, callback: Callable[[], None]):
+        with self._lock:
+            if self._error is None:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def _fire(self, error: Exception):
+        with self._lock:
+            if self._error is not None:
+                return
+            self._error = error
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Warning: cancellation callback failed: {e}")
+
+    def cancel(self, reason: str = "Assessment cancelled"):
+        self._fire(JobCancelled(reason))
+
+    def expire_if_overdue(self) -> bool:
+        """Fire a StageTimeout if the current stage has run out of time"""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self._fire(StageTimeout(f"Stage '{self.stage}' exceeded its time limit"))
+        return self.fired
+
+    def check(self):
+        """Raise if the job should stop"""
+        self.expire_if_overdue()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,45 @@
+import hashlib
+from typing import Iterable
+
+# Content hashes are built from SHA-256 digests of fixed 10MB blocks, the same size as
+# upload chunks, so a chunked upload can derive the hash from its per-chunk digests
+BLOCK_SIZE = 10 * 1024 * 1024
+
+
+def combine_block_digests(block_digests: Iterable[str]) -> str:
+    """Content hash from the hex SHA-256 digests of consecutive blocks, in order"""
+    combined = hashlib.sha256()
+    for digest in block_digests:
+        combined.update(bytes.fromhex(digest))
+    return combined.hexdigest()
+
+
+class ContentHasher:
+    """Incrementally computes the block-based content hash of a byte stream"""
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self._block = hashlib.sha256()
+        self._block_bytes = 0
+        self._block_digests = []
+
+    def update(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.block_size - self._block_bytes)
+            self._block.update(view[:take])
+            self._block_bytes += take
+            view = view[take:]
+            if self._block_bytes == self.block_size:
+                self._finish_block()
+
+    def _finish_block(self):
+        self._block_digests.append(self._block.hexdigest())
+        self._block = hashlib.sha256()
+        self._block_bytes = 0
+
+    def hexdigest(self) -> str:
+        digests = list(self._block_digests)
+        if self._block_bytes or not digests:
+            digests.append(self._block.hexdigest())
+        return combine_block_digests(digests)
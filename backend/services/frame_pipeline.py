@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+# Queue sentinel marking the end of the frame stream
+_END = object()
+
+
+class _DecodeFailure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class FramePipeline:
+    """Overlaps frame decoding with inference
+
+    A decoder thread pulls frames from `source`, applies `preprocess` and fills a
+    bounded queue; iterating the pipeline drains it on the caller's thread. The
+    queue bound provides backpressure so decoded frames never pile up in memory.
+    Both OpenCV/ffmpeg reads and MediaPipe inference release the GIL.
+    """
+
+    def __init__(self, source: Iterable[np.ndarray],
+                 preprocess: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 max_queue: int = 8):
+        self.source = source
+        self.preprocess = preprocess
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            "frames": 0,
+            "decode_s": 0.0,           # decoder thread: reading + preprocessing
+            "decode_blocked_s": 0.0,   # decoder thread: waiting for queue space (backpressure)
+            "inference_s": 0.0,        # consumer: time spent on each frame
+            "inference_wait_s": 0.0    # consumer: waiting for a decoded frame
+        }
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        self._thread = threading.Thread(target=self._produce, name="frame-decoder", daemon=True)
+        self._thread.start()
+
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                item = self._queue.get()
+                self.stats["inference_wait_s"] += time.perf_counter() - wait_start
+
+                if item is _END:
+                    return
+                if isinstance(item, _DecodeFailure):
+                    raise item.error
+
+                work_start = time.perf_counter()
+                yield item
+                self.stats["inference_s"] += time.perf_counter() - work_start
+        finally:
+            self.close()
+
+    def _produce(self):
+        iterator = iter(self.source)
+        try:
+            while not self._stop.is_set():
+                decode_start = time.perf_counter()
+                try:
+                    frame = next(iterator)
+                except StopIteration:
+                    break
+                if self.preprocess:
+                    frame = self.preprocess(frame)
+                self.stats["decode_s"] += time.perf_counter() - decode_start
+
+                if not self._put(frame):
+                    return
+                self.stats["frames"] += 1
+        except Exception as e:
+            self._put(_DecodeFailure(e))
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+        self._put(_END)
+
+    def _put(self, item) -> bool:
+        """Block until there is queue space; gives up once the pipeline is closed"""
+        blocked_start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.stats["decode_blocked_s"] += time.perf_counter() - blocked_start
+
+    def close(self):
+        """Stop the decoder thread and drop any frames still queued"""
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def timing(self) -> Dict:
+        """Rounded per-stage timing for reporting"""
+        return {
+            key: round(value, 3) if isinstance(value, float) else value
+            for key, value in self.stats.items()
+        }
@@ -0,0 +1,101 @@
+import struct
+import threading
+import time
+from typing import BinaryIO, Callable, Iterator, Optional
+
+from services.content_hash import ContentHasher
+
+
+def is_streamable_mp4(f: BinaryIO, available: int) -> Optional[bool]:
+    """Whether an MP4/MOV can be demuxed front to back, from its top-level box layout
+
+    True for faststart files (moov before mdat) and fragmented files (moof boxes),
+    False when media data comes before the metadata, and None when the first
+    `available` bytes are not enough to tell. Only box headers are read.
+    """
+    offset = 0
+    seen_moov = False
+    while offset + 8 <= available:
+        f.seek(offset)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        if size == 1:
+            if offset + 16 > available:
+                return None
+            size = struct.unpack(">Q", f.read(8))[0]
+
+        if box_type == b"moof":
+            return True
+        if box_type == b"mdat":
+            return seen_moov
+        if box_type == b"moov":
+            seen_moov = True
+
+        if size < 8:
+            # Size 0 means the box runs to end of file; anything else is corrupt
+            return seen_moov if size == 0 else False
+        offset += size
+
+    return None
+
+
+class GrowingFileSource:
+    """Streams the contiguous, already-received prefix of an upload that is still arriving
+
+    `available_bytes` reports how many leading bytes of `path` are complete; it should
+    raise if the upload has been abandoned. Iteration ends once `total_size` bytes
+    have been read, and the bytes read are hashed on the way into `content_hash`.
+    """
+
+    def __init__(self, path: str, total_size: int, available_bytes: Callable[[], int],
+                 poll_interval: float = 0.25, stall_timeout: float = 600, read_size: int = 1024 * 1024):
+        self.path = path
+        self.total_size = total_size
+        self.available_bytes = available_bytes
+        self.poll_interval = poll_interval
+        self.stall_timeout = stall_timeout
+        self.read_size = read_size
+        self.content_hash = None
+        self.completed = False
+        self._cancelled = threading.Event()
+
+    def read_prefix(self, limit: int) -> bytes:
+        """Up to `limit` bytes of the received prefix (for header probing)"""
+        length = min(limit, self.available_bytes())
+        with open(self.path, "rb") as f:
+            return f.read(length)
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        position = 0
+        last_progress = time.monotonic()
+        hasher = ContentHasher()
+        with open(self.path, "rb") as f:
+            while position < self.total_size:
+                if self._cancelled.is_set():
+                    raise Exception("Incremental ingest cancelled")
+
+                available = min(self.available_bytes(), self.total_size)
+                if available <= position:
+                    if time.monotonic() - last_progress > self.stall_timeout:
+                        raise Exception("Upload stalled during incremental ingest")
+                    self._cancelled.wait(self.poll_interval)
+                    continue
+
+                data = f.read(min(self.read_size, available - position))
+                position += len(data)
+                last_progress = time.monotonic()
+                hasher.update(data)
+                yield data
+
+        self.content_hash = hasher.hexdigest()
+        self.completed = True
+
+    def wait_complete(self):
+        """Block until the upload has fully arrived"""
+        # Raises if the upload was abandoned
+        while self.available_bytes() < self.total_size:
+            if self._cancelled.wait(self.poll_interval):
+                raise Exception("Incremental ingest cancelled")
+        self.completed = True
+
+    def cancel(self):
+        self._cancelled.set()
@@ -0,0 +1,247 @@
+import json
+import os
+import subprocess
+import tempfile
+import threading
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+
+class DemuxSession:
+    """One running ffmpeg pass writing analysis audio to disk and raw frames to a pipe"""
+
+    def __init__(self, process: subprocess.Popen, audio_path: Optional[str], width: int, height: int,
+                 fps: float, stderr_file, input_source=None):
+        self.process = process
+        self.audio_path = audio_path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._stderr_file = stderr_file
+        self._input_source = input_source
+        self._feed_error = None
+        self._feeder = None
+
+        if input_source is not None:
+            self._feeder = threading.Thread(target=self._feed, name="demux-feeder", daemon=True)
+            self._feeder.start()
+
+    def _feed(self):
+        """Pipe the input into ffmpeg's stdin as it becomes available"""
+        try:
+            for data in self._input_source.iter_bytes():
+                self.process.stdin.write(data)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            self._feed_error = e
+            # Stop ffmpeg so the frame consumer does not wait for input that will never come
+            self.process.kill()
+        finally:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+
+    def frames(self) -> Iterator[np.ndarray]:
+        """Yield downscaled RGB frames as ffmpeg produces them"""
+        frame_bytes = self.width * self.height * 3
+        stdout = self.process.stdout
+
+        while True:
+            buffer = bytearray(frame_bytes)
+            view = memoryview(buffer)
+            read = 0
+            while read < frame_bytes:
+                n = stdout.readinto(view[read:])
+                if not n:
+                    break
+                read += n
+
+            if read < frame_bytes:
+                # End of stream (a trailing partial frame is dropped)
+                return
+
+            yield np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def wait(self) -> Optional[str]:
+        """Wait for the pass to finish and return the extracted audio path"""
+        # Drain any frames the video consumer did not read so ffmpeg can finish the audio
+        for _ in self.frames():
+            pass
+
+        return_code = self.process.wait()
+        if self._feeder:
+            self._feeder.join()
+        if self._feed_error:
+            raise self._feed_error
+        if return_code != 0:
+            raise Exception(f"Media demux failed: {self._read_stderr()}")
+
+        if self.audio_path is None:
+            raise Exception("Failed to extract audio: video has no audio stream")
+
+        return self.audio_path
+
+    def close(self):
+        """Stop ffmpeg if it is still running and release handles"""
+        if self._input_source is not None:
+            self._input_source.cancel()
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        if self._feeder:
+            self._feeder.join(timeout=5)
+        if self.process.stdout:
+            self.process.stdout.close()
+        self._stderr_file.close()
+
+    def _read_stderr(self) -> str:
+        self._stderr_file.seek(0)
+        return self._stderr_file.read().decode(errors="replace").strip()[-2000:]
+
+
+class MediaIngestor:
+    """Demuxes an upload once into analysis-rate mono PCM and a low-resolution frame stream"""
+
+    # Bytes of a still-arriving upload handed to ffprobe
+    PROBE_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, sample_rate: int = 16000, analysis_width: int = 640):
+        self.sample_rate = sample_rate
+        self.analysis_width = analysis_width
+
+    def probe(self, video_path: str, header: Optional[bytes] = None) -> Dict:
+        """Read stream geometry and duration with ffprobe (container header only)
+
+        When `header` is given it is probed from stdin instead of reading `video_path`.
+        """
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-print_format", "json",
+                "-show_streams", "-show_format",
+                "pipe:0" if header is not None else video_path
+            ],
+            input=header,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True
+        )
+        info = json.loads(result.stdout)
+
+        video_stream = next((s for s in info.get("streams", []) if s.get("codec_type") == "video"), None)
+        audio_stream = next((s for s in info.get("streams", []) if s.get("codec_type") == "audio"), None)
+
+        if video_stream is None:
+            raise Exception("No video stream found")
+
+        width = int(video_stream["width"])
+        height = int(video_stream["height"])
+
+        # ffmpeg auto-rotates, so report display geometry
+        rotation = int(video_stream.get("tags", {}).get("rotate", 0) or 0)
+        for side_data in video_stream.get("side_data_list", []):
+            if "rotation" in side_data:
+                rotation = int(side_data["rotation"])
+        if abs(rotation) % 180 == 90:
+            width, height = height, width
+
+        return {
+            "width": width,
+            "height": height,
+            "duration": float(info.get("format", {}).get("duration", 0) or 0),
+            "has_audio": audio_stream is not None
+        }
+
+    def analysis_size(self, width: int, height: int, analysis_width: Optional[int] = None) -> tuple:
+        """Downscaled frame size, never upscaling and keeping dimensions even"""
+        target_width = min(analysis_width or self.analysis_width, width)
+        target_height = int(round(height * target_width / width))
+        return target_width - target_width % 2, max(2, target_height - target_height % 2)
+
+    def create_analysis_proxy(self, video_path: str, fps: float = 10, crf: int = 30,
+                              analysis_width: Optional[int] = None, sample_rate: Optional[int] = None,
+                              output_base: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        """Transcode to a compact analysis copy (low-res H.264 + 16 kHz mono FLAC)
+
+        The proxy is written next to `video_path`, or to `output_base` + ".proxy.mkv"
+        when the input is a URL. ffmpeg is killed if it runs longer than `timeout`.
+        """
+        info = self.probe(video_path)
+        width, height = self.analysis_size(info["width"], info["height"], analysis_width)
+        proxy_path = f"{output_base or os.path.splitext(video_path)[0]}.proxy.mkv"
+
+        command = [
+            "ffmpeg", "-nostdin", "-v", "error", "-y", "-i", video_path,
+            "-map", "0:v:0",
+            "-vf", f"fps={fps},scale={width}:{height}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-crf", str(crf),
+            "-pix_fmt", "yuv420p"
+        ]
+        if info["has_audio"]:
+            command += [
+                "-map", "0:a:0",
+                "-ac", "1", "-ar", str(sample_rate or self.sample_rate), "-c:a", "flac"
+            ]
+        command.append(proxy_path)
+
+        try:
+            result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            if os.path.exists(proxy_path):
+                os.remove(proxy_path)
+            raise Exception(f"Proxy transcode exceeded {timeout:.0f}s")
+        if result.returncode != 0:
+            if os.path.exists(proxy_path):
+                os.remove(proxy_path)
+            raise Exception(f"Proxy transcode failed: {result.stderr.decode(errors='replace').strip()[-2000:]}")
+
+        return proxy_path
+
+    def open(self, video_path: str, fps: float = 2, analysis_width: Optional[int] = None,
+             sample_rate: Optional[int] = None, input_source=None,
+             output_base: Optional[str] = None) -> DemuxSession:
+        """Start a single ffmpeg pass feeding both the audio and video consumers
+
+        With `input_source` (a GrowingFileSource), the still-arriving upload is probed
+        from its received prefix and piped into ffmpeg's stdin. The audio is written
+        next to `video_path`, or to `output_base` + ".wav" when the input is a URL.
+        """
+        if input_source is not None:
+            info = self.probe(video_path, header=input_source.read_prefix(self.PROBE_BYTES))
+        else:
+            info = self.probe(video_path)
+        width, height = self.analysis_size(info["width"], info["height"], analysis_width)
+
+        command = [
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-i", "pipe:0" if input_source is not None else video_path
+        ]
+
+        audio_path = None
+        if info["has_audio"]:
+            audio_path = f"{output_base or os.path.splitext(video_path)[0]}.wav"
+            command += [
+                "-map", "0:a:0", "-vn",
+                "-ac", "1", "-ar", str(sample_rate or self.sample_rate),
+                "-c:a", "pcm_s16le", "-f", "wav", audio_path
+            ]
+
+        command += [
+            "-map", "0:v:0", "-an",
+            "-vf", f"fps={fps},scale={width}:{height}",
+            "-pix_fmt", "rgb24", "-f", "rawvideo", "pipe:1"
+        ]
+
+        stderr_file = tempfile.TemporaryFile()
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE if input_source is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            bufsize=width * height * 3
+        )
+
+        return DemuxSession(process, audio_path, width, height, fps, stderr_file, input_source)
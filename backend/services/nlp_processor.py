@@ -1,107 +1,214 @@
 import re
+import queue
+import threading
 import nltk
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
 import textstat
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab', quiet=True)
+from services.transcript_document import SentenceStream, TranscriptDocument
 
+# Download required NLTK data
 try:
     nltk.data.find('taggers/averaged_perceptron_tagger')
 except LookupError:
     nltk.download('averaged_perceptron_tagger', quiet=True)
 
+# Lowercase word tokens the story markers are matched against
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+DIGIT_PATTERN = re.compile(r'\d')
+
+PREVIEW_LENGTH = 200
+
+class PhraseMatcher:
+    """Counts marker phrases per category in one pass over a token stream
+    
+    Phrases are indexed by their first word, so each token only checks the few
+    phrases that can start there. A phrase may belong to several categories
+    (e.g. 'learned' is both a story indicator and a resolution marker).
+    """
+    
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = list(categories)
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        for category, phrases in categories.items():
+            for phrase in phrases:
+                words = tuple(phrase.split())
+                self._phrases.setdefault(words[0], []).append((words, category))
+    
+    def count(self, tokens: List[str]) -> Dict[str, int]:
+        counts = dict.fromkeys(self.categories, 0)
+        for i, token in enumerate(tokens):
+            for words, category in self._phrases.get(token, ()):
+                if len(words) == 1 or tuple(tokens[i:i + len(words)]) == words:
+                    counts[category] += 1
+        return counts
+
+class StoryFeatures:
+    """Feature counts for one story, accumulated sentence by sentence"""
+    
+    def __init__(self, start_sentence: int):
+        self.start_sentence = start_sentence
+        self.end_sentence = start_sentence
+        self.sentence_count = 0
+        self.counts: Dict[str, int] = {}
+        self.preview = ""
+    
+    def add(self, index: int, sentence: str, features: Dict[str, int]):
+        self.end_sentence = index
+        self.sentence_count += 1
+        for name, value in features.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+        # Only a preview of the text is kept, so long stories cost constant memory
+        if len(self.preview) <= PREVIEW_LENGTH:
+            self.preview = f"{self.preview} {sentence}" if self.preview else sentence
+    
+    def __getitem__(self, name: str) -> int:
+        return self.counts.get(name, 0)
+
+class StorySegmenter:
+    """Story segmentation state, advanced one sentence at a time
+    
+    A story opens at a sentence with a story indicator and runs until the
+    sentence before a topic shift ('now', 'today', 'currently', 'in summary').
+    """
+    
+    def __init__(self, processor: "NLPProcessor"):
+        self.processor = processor
+        self.stories: List[StoryFeatures] = []
+        self.current: Optional[StoryFeatures] = None
+        self.sentence_count = 0
+    
+    def add_sentence(self, sentence: str, sentence_lower: Optional[str] = None):
+        index = self.sentence_count
+        self.sentence_count += 1
+        features = self.processor.sentence_features(sentence, sentence_lower)
+        topic_shift = features.pop("topic_shift") > 0
+        story_indicator = features.pop("story_indicator") > 0
+        
+        # End story if transition to different topic
+        if self.current is not None and topic_shift:
+            self.stories.append(self.current)
+            self.current = None
+        
+        if self.current is None and story_indicator:
+            self.current = StoryFeatures(index)
+        if self.current is not None:
+            self.current.add(index, sentence, features)
+    
+    def finish(self) -> List[StoryFeatures]:
+        # Add last segment if exists
+        if self.current is not None:
+            self.stories.append(self.current)
+            self.current = None
+        return self.stories
+
+class IncrementalNLP:
+    """Storytelling analysis that consumes transcript segments as they arrive
+    
+    Segments are queued and analysed on a background thread, so the analysis keeps
+    up with transcription (or overlaps the stages after it). finish() only closes
+    the last sentence and scores the stories already accumulated.
+    """
+    
+    def __init__(self, processor: "NLPProcessor"):
+        self.processor = processor
+        self.sentence_stream = SentenceStream()
+        self.segmenter = StorySegmenter(processor)
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._consume, name="incremental-nlp", daemon=True)
+        self._thread.start()
+    
+    @property
+    def sentences(self) -> List[str]:
+        """Sentences found so far (all of them once finish() returned)"""
+        return self.sentence_stream.sentences
+    
+    def add_segment(self, text: str):
+        self._queue.put(text)
+    
+    def _consume(self):
+        while True:
+            text = self._queue.get()
+            if text is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                for sentence in self.sentence_stream.feed(text):
+                    self.segmenter.add_sentence(sentence)
+            except Exception as e:
+                self._error = e
+    
+    def close(self):
+        """Stop the background thread without producing features"""
+        self._queue.put(None)
+    
+    def finish(self, duration: float) -> Dict:
+        """NLP features once the last segment was added (blocks until the queue is drained)"""
+        self.close()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        for sentence in self.sentence_stream.close():
+            self.segmenter.add_sentence(sentence)
+        stories = self.segmenter.finish()
+        return self.processor.summarize_stories(stories, self.segmenter.sentence_count, duration)
+
 class NLPProcessor:
     def __init__(self):
-        self.story_indicators = [
-            r'\b(story|time|remember|once|when i|happened|experience|situation)\b',
-            r'\b(challenge|problem|issue|faced|difficult)\b',
-            r'\b(learned|realized|understood|discovered)\b'
-        ]
-        
-        self.temporal_connectors = [
-            'then', 'next', 'after', 'before', 'when', 'while',
-            'during', 'finally', 'eventually', 'first', 'second'
-        ]
-        
-        self.causal_connectors = [
-            'because', 'so', 'therefore', 'thus', 'as a result',
-            'consequently', 'due to', 'since', 'leading to'
-        ]
+        self.markers = PhraseMatcher({
+            "story_indicator": [
+                'story', 'time', 'remember', 'once', 'when i', 'happened', 'experience', 'situation',
+                'challenge', 'problem', 'issue', 'faced', 'difficult',
+                'learned', 'realized', 'understood', 'discovered'
+            ],
+            "topic_shift": ['now', 'today', 'currently', 'in summary'],
+            "setup": ['when i', 'i was', 'we were', 'situation', 'time', 'once'],
+            "conflict": ['challenge', 'problem', 'difficult', 'issue', 'struggled', 'failed'],
+            "resolution": ['so i', 'then i', 'we decided', 'result', 'learned', 'realized', 'eventually'],
+            "temporal": [
+                'then', 'next', 'after', 'before', 'when', 'while',
+                'during', 'finally', 'eventually', 'first', 'second'
+            ],
+            "causal": [
+                'because', 'so', 'therefore', 'thus', 'as a result',
+                'consequently', 'due to', 'since', 'leading to'
+            ],
+            "first_person": ['i', 'my', 'we'],
+            "learning": ['learned', 'realized', 'understood', 'discovered', 'taught me'],
+            "concrete": [
+                'team', 'teams', 'project', 'projects', 'meeting', 'meetings', 'client', 'clients',
+                'product', 'products', 'office', 'offices', 'data'
+            ]
+        })
     
-    def detect_story_segments(self, transcript: str) -> List[Dict]:
-        """Detect story segments in transcript"""
-        sentences = nltk.sent_tokenize(transcript)
-        
-        story_segments = []
-        current_segment = []
-        in_story = False
-        
-        for i, sentence in enumerate(sentences):
+    def sentence_features(self, sentence: str, sentence_lower: Optional[str] = None) -> Dict[str, int]:
+        """Every count the story analyses need, from a single scan of one sentence"""
+        if sentence_lower is None:
             sentence_lower = sentence.lower()
-            
-            # Check for story indicators
-            has_indicator = any(re.search(pattern, sentence_lower) for pattern in self.story_indicators)
-            
-            if has_indicator or in_story:
-                current_segment.append(sentence)
-                in_story = True
-                
-                # Check if story ends (new topic or conclusion)
-                if i < len(sentences) - 1:
-                    next_sentence = sentences[i + 1].lower()
-                    # End story if transition to different topic
-                    if any(word in next_sentence for word in ['now', 'today', 'currently', 'in summary']):
-                        story_segments.append({
-                            "text": " ".join(current_segment),
-                            "start_sentence": i - len(current_segment) + 1,
-                            "end_sentence": i
-                        })
-                        current_segment = []
-                        in_story = False
-            else:
-                if current_segment:
-                    story_segments.append({
-                        "text": " ".join(current_segment),
-                        "start_sentence": i - len(current_segment),
-                        "end_sentence": i - 1
-                    })
-                    current_segment = []
-                in_story = False
-        
-        # Add last segment if exists
-        if current_segment:
-            story_segments.append({
-                "text": " ".join(current_segment),
-                "start_sentence": len(sentences) - len(current_segment),
-                "end_sentence": len(sentences) - 1
-            })
-        
-        return story_segments
+        features = self.markers.count(TOKEN_PATTERN.findall(sentence_lower))
+        
+        words = sentence.split()
+        features["words"] = len(words)
+        # Capitalized words (proper nouns) and numbers
+        features["capitalized"] = sum(1 for word in words if word[0].isupper() and len(word) > 2)
+        features["numbers"] = sum(1 for word in words if DIGIT_PATTERN.search(word))
+        features["syllables"] = textstat.syllable_count(sentence) if words else 0
+        return features
+    
+    def detect_story_segments(self, document: TranscriptDocument) -> List[StoryFeatures]:
+        """Detect story segments in transcript, with their features"""
+        segmenter = StorySegmenter(self)
+        for sentence, sentence_lower in zip(document.sentences, document.sentences_lower):
+            segmenter.add_sentence(sentence, sentence_lower)
+        return segmenter.finish()
     
-    def analyze_narrative_structure(self, story_text: str) -> Dict:
+    def analyze_narrative_structure(self, story: StoryFeatures) -> Dict:
         """Analyze beginning-middle-end structure"""
-        story_lower = story_text.lower()
-        
-        # Look for setup phrases
-        setup_markers = ['when i', 'i was', 'we were', 'situation', 'time', 'once']
-        has_setup = any(marker in story_lower for marker in setup_markers)
-        
-        # Look for conflict/challenge
-        conflict_markers = ['challenge', 'problem', 'difficult', 'issue', 'struggled', 'failed']
-        has_conflict = any(marker in story_lower for marker in conflict_markers)
-        
-        # Look for resolution
-        resolution_markers = ['so i', 'then i', 'we decided', 'result', 'learned', 'realized', 'eventually']
-        has_resolution = any(marker in story_lower for marker in resolution_markers)
+        has_setup = story["setup"] > 0
+        has_conflict = story["conflict"] > 0
+        has_resolution = story["resolution"] > 0
         
         # Score based on presence of elements
         structure_score = 0
@@ -120,18 +227,22 @@ class NLPProcessor:
             "score": structure_score
         }
     
-    def analyze_cognitive_ease(self, story_text: str) -> Dict:
+    def analyze_cognitive_ease(self, story: StoryFeatures) -> Dict:
         """Analyze readability and flow"""
-        # Readability score
-        flesch_score = textstat.flesch_reading_ease(story_text)
+        word_count = story["words"]
+        
+        # Readability score (Flesch reading ease)
+        if word_count > 0:
+            flesch_score = (206.835 - 1.015 * (word_count / story.sentence_count)
+                            - 84.6 * (story["syllables"] / word_count))
+        else:
+            flesch_score = 0
         
         # Count connectors
-        story_lower = story_text.lower()
-        temporal_count = sum(story_lower.count(word) for word in self.temporal_connectors)
-        causal_count = sum(story_lower.count(word) for word in self.causal_connectors)
+        temporal_count = story["temporal"]
+        causal_count = story["causal"]
         
         total_connectors = temporal_count + causal_count
-        word_count = len(story_text.split())
         connector_ratio = (total_connectors / word_count * 100) if word_count > 0 else 0
         
         # Score: good readability (60-80 Flesch) + decent connectors (5-15%)
@@ -150,18 +261,12 @@ class NLPProcessor:
             "score": round(score, 1)
         }
     
-    def analyze_self_disclosure(self, story_text: str) -> Dict:
+    def analyze_self_disclosure(self, story: StoryFeatures) -> Dict:
         """Detect personal storytelling and learning"""
-        story_lower = story_text.lower()
+        first_person_count = story["first_person"]
+        learning_count = story["learning"]
         
-        # First-person markers
-        first_person_count = story_lower.count(' i ') + story_lower.count(' my ') + story_lower.count(' we ')
-        
-        # Learning statements
-        learning_markers = ['learned', 'realized', 'understood', 'discovered', 'taught me']
-        learning_count = sum(story_lower.count(marker) for marker in learning_markers)
-        
-        word_count = len(story_text.split())
+        word_count = story["words"]
         first_person_ratio = (first_person_count / word_count * 100) if word_count > 0 else 0
         
         # Score based on personal narrative
@@ -181,23 +286,14 @@ class NLPProcessor:
             "score": round(score, 1)
         }
     
-    def analyze_memorability(self, story_text: str) -> Dict:
+    def analyze_memorability(self, story: StoryFeatures) -> Dict:
         """Analyze specificity and imagery"""
-        # Named entity detection (simple)
-        words = story_text.split()
-        
-        # Detect capitalized words (proper nouns)
-        capitalized = sum(1 for word in words if word[0].isupper() and len(word) > 2)
-        
-        # Detect numbers
-        numbers = sum(1 for word in words if any(char.isdigit() for char in word))
-        
-        # Concrete nouns (simplified - look for common concrete words)
-        concrete_words = ['team', 'project', 'meeting', 'client', 'product', 'office', 'data']
-        concrete_count = sum(story_text.lower().count(word) for word in concrete_words)
+        capitalized = story["capitalized"]
+        numbers = story["numbers"]
+        concrete_count = story["concrete"]
         
         specificity_score = capitalized + numbers + concrete_count
-        word_count = len(words)
+        word_count = story["words"]
         specificity_ratio = (specificity_score / word_count * 100) if word_count > 0 else 0
         
         # Good: 10-20% specificity
@@ -218,9 +314,9 @@ class NLPProcessor:
             "score": round(score, 1)
         }
     
-    def analyze_story_metrics(self, story_text: str, total_duration: float) -> Dict:
+    def analyze_story_metrics(self, story: StoryFeatures, total_duration: float) -> Dict:
         """Analyze story length and pacing"""
-        word_count = len(story_text.split())
+        word_count = story["words"]
         
         # Estimate story duration (assuming 150 WPM)
         estimated_duration = (word_count / 150) * 60  # in seconds
@@ -243,12 +339,22 @@ class NLPProcessor:
             "score": round(score, 1)
         }
     
-    def process_nlp(self, transcript: str, duration: float) -> Dict:
-        """Main NLP processing pipeline"""
-        # Detect story segments
-        story_segments = self.detect_story_segments(transcript)
-        
-        if len(story_segments) == 0:
+    def analyze_story(self, story: StoryFeatures, total_duration: float) -> Dict:
+        """All analyses for one story, with their average as the story's score"""
+        analyses = {
+            "narrative_structure": self.analyze_narrative_structure(story),
+            "cognitive_ease": self.analyze_cognitive_ease(story),
+            "self_disclosure": self.analyze_self_disclosure(story),
+            "memorability": self.analyze_memorability(story),
+            "story_metrics": self.analyze_story_metrics(story, total_duration)
+        }
+        score = sum(analysis["score"] for analysis in analyses.values()) / len(analyses)
+        return {**analyses, "score": round(score, 1)}
+    
+    def summarize_stories(self, stories: Iterable[StoryFeatures], sentences_count: int, duration: float) -> Dict:
+        """NLP features from segmented stories"""
+        stories = list(stories)
+        if len(stories) == 0:
             return {
                 "has_story": False,
                 "story_count": 0,
@@ -260,19 +366,14 @@ class NLPProcessor:
                 "story_placement": {"score": 50}
             }
         
-        # Analyze the best story (longest segment)
-        best_story = max(story_segments, key=lambda s: len(s["text"]))
-        
-        # Run all analyses
-        narrative = self.analyze_narrative_structure(best_story["text"])
-        cognitive = self.analyze_cognitive_ease(best_story["text"])
-        disclosure = self.analyze_self_disclosure(best_story["text"])
-        memorability = self.analyze_memorability(best_story["text"])
-        metrics = self.analyze_story_metrics(best_story["text"], duration)
+        # Score every story and report the strongest (the longer one on a tie)
+        analyses = [self.analyze_story(story, duration) for story in stories]
+        best = max(range(len(stories)), key=lambda i: (analyses[i]["score"], stories[i]["words"]))
+        best_story = stories[best]
+        best_analysis = analyses[best]
         
         # Analyze placement
-        sentences_count = len(nltk.sent_tokenize(transcript))
-        story_position = best_story["start_sentence"] / sentences_count if sentences_count > 0 else 0
+        story_position = best_story.start_sentence / sentences_count if sentences_count > 0 else 0
         
         # Ideal: story in middle or end (30-80% through)
         if 0.3 <= story_position <= 0.8:
@@ -284,15 +385,33 @@ class NLPProcessor:
         
         return {
             "has_story": True,
-            "story_count": len(story_segments),
-            "best_story_text": best_story["text"][:200] + "...",  # Preview
-            "narrative_structure": narrative,
-            "cognitive_ease": cognitive,
-            "self_disclosure": disclosure,
-            "memorability": memorability,
-            "story_metrics": metrics,
+            "story_count": len(stories),
+            "best_story_text": best_story.preview[:PREVIEW_LENGTH] + "...",  # Preview
+            "narrative_structure": best_analysis["narrative_structure"],
+            "cognitive_ease": best_analysis["cognitive_ease"],
+            "self_disclosure": best_analysis["self_disclosure"],
+            "memorability": best_analysis["memorability"],
+            "story_metrics": best_analysis["story_metrics"],
             "story_placement": {
                 "position_ratio": round(story_position, 2),
                 "score": round(placement_score, 1)
-            }
+            },
+            "stories": [
+                {
+                    "start_sentence": story.start_sentence,
+                    "end_sentence": story.end_sentence,
+                    "word_count": story["words"],
+                    "score": analysis["score"]
+                }
+                for story, analysis in zip(stories, analyses)
+            ]
         }
+    
+    def start_incremental(self) -> IncrementalNLP:
+        """Analyzer to feed with transcript segments while transcription runs"""
+        return IncrementalNLP(self)
+    
+    def process_nlp(self, document: TranscriptDocument, duration: float) -> Dict:
+        """Main NLP processing pipeline"""
+        stories = self.detect_story_segments(document)
+        return self.summarize_stories(stories, document.sentence_count, duration)
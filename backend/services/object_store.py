@@ -0,0 +1,105 @@
+"""
+S3-compatible object storage for direct-to-bucket multipart uploads
+Configure with S3_BUCKET (and S3_ENDPOINT_URL for MinIO or another S3-compatible store);
+credentials come from the standard AWS environment variables.
+"""
+import os
+from typing import Dict, List, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Multipart uploads started by this service live here; only these are deleted once assessed
+UPLOAD_KEY_PREFIX = "uploads/"
+
+
+def batch_key_prefix(batch_id: str) -> str:
+    """Prefix under which a batch's videos are staged for /batch/{batch_id}/objects"""
+    return f"batches/{batch_id}/"
+
+
+class ObjectStore:
+    def __init__(self):
+        self.bucket = os.getenv("S3_BUCKET")
+        self.endpoint_url = os.getenv("S3_ENDPOINT_URL")
+        self.region = os.getenv("S3_REGION", "us-east-1")
+        self.upload_url_expires = int(os.getenv("S3_UPLOAD_URL_EXPIRES", "3600"))
+        # Processing streams the object with ranged reads, so the URL must outlive the job
+        self.read_url_expires = int(os.getenv("S3_READ_URL_EXPIRES", "21600"))
+        self._client = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.bucket)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=self.endpoint_url,
+                region_name=self.region,
+                # Path-style addressing works with MinIO and other local stand-ins
+                config=Config(signature_version="s3v4", s3={"addressing_style": "path"})
+            )
+        return self._client
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        """Start a multipart upload and return its upload ID"""
+        response = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=content_type
+        )
+        return response["UploadId"]
+
+    def presign_part_urls(self, key: str, upload_id: str, total_parts: int) -> List[str]:
+        """Presigned PUT URLs for parts 1..total_parts"""
+        return [
+            self.client.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": self.bucket, "Key": key, "UploadId": upload_id, "PartNumber": part_number},
+                ExpiresIn=self.upload_url_expires
+            )
+            for part_number in range(1, total_parts + 1)
+        ]
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: List[Dict]):
+        """Assemble the uploaded parts; `parts` holds PartNumber/ETag pairs"""
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])}
+        )
+
+    def list_uploaded_parts(self, key: str, upload_id: str) -> List[int]:
+        """Part numbers the store has already received"""
+        part_numbers = []
+        paginator = self.client.get_paginator("list_parts")
+        for page in paginator.paginate(Bucket=self.bucket, Key=key, UploadId=upload_id):
+            part_numbers.extend(part["PartNumber"] for part in page.get("Parts", []))
+        return sorted(part_numbers)
+
+    def abort_multipart_upload(self, key: str, upload_id: str):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    def object_size(self, key: str) -> Optional[int]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        except ClientError:
+            return None
+
+    def presign_read_url(self, key: str) -> str:
+        """Presigned GET URL; ffmpeg reads it with HTTP range requests"""
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=self.read_url_expires
+        )
+
+    def delete_object(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+# Singleton instance
+object_store = ObjectStore()
@@ -0,0 +1,46 @@
+from typing import Dict, Optional
+
+from models.assessment_models import ProcessingTier
+
+DEFAULT_TIER = "standard"
+
+# Named quality/latency trade-offs selectable per upload
+PROCESSING_TIERS: Dict[str, ProcessingTier] = {
+    "fast": ProcessingTier(
+        name="fast",
+        description="Quick practice preview",
+        fps=1,
+        pose_model_complexity=0,
+        analysis_width=480,
+        audio_sample_rate=8000,
+        asr_model="gpt-4o-mini-transcribe",
+        pitch_time_step=0.05
+    ),
+    "standard": ProcessingTier(
+        name="standard",
+        description="Default assessment",
+        fps=2,
+        pose_model_complexity=1,
+        analysis_width=640,
+        audio_sample_rate=16000,
+        asr_model="whisper-1",
+        pitch_time_step=0.0
+    ),
+    "thorough": ProcessingTier(
+        name="thorough",
+        description="Formal assessment at maximum fidelity",
+        fps=4,
+        pose_model_complexity=2,
+        analysis_width=960,
+        audio_sample_rate=16000,
+        asr_model="whisper-1",
+        pitch_time_step=0.0
+    )
+}
+
+def get_tier(name: Optional[str] = None) -> ProcessingTier:
+    """Look up a processing tier by name (defaults to standard)"""
+    tier = PROCESSING_TIERS.get((name or DEFAULT_TIER).lower())
+    if tier is None:
+        raise ValueError(f"Unknown processing tier '{name}'. Choose one of: {', '.join(PROCESSING_TIERS)}")
+    return tier
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 
@@ -12,8 +12,12 @@ class ReportGenerator:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         self.client = AsyncOpenAI(api_key=self.api_key)
     
-    async def generate_report(self, scores: Dict, audio_features: Dict, video_features: Dict, nlp_features: Dict) -> str:
-        """Generate human-readable coaching report using LLM"""
+    async def generate_report(self, scores: Dict, audio_features: Dict, video_features: Dict, nlp_features: Dict,
+                              timeout: Optional[float] = None) -> str:
+        """Generate human-readable coaching report using LLM
+        
+        An LLM call that fails or outlasts `timeout` falls back to the template report.
+        """
         
         # Build context for LLM
         context = self._build_context(scores, audio_features, video_features, nlp_features)
@@ -72,7 +76,8 @@ Focus areas for growth: [list].
 Generate the report now:"""
 
         try:
-            response = await self.client.chat.completions.create(
+            client = self.client.with_options(timeout=timeout, max_retries=0) if timeout else self.client
+            response = await client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are an expert executive presence coach providing constructive, actionable feedback."},
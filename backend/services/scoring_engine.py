@@ -1,6 +1,9 @@
 from typing import Dict, List
 from models.assessment_models import ParameterScore, BucketScore
 
+# Bump whenever scoring or report generation changes so cached results are not reused
+SCORING_VERSION = "2"
+
 class ScoringEngine:
     def calculate_parameter_scores(self, audio_features: Dict, video_features: Dict, nlp_features: Dict) -> Dict:
         """Calculate individual parameter scores"""
@@ -0,0 +1,373 @@
+"""
+Crash-isolated execution of the heavy pipeline stages
+Video landmarks (MediaPipe/OpenCV), audio extraction and acoustic analysis
+(librosa/parselmouth) run in supervised child processes, so a native crash or a
+runaway allocation fails only the job that triggered it. Children are reused
+between jobs, killed when their RSS passes STAGE_PROCESS_MAX_RSS_MB or the job
+is cancelled, and replaced after STAGE_PROCESS_MAX_TASKS stages to cap memory
+growth. Requests, frames and results travel as msgpack over the child's stdio.
+Set STAGE_ISOLATION=inline to run the stages in a thread of the API process.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import msgpack
+import numpy as np
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cancellation import CancellationToken
+from services.processing_tiers import get_tier
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NDARRAY_EXT = 1
+
+
+# --- IPC encoding ---
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        array = np.ascontiguousarray(obj)
+        return msgpack.ExtType(NDARRAY_EXT, msgpack.packb([array.dtype.str, list(array.shape), array.tobytes()]))
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot send {type(obj).__name__} to a stage process")
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == NDARRAY_EXT:
+        dtype, shape, buffer = msgpack.unpackb(data)
+        return np.frombuffer(buffer, dtype=np.dtype(dtype)).reshape(shape)
+    return msgpack.ExtType(code, data)
+
+
+def pack(message: Dict) -> bytes:
+    return msgpack.packb(message, default=_default, use_bin_type=True)
+
+
+def read_messages(fd: int) -> Iterator[Dict]:
+    """Messages from a pipe, read with os.read so a small message is never held back"""
+    unpacker = msgpack.Unpacker(raw=False, ext_hook=_ext_hook, strict_map_key=False)
+    while True:
+        for message in unpacker:
+            yield message
+        data = os.read(fd, 1024 * 1024)
+        if not data:
+            return
+        unpacker.feed(data)
+
+
+# --- Stages (executed in the child, or inline) ---
+
+_processors: Dict[str, object] = {}
+
+
+def _processor(name: str):
+    """Processors are created on first use, so a child only loads the models it needs"""
+    if name not in _processors:
+        if name == "video":
+            from services.video_processor import VideoProcessor
+            _processors[name] = VideoProcessor()
+        else:
+            from services.audio_processor import AudioProcessor
+            _processors[name] = AudioProcessor()
+    return _processors[name]
+
+
+def video_landmarks(video_path: str, tier_name: str, frames: Optional[Iterable[np.ndarray]] = None,
+                    token: Optional[CancellationToken] = None) -> Dict:
+    return _processor("video").process_video(video_path, frames, get_tier(tier_name), token)
+
+
+def audio_extraction(video_path: str, sample_rate: int, audio_path: Optional[str] = None,
+                     token: Optional[CancellationToken] = None) -> str:
+    return asyncio.run(_processor("audio").extract_audio_from_video(video_path, sample_rate, audio_path=audio_path))
+
+
+def acoustic_features(audio_path: str, transcript_data: Dict, duration: float, tier_name: str,
+                      token: Optional[CancellationToken] = None) -> Dict:
+    return _processor("audio").analyze_acoustics(audio_path, transcript_data, duration, get_tier(tier_name), token)
+
+
+STAGES: Dict[str, Callable] = {
+    "video_landmarks": video_landmarks,
+    "audio_extraction": audio_extraction,
+    "acoustic_features": acoustic_features,
+}
+
+
+# --- Parent side ---
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size from /proc (None where it is not available)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class StageProcess:
+    """One supervised child; runs a single stage at a time"""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=BACKEND_DIR
+        )
+        self._messages = read_messages(self.process.stdout.fileno())
+        self.tasks = 0
+        self.lease = None
+        self.kill_reason: Optional[str] = None
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def send(self, message: Dict):
+        self.process.stdin.write(pack(message))
+        self.process.stdin.flush()
+
+    def receive(self) -> Dict:
+        try:
+            return next(self._messages)
+        except StopIteration:
+            raise EOFError("stage process closed its output")
+
+    def kill(self, reason: Optional[str] = None, lease=None):
+        """Stop the child; with `lease`, only while it still runs that stage"""
+        if lease is not None and self.lease is not lease:
+            return
+        if self.kill_reason is None:
+            self.kill_reason = reason
+        if self.process.poll() is None:
+            self.process.kill()
+
+    def failure(self) -> str:
+        """Why the child stopped in the middle of a stage"""
+        if self.kill_reason:
+            return self.kill_reason
+        try:
+            # Its output closes just before the exit status is available
+            code = self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.kill("Analysis process stopped responding")
+            return self.kill_reason
+        if code < 0:
+            return f"Analysis process crashed (signal {-code})"
+        return f"Analysis process exited unexpectedly (code {code})"
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                # End of input makes the child exit on its own
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class StageRunner:
+    def __init__(self, isolated: bool = True, max_rss_bytes: Optional[int] = None, max_tasks: int = 20,
+                 max_idle: int = 2, rss_poll_interval: float = 0.5):
+        self.isolated = isolated
+        self.max_rss_bytes = max_rss_bytes
+        self.max_tasks = max_tasks
+        self.max_idle = max_idle
+        self.rss_poll_interval = rss_poll_interval
+        self._idle: List[StageProcess] = []
+        self._busy: List[StageProcess] = []
+        self._lock = threading.Lock()
+        self._monitor = None
+        self.metrics = {"started": 0, "recycled": 0, "crashed": 0, "memory_kills": 0}
+
+    def _checkout(self) -> StageProcess:
+        with self._lock:
+            while self._idle:
+                child = self._idle.pop()
+                if child.process.poll() is None:
+                    break
+                child.close()
+            else:
+                child = StageProcess()
+                self.metrics["started"] += 1
+            self._busy.append(child)
+            if self.max_rss_bytes and self._monitor is None:
+                self._monitor = threading.Thread(target=self._watch_memory, name="stage-rss-monitor", daemon=True)
+                self._monitor.start()
+        return child
+
+    def _checkin(self, child: StageProcess, reusable: bool):
+        if not reusable:
+            # It may still be mid-stage (e.g. the token fired between frames)
+            child.kill()
+        with self._lock:
+            self._busy.remove(child)
+            if reusable and child.tasks >= self.max_tasks:
+                self.metrics["recycled"] += 1
+                reusable = False
+            if reusable and len(self._idle) < self.max_idle:
+                self._idle.append(child)
+                return
+        child.close()
+
+    def _watch_memory(self):
+        while True:
+            time.sleep(self.rss_poll_interval)
+            with self._lock:
+                busy = list(self._busy)
+            for child in busy:
+                rss = rss_bytes(child.pid)
+                if rss is not None and rss > self.max_rss_bytes:
+                    self.metrics["memory_kills"] += 1
+                    child.kill(
+                        f"Analysis exceeded the memory limit "
+                        f"({rss // (1024 * 1024)} MB > {self.max_rss_bytes // (1024 * 1024)} MB)"
+                    )
+
+    def run(self, stage: str, *args, frames: Optional[Iterable[np.ndarray]] = None,
+            token: Optional[CancellationToken] = None):
+        """Run a heavy stage to completion (blocking; call it from a worker thread)
+
+        `frames` are streamed to the child as they are produced. The token is checked
+        between frames, and firing it kills the child mid-stage.
+        """
+        if not self.isolated:
+            extra = {"frames": frames} if frames is not None else {}
+            return STAGES[stage](*args, token=token, **extra)
+
+        if token:
+            token.check()
+        child = self._checkout()
+        lease = object()
+        child.lease = lease
+        if token:
+            token.on_cancel(lambda: child.kill("Stage cancelled", lease))
+
+        reusable = False
+        try:
+            child.send({"op": "run", "stage": stage, "args": list(args), "stream": frames is not None})
+            if frames is not None:
+                for frame in frames:
+                    if token:
+                        token.check()
+                    child.send({"op": "frame", "frame": frame})
+                child.send({"op": "end"})
+            reply = child.receive()
+            child.tasks += 1
+            reusable = True
+        except (EOFError, OSError):
+            reason = child.failure()
+            if child.kill_reason is None:
+                self.metrics["crashed"] += 1
+            # A child killed because the token fired reports the cancellation or timeout
+            if token:
+                token.check()
+            raise Exception(reason)
+        finally:
+            child.lease = None
+            self._checkin(child, reusable)
+
+        if not reply["ok"]:
+            raise Exception(reply["error"])
+        return reply["result"]
+
+    def stop(self):
+        """Shut down idle children (busy ones are stopped by their jobs)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for child in idle:
+            child.close()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            children = [(c.pid, c.tasks, True) for c in self._busy] + [(c.pid, c.tasks, False) for c in self._idle]
+        return {
+            "isolated": self.isolated,
+            "max_rss_mb": self.max_rss_bytes // (1024 * 1024) if self.max_rss_bytes else None,
+            "max_tasks": self.max_tasks,
+            "processes": [
+                {"pid": pid, "tasks": tasks, "busy": busy, "rss_mb": (rss_bytes(pid) or 0) // (1024 * 1024)}
+                for pid, tasks, busy in children
+            ],
+            **self.metrics
+        }
+
+
+def create_stage_runner() -> StageRunner:
+    mode = os.getenv("STAGE_ISOLATION", "process").lower()
+    if mode not in ("process", "inline"):
+        raise ValueError(f"Unknown STAGE_ISOLATION mode '{mode}'")
+    max_rss_mb = float(os.getenv("STAGE_PROCESS_MAX_RSS_MB", "3072"))
+    return StageRunner(
+        isolated=mode == "process",
+        max_rss_bytes=int(max_rss_mb * 1024 * 1024) if max_rss_mb > 0 else None,
+        max_tasks=int(os.getenv("STAGE_PROCESS_MAX_TASKS", "20")),
+        max_idle=int(os.getenv("STAGE_PROCESS_IDLE", "2"))
+    )
+
+
+# Singleton instance
+stage_runner = create_stage_runner()
+
+
+# --- Child side ---
+
+def _serve():
+    # Libraries print to stdout; keep the protocol stream to ourselves
+    output = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    messages = read_messages(0)
+    for request in messages:
+        if request["op"] != "run":
+            continue
+
+        def frames():
+            for message in messages:
+                if message["op"] == "end":
+                    return
+                yield message["frame"]
+
+        stream = frames() if request["stream"] else None
+        try:
+            if stream is not None:
+                result = STAGES[request["stage"]](*request["args"], frames=stream)
+            else:
+                result = STAGES[request["stage"]](*request["args"])
+            reply = {"ok": True, "result": result}
+        except Exception as e:
+            reply = {"ok": False, "error": str(e)}
+        if stream is not None:
+            # Frames the stage did not consume still have to be read off the pipe
+            for _ in stream:
+                pass
+
+        try:
+            data = pack(reply)
+        except TypeError as e:
+            data = pack({"ok": False, "error": str(e)})
+        output.write(data)
+        output.flush()
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,98 @@
+"""
+Transcript document shared by the speech and storytelling analyzers
+The transcript is split into sentences and words once per job (sentences may be
+found as the transcript arrives, with SentenceStream); every analyzer reads the
+cached views instead of re-tokenising the text, so clarity and the story
+segmentation use the same sentence boundaries.
+"""
+import bisect
+import re
+from typing import List, Optional, Tuple
+
+import nltk
+
+# Download required NLTK data
+try:
+    nltk.data.find('tokenizers/punkt')
+except LookupError:
+    nltk.download('punkt', quiet=True)
+
+try:
+    nltk.data.find('tokenizers/punkt_tab')
+except LookupError:
+    nltk.download('punkt_tab', quiet=True)
+
+WORD_PATTERN = re.compile(r'\S+')
+
+
+class TranscriptDocument:
+    """A transcript with its sentences, words, lowercase text and word offsets"""
+
+    def __init__(self, text: str, sentences: Optional[List[str]] = None):
+        self.text = text
+        self.lower = text.lower()
+
+        # Words are whitespace-delimited, as the analyzers have always counted them
+        matches = list(WORD_PATTERN.finditer(text))
+        self.words: List[str] = [m.group() for m in matches]
+        self.word_offsets: List[int] = [m.start() for m in matches]
+
+        self.sentences: List[str] = nltk.sent_tokenize(text) if sentences is None else sentences
+        self.sentences_lower: List[str] = [s.lower() for s in self.sentences]
+        self.sentence_spans: List[Tuple[int, int]] = self._locate_sentences()
+
+    @property
+    def word_count(self) -> int:
+        return len(self.words)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentences)
+
+    def _locate_sentences(self) -> List[Tuple[int, int]]:
+        """Character span of each sentence (the tokenizer returns slices of the text)"""
+        spans = []
+        position = 0
+        for sentence in self.sentences:
+            start = self.text.find(sentence, position)
+            if start < 0:
+                start = position
+            end = start + len(sentence)
+            spans.append((start, end))
+            position = end
+        return spans
+
+    def word_index(self, offset: int) -> int:
+        """Index of the first word starting at or after a character offset"""
+        return bisect.bisect_left(self.word_offsets, offset)
+
+
+class SentenceStream:
+    """Splits text that arrives in pieces (e.g. ASR segments) into sentences as they complete
+
+    The last sentence found so far is held back, since the next piece may continue
+    it; only that tail is re-tokenised, so the total work stays linear.
+    """
+
+    def __init__(self):
+        self.sentences: List[str] = []
+        self._pending = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add a piece of text; returns the sentences it completed"""
+        text = text.strip()
+        if not text:
+            return []
+        self._pending = f"{self._pending} {text}" if self._pending else text
+        sentences = nltk.sent_tokenize(self._pending)
+        complete = sentences[:-1]
+        self._pending = sentences[-1] if sentences else ""
+        self.sentences.extend(complete)
+        return complete
+
+    def close(self) -> List[str]:
+        """End of text; returns the held-back last sentence"""
+        remaining = nltk.sent_tokenize(self._pending) if self._pending else []
+        self._pending = ""
+        self.sentences.extend(remaining)
+        return remaining
@@ -1,62 +1,245 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from typing import Dict, List
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 import os
+from functools import partial
+
+from models.assessment_models import ProcessingTier
+from services.frame_pipeline import FramePipeline
+from services.cancellation import CancellationToken
+
+# Face mesh landmark mapped back from the face crop to full-frame coordinates
+FaceLandmark = namedtuple("FaceLandmark", ["x", "y", "z"])
+
+
+class FaceCropTracker:
+    """FaceMesh in tracking mode on a face crop that holds still while the head does
+    
+    Tracking carries the face region from one crop to the next in crop coordinates,
+    which is only valid while consecutive crops cover the same part of the frame.
+    The crop window is kept until the pose-derived face box leaves it or shrinks well
+    inside it; only then is a new window taken and FaceMesh restarted, so its own
+    face detector runs on those frames alone.
+    """
+    
+    def __init__(self, create_face_mesh: Callable[[], object], margin: float = 1.25, min_fill: float = 0.6):
+        self.create_face_mesh = create_face_mesh
+        # Window size relative to the face box, and the smallest box that keeps it
+        self.margin = margin
+        self.min_fill = min_fill
+        self.window: Optional[tuple] = None
+        self.face_mesh = None
+    
+    def _holds(self, roi: tuple) -> bool:
+        wx0, wy0, wx1, wy1 = self.window
+        x0, y0, x1, y1 = roi
+        inside = x0 >= wx0 and y0 >= wy0 and x1 <= wx1 and y1 <= wy1
+        return inside and max(x1 - x0, y1 - y0) >= self.min_fill * max(wx1 - wx0, wy1 - wy0)
+    
+    def crop_window(self, roi: tuple, width: int, height: int) -> tuple:
+        """Window to crop for this frame's face box (restarts tracking when it moves)"""
+        if self.window is None or not self._holds(roi):
+            x0, y0, x1, y1 = roi
+            center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+            half_size = max(x1 - x0, y1 - y0) * self.margin / 2
+            self.window = (
+                int(max(0, center_x - half_size)),
+                int(max(0, center_y - half_size)),
+                int(min(width, center_x + half_size)),
+                int(min(height, center_y + half_size))
+            )
+            self._restart()
+        return self.window
+    
+    def _restart(self):
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+        self.face_mesh = self.create_face_mesh()
+    
+    def lose(self):
+        """No head in this frame: the next one starts a new window and track"""
+        self.window = None
+    
+    def process(self, crop: np.ndarray):
+        return self.face_mesh.process(crop)
+    
+    def close(self):
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
 
 class VideoProcessor:
-    def __init__(self):
+    # Pose landmarks that outline the head (nose, eyes, ears)
+    HEAD_LANDMARKS = ("NOSE", "LEFT_EYE", "RIGHT_EYE", "LEFT_EAR", "RIGHT_EAR")
+    
+    def __init__(self, face_roi_scale: float = 1.2, min_face_roi_px: int = 32,
+                 analysis_width: int = 640, frame_queue_size: int = 8):
         # Initialize MediaPipe
         self.mp_pose = mp.solutions.pose
         self.mp_face_mesh = mp.solutions.face_mesh
         self.mp_face_detection = mp.solutions.face_detection
         
-        self.pose = self.mp_pose.Pose(
+        # Face crop half-size relative to the head span seen by pose
+        self.face_roi_scale = face_roi_scale
+        self.min_face_roi_px = min_face_roi_px
+        
+        # Decoded frames are downscaled to this width before inference
+        self.analysis_width = analysis_width
+        self.frame_queue_size = frame_queue_size
+    
+    def create_models(self, model_complexity: int = 1) -> tuple:
+        """Create per-video MediaPipe graphs (tracking state must not leak across jobs)"""
+        pose = self.mp_pose.Pose(
             static_image_mode=False,
-            model_complexity=1,
+            model_complexity=model_complexity,
             min_detection_confidence=0.5
         )
         
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        # FaceMesh tracks across frames while the crop window holds still
+        face_tracker = FaceCropTracker(partial(
+            self.mp_face_mesh.FaceMesh,
             static_image_mode=False,
             max_num_faces=1,
-            min_detection_confidence=0.5
-        )
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        ))
+        
+        return pose, face_tracker
     
-    def extract_frames(self, video_path: str, fps: int = 2) -> List[np.ndarray]:
-        """Extract frames from video at specified FPS"""
-        frames = []
+    def iter_frames(self, video_path: str, fps: int = 2) -> Iterator[np.ndarray]:
+        """Decode raw BGR frames at the specified FPS (skipped frames are only grabbed)"""
         cap = cv2.VideoCapture(video_path)
         
         video_fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(video_fps / fps)
+        frame_interval = max(1, int(video_fps / fps))
         
         frame_count = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_interval == 0:
-                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        try:
+            while cap.isOpened():
+                if not cap.grab():
+                    break
+                
+                if frame_count % frame_interval == 0:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    yield frame
+                
+                frame_count += 1
+        finally:
+            cap.release()
+    
+    def preprocess_frame(self, frame: np.ndarray, analysis_width: Optional[int] = None) -> np.ndarray:
+        """Convert a decoded BGR frame to RGB at analysis resolution"""
+        analysis_width = analysis_width or self.analysis_width
+        height, width = frame.shape[:2]
+        if width > analysis_width:
+            scale = analysis_width / width
+            frame = cv2.resize(frame, (analysis_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    
+    def extract_frames(self, video_path: str, fps: int = 2) -> List[np.ndarray]:
+        """Extract frames from video at specified FPS"""
+        return [self.preprocess_frame(frame) for frame in self.iter_frames(video_path, fps)]
+    
+    def get_face_roi(self, frame: np.ndarray, pose_landmarks) -> Optional[tuple]:
+        """Padded face bounding box (x0, y0, x1, y1) from pose head landmarks"""
+        height, width = frame.shape[:2]
+        
+        points = []
+        for name in self.HEAD_LANDMARKS:
+            landmark = pose_landmarks[self.mp_pose.PoseLandmark[name]]
+            if landmark.visibility > 0.5:
+                points.append((landmark.x * width, landmark.y * height))
+        
+        # Need at least two visible head points to size the crop
+        if len(points) < 2:
+            return None
+        
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        center_x = sum(xs) / len(xs)
+        center_y = sum(ys) / len(ys)
+        
+        # Ear-to-ear span approximates face width; pad to include forehead and chin
+        span = max(max(xs) - min(xs), max(ys) - min(ys))
+        half_size = max(span * self.face_roi_scale, self.min_face_roi_px / 2)
+        
+        x0 = int(max(0, center_x - half_size))
+        y0 = int(max(0, center_y - half_size))
+        x1 = int(min(width, center_x + half_size))
+        y1 = int(min(height, center_y + half_size))
+        
+        if x1 - x0 < self.min_face_roi_px or y1 - y0 < self.min_face_roi_px:
+            return None
+        
+        return x0, y0, x1, y1
+    
+    def detect_face_landmarks(self, frame: np.ndarray, pose_landmarks,
+                              face_tracker: FaceCropTracker) -> Optional[List[FaceLandmark]]:
+        """Run FaceMesh on the pose-guided face crop only"""
+        roi = self.get_face_roi(frame, pose_landmarks) if pose_landmarks is not None else None
+        if roi is None:
+            face_tracker.lose()
+            return None
+        
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = face_tracker.crop_window(roi, width, height)
+        crop = np.ascontiguousarray(frame[y0:y1, x0:x1])
+        results = face_tracker.process(crop)
+        
+        if not results.multi_face_landmarks:
+            return None
+        
+        # Map crop-normalized coordinates back to full-frame normalized coordinates
+        crop_width = x1 - x0
+        crop_height = y1 - y0
+        return [
+            FaceLandmark(
+                (x0 + lm.x * crop_width) / width,
+                (y0 + lm.y * crop_height) / height,
+                lm.z
+            )
+            for lm in results.multi_face_landmarks[0].landmark
+        ]
+    
+    def extract_landmarks(self, frames: Iterable[np.ndarray], pose, face_tracker: FaceCropTracker,
+                          token: Optional[CancellationToken] = None) -> List[Dict]:
+        """Run pose once per frame and FaceMesh only where pose finds a head"""
+        frame_landmarks = []
+        
+        for frame in frames:
+            if token:
+                token.check()
+            results = pose.process(frame)
+            pose_landmarks = results.pose_landmarks.landmark if results.pose_landmarks else None
             
-            frame_count += 1
+            frame_landmarks.append({
+                "pose": pose_landmarks,
+                "face": self.detect_face_landmarks(frame, pose_landmarks, face_tracker)
+            })
         
-        cap.release()
-        return frames
+        return frame_landmarks
     
-    def analyze_posture(self, frames: List[np.ndarray]) -> Dict:
+    def analyze_posture(self, frame_landmarks: List[Dict]) -> Dict:
         """Analyze posture using pose landmarks"""
         upright_count = 0
         open_posture_count = 0
-        total_frames = len(frames)
+        total_frames = len(frame_landmarks)
         
-        for frame in frames:
-            results = self.pose.process(frame)
+        for frame in frame_landmarks:
+            landmarks = frame["pose"]
             
-            if results.pose_landmarks:
-                landmarks = results.pose_landmarks.landmark
-                
+            if landmarks:
                 # Check spine angle (shoulders to hips)
                 left_shoulder = landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
                 right_shoulder = landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER]
@@ -88,16 +271,14 @@ class VideoProcessor:
             "score": round(posture_score, 1)
         }
     
-    def analyze_body_expansiveness(self, frames: List[np.ndarray]) -> Dict:
+    def analyze_body_expansiveness(self, frame_landmarks: List[Dict]) -> Dict:
         """Measure body expansiveness (dominance cues)"""
         expansiveness_scores = []
         
-        for frame in frames:
-            results = self.pose.process(frame)
+        for frame in frame_landmarks:
+            landmarks = frame["pose"]
             
-            if results.pose_landmarks:
-                landmarks = results.pose_landmarks.landmark
-                
+            if landmarks:
                 # Calculate bounding box width (shoulders + arms)
                 left_shoulder = landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
                 right_shoulder = landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER]
@@ -133,21 +314,19 @@ class VideoProcessor:
             "score": round(score, 1)
         }
     
-    def analyze_eye_contact(self, frames: List[np.ndarray]) -> Dict:
+    def analyze_eye_contact(self, frame_landmarks: List[Dict]) -> Dict:
         """Estimate eye contact with camera using head pose"""
         eye_contact_frames = 0
-        total_frames = len(frames)
+        total_frames = len(frame_landmarks)
         
-        for frame in frames:
-            results = self.face_mesh.process(frame)
+        for frame in frame_landmarks:
+            face_landmarks = frame["face"]
             
-            if results.multi_face_landmarks:
-                face_landmarks = results.multi_face_landmarks[0]
-                
+            if face_landmarks:
                 # Use nose tip and eye landmarks to estimate gaze
-                nose_tip = face_landmarks.landmark[1]
-                left_eye = face_landmarks.landmark[33]
-                right_eye = face_landmarks.landmark[263]
+                nose_tip = face_landmarks[1]
+                left_eye = face_landmarks[33]
+                right_eye = face_landmarks[263]
                 
                 # Check if face is frontal (rough approximation)
                 eye_center_x = (left_eye.x + right_eye.x) / 2
@@ -176,22 +355,20 @@ class VideoProcessor:
             "score": round(score, 1)
         }
     
-    def analyze_facial_expressions(self, frames: List[np.ndarray]) -> Dict:
+    def analyze_facial_expressions(self, frame_landmarks: List[Dict]) -> Dict:
         """Analyze facial expressions (simplified - detect smile)"""
         positive_frames = 0
-        total_frames = len(frames)
+        total_frames = len(frame_landmarks)
         
-        for frame in frames:
-            results = self.face_mesh.process(frame)
+        for frame in frame_landmarks:
+            face_landmarks = frame["face"]
             
-            if results.multi_face_landmarks:
-                face_landmarks = results.multi_face_landmarks[0]
-                
+            if face_landmarks:
                 # Detect smile using mouth corners
-                left_mouth = face_landmarks.landmark[61]
-                right_mouth = face_landmarks.landmark[291]
-                upper_lip = face_landmarks.landmark[13]
-                lower_lip = face_landmarks.landmark[14]
+                left_mouth = face_landmarks[61]
+                right_mouth = face_landmarks[291]
+                upper_lip = face_landmarks[13]
+                lower_lip = face_landmarks[14]
                 
                 # Calculate mouth width vs height ratio
                 mouth_width = abs(right_mouth.x - left_mouth.x)
@@ -219,16 +396,19 @@ class VideoProcessor:
             "score": round(score, 1)
         }
     
-    def analyze_gestures(self, frames: List[np.ndarray]) -> Dict:
+    def analyze_gestures(self, frame_landmarks: List[Dict], fps: float = 2) -> Dict:
         """Analyze hand gestures and movement"""
         gesture_frames = []
         
-        for i, frame in enumerate(frames):
-            results = self.pose.process(frame)
+        # Movement thresholds are calibrated for 0.5 s between samples; tiers that
+        # sample more sparsely have their movements scaled back to that interval
+        stride = max(1, int(round(fps / 2)))
+        interval_scale = 0.5 / (stride / fps)
+        
+        for i, frame in enumerate(frame_landmarks[::stride]):
+            landmarks = frame["pose"]
             
-            if results.pose_landmarks:
-                landmarks = results.pose_landmarks.landmark
-                
+            if landmarks:
                 left_wrist = landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST]
                 right_wrist = landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST]
                 
@@ -244,7 +424,7 @@ class VideoProcessor:
             for i in range(1, len(gesture_frames)):
                 left_movement = abs(gesture_frames[i]["left_wrist_y"] - gesture_frames[i-1]["left_wrist_y"])
                 right_movement = abs(gesture_frames[i]["right_wrist_y"] - gesture_frames[i-1]["right_wrist_y"])
-                movements.append(max(left_movement, right_movement))
+                movements.append(max(left_movement, right_movement) * interval_scale)
             
             avg_movement = np.mean(movements)
             gesture_count = sum(1 for m in movements if m > 0.05)  # Significant movements
@@ -267,12 +447,12 @@ class VideoProcessor:
             "score": round(score, 1)
         }
     
-    def analyze_first_impression(self, frames: List[np.ndarray], fps: int = 2) -> Dict:
+    def analyze_first_impression(self, frame_landmarks: List[Dict], fps: float = 2) -> Dict:
         """Analyze first 7-10 seconds"""
-        # Take first 20 frames (10 seconds at 2fps)
-        first_frames = frames[:20]
+        # Take first 10 seconds of frames (20 frames at 2fps)
+        first_frames = frame_landmarks[:int(10 * fps)]
         
-        if len(first_frames) < 5:
+        if len(first_frames) < max(1, int(2.5 * fps)):
             return {"score": 50, "message": "Insufficient frames"}
         
         # Run mini-analysis
@@ -294,28 +474,55 @@ class VideoProcessor:
             "expression_score": expressions["score"]
         }
     
-    def process_video(self, video_path: str) -> Dict:
-        """Main video processing pipeline"""
-        # Extract frames
-        frames = self.extract_frames(video_path, fps=2)
+    def process_video(self, video_path: str, frames: Optional[Iterable[np.ndarray]] = None,
+                      tier: Optional[ProcessingTier] = None,
+                      token: Optional[CancellationToken] = None) -> Dict:
+        """Main video processing pipeline
+        
+        `frames` may be a stream of RGB frames already sampled at the tier's fps (e.g.
+        from MediaIngestor); otherwise frames are decoded from `video_path` with OpenCV.
+        Decoding runs on a separate thread, overlapped with inference. `token` is
+        checked between frames.
+        """
+        fps = tier.fps if tier else 2
+        model_complexity = tier.pose_model_complexity if tier else 1
+        
+        if frames is None:
+            pipeline = FramePipeline(
+                self.iter_frames(video_path, fps=fps),
+                preprocess=partial(self.preprocess_frame, analysis_width=tier.analysis_width if tier else None),
+                max_queue=self.frame_queue_size
+            )
+        else:
+            pipeline = FramePipeline(frames, max_queue=self.frame_queue_size)
+        
+        # Single inference pass: pose on every frame, FaceMesh on face crops
+        pose, face_tracker = self.create_models(model_complexity)
+        with pose, face_tracker:
+            frame_landmarks = self.extract_landmarks(pipeline, pose, face_tracker, token)
+        
+        # A cancelled demux ends the frame stream early; never report on a partial video
+        if token:
+            token.check()
         
-        if len(frames) < 10:
+        if len(frame_landmarks) < 5 * fps:
             raise Exception("Video too short or failed to extract frames")
         
         # Analyze all parameters
-        posture = self.analyze_posture(frames)
-        expansiveness = self.analyze_body_expansiveness(frames)
-        eye_contact = self.analyze_eye_contact(frames)
-        expressions = self.analyze_facial_expressions(frames)
-        gestures = self.analyze_gestures(frames)
-        first_impression = self.analyze_first_impression(frames)
+        posture = self.analyze_posture(frame_landmarks)
+        expansiveness = self.analyze_body_expansiveness(frame_landmarks)
+        eye_contact = self.analyze_eye_contact(frame_landmarks)
+        expressions = self.analyze_facial_expressions(frame_landmarks)
+        gestures = self.analyze_gestures(frame_landmarks, fps)
+        first_impression = self.analyze_first_impression(frame_landmarks, fps)
         
         return {
-            "frame_count": len(frames),
+            "frame_count": len(frame_landmarks),
             "posture": posture,
             "expansiveness": expansiveness,
             "eye_contact": eye_contact,
             "expressions": expressions,
             "gestures": gestures,
-            "first_impression": first_impression
+            "first_impression": first_impression,
+            "timing": pipeline.timing()
         }
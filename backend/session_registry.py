@@ -0,0 +1,318 @@
+"""
+Local upload-session registry
+Chunked-upload sessions live in an embedded SQLite (WAL) database on this node and
+are authoritative on the hot path; Supabase receives write-behind summaries.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from supabase_client import supabase_service
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.getenv("LOCAL_DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
+os.makedirs(DATA_DIR, exist_ok=True)
+
+SESSION_COLUMNS = (
+    "session_id", "filename", "file_size", "total_chunks", "chunk_size",
+    "target_path", "tier", "tenant", "upload_type", "s3_upload_id", "s3_key",
+    "incremental", "status", "video_id", "created_at", "updated_at", "expires_at"
+)
+
+class UploadSessionRegistry:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                session_id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                file_size INTEGER NOT NULL,
+                total_chunks INTEGER NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                target_path TEXT NOT NULL,
+                tier TEXT,
+                tenant TEXT,
+                upload_type TEXT NOT NULL DEFAULT 'chunked',
+                s3_upload_id TEXT,
+                s3_key TEXT,
+                incremental INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                video_id TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                expires_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_upload_sessions_status ON upload_sessions(status);
+
+            -- One row per received chunk: an upsert makes marking a chunk atomic
+            CREATE TABLE IF NOT EXISTS upload_chunks (
+                session_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT,
+                received_at TEXT NOT NULL,
+                PRIMARY KEY (session_id, chunk_index)
+            );
+        """)
+
+        # Databases created before per-chunk digests, object-store uploads, tenants and
+        # incremental ingest were added
+        self._add_missing_columns("upload_chunks", {"sha256": "TEXT"})
+        self._add_missing_columns("upload_sessions", {
+            "upload_type": "TEXT NOT NULL DEFAULT 'chunked'",
+            "s3_upload_id": "TEXT",
+            "s3_key": "TEXT",
+            "tenant": "TEXT",
+            "incremental": "INTEGER NOT NULL DEFAULT 0"
+        })
+
+    def _add_missing_columns(self, table: str, columns: Dict[str, str]):
+        existing = {r["name"] for r in self._conn.execute(f"PRAGMA table_info({table})")}
+        for name, definition in columns.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def create_session(self, session_data: Dict) -> Dict:
+        """Register a new upload session"""
+        now = datetime.utcnow().isoformat()
+        row = {column: session_data.get(column) for column in SESSION_COLUMNS}
+        row["created_at"] = row["created_at"] or now
+        row["upload_type"] = row["upload_type"] or "chunked"
+        row["incremental"] = int(bool(row["incremental"]))
+        row["updated_at"] = now
+
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO upload_sessions ({', '.join(SESSION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in SESSION_COLUMNS)})",
+                [row[column] for column in SESSION_COLUMNS]
+            )
+        return row
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        """Get upload session by ID, including the sorted list of received chunks"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM upload_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            chunk_rows = self._conn.execute(
+                "SELECT chunk_index FROM upload_chunks WHERE session_id = ? ORDER BY chunk_index",
+                (session_id,)
+            ).fetchall()
+
+        session = dict(row)
+        session["chunk_data"] = [r["chunk_index"] for r in chunk_rows]
+        session["uploaded_chunks"] = len(session["chunk_data"])
+        return session
+
+    def update_session(self, session_id: str, update_data: Dict):
+        """Update upload session fields"""
+        fields = {k: v for k, v in update_data.items() if k in SESSION_COLUMNS and k != "session_id"}
+        fields["updated_at"] = datetime.utcnow().isoformat()
+
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE upload_sessions SET {', '.join(f'{k} = ?' for k in fields)} WHERE session_id = ?",
+                [*fields.values(), session_id]
+            )
+
+    def transition_status(self, session_id: str, from_status: str, to_status: str) -> bool:
+        """Atomically move a session between statuses; False if it was not in `from_status`"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE upload_sessions SET status = ?, updated_at = ? WHERE session_id = ? AND status = ?",
+                (to_status, datetime.utcnow().isoformat(), session_id, from_status)
+            )
+        return cursor.rowcount == 1
+
+    def claim_incremental(self, session_id: str, video_id: str) -> bool:
+        """Atomically attach the incremental-ingest job to an active session; False if it already has one"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE upload_sessions SET video_id = ?, updated_at = ? "
+                "WHERE session_id = ? AND status = 'active' AND incremental = 1 AND video_id IS NULL",
+                (video_id, datetime.utcnow().isoformat(), session_id)
+            )
+        return cursor.rowcount == 1
+
+    def contiguous_bytes(self, session_id: str) -> int:
+        """Length of the fully received prefix of an upload (raises once it is abandoned)"""
+        session = self.get_session(session_id)
+        if not session or session["status"] not in ("active", "completing", "completed"):
+            raise Exception("Upload was cancelled or expired")
+        if session["status"] != "active":
+            return session["file_size"]
+
+        contiguous = 0
+        for chunk_index in session["chunk_data"]:
+            if chunk_index != contiguous:
+                break
+            contiguous += 1
+        return min(contiguous * session["chunk_size"], session["file_size"])
+
+    def mark_chunk_received(self, session_id: str, chunk_index: int, size: int,
+                            sha256: Optional[str] = None, expires_at: Optional[str] = None) -> int:
+        """Atomically record a received chunk and return how many chunks have arrived
+
+        Re-sending a chunk replaces its size and digest, so retries are idempotent.
+        `expires_at` pushes the session's expiry out while chunks keep arriving.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO upload_chunks (session_id, chunk_index, size, sha256, received_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id, chunk_index) DO UPDATE SET "
+                "size = excluded.size, sha256 = excluded.sha256, received_at = excluded.received_at",
+                (session_id, chunk_index, size, sha256, datetime.utcnow().isoformat())
+            )
+            if expires_at:
+                self._conn.execute(
+                    "UPDATE upload_sessions SET expires_at = ? WHERE session_id = ?",
+                    (expires_at, session_id)
+                )
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM upload_chunks WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def get_chunk_digest(self, session_id: str, chunk_index: int) -> Optional[str]:
+        """SHA-256 recorded for a received chunk (None if not received or sent without one)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256 FROM upload_chunks WHERE session_id = ? AND chunk_index = ?",
+                (session_id, chunk_index)
+            ).fetchone()
+        return row["sha256"] if row else None
+
+    def get_chunk_digests(self, session_id: str) -> List[Optional[str]]:
+        """SHA-256 of every received chunk, in chunk order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sha256 FROM upload_chunks WHERE session_id = ? ORDER BY chunk_index",
+                (session_id,)
+            ).fetchall()
+        return [r["sha256"] for r in rows]
+
+    def discard_chunk(self, session_id: str, chunk_index: int):
+        """Forget a chunk whose bytes were overwritten by a failed re-send"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM upload_chunks WHERE session_id = ? AND chunk_index = ?",
+                (session_id, chunk_index)
+            )
+
+    def delete_chunks(self, session_id: str):
+        """Drop per-chunk rows once a session is finished"""
+        with self._lock:
+            self._conn.execute("DELETE FROM upload_chunks WHERE session_id = ?", (session_id,))
+
+    def list_sessions(self, status: str) -> List[Dict]:
+        """Sessions in a given status, least recently extended first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM upload_sessions WHERE status = ? ORDER BY expires_at", (status,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def expire_stale_sessions(self, now: Optional[str] = None) -> List[Dict]:
+        """Mark every active session past its expiry as expired in one transaction
+
+        Returns the expired sessions so their files can be removed.
+        """
+        now = now or datetime.utcnow().isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM upload_sessions WHERE status = 'active' AND expires_at < ?", (now,)
+                ).fetchall()
+                self._conn.execute(
+                    "DELETE FROM upload_chunks WHERE session_id IN "
+                    "(SELECT session_id FROM upload_sessions WHERE status = 'active' AND expires_at < ?)",
+                    (now,)
+                )
+                self._conn.execute(
+                    "UPDATE upload_sessions SET status = 'expired', updated_at = ? "
+                    "WHERE status = 'active' AND expires_at < ?",
+                    (now, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [dict(row) for row in rows]
+
+    def purge_finished_sessions(self, before: str) -> int:
+        """Delete finished sessions last updated before `before`; returns how many"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM upload_sessions WHERE status IN ('completed', 'cancelled', 'failed', 'expired') "
+                "AND updated_at < ?",
+                (before,)
+            )
+        return cursor.rowcount
+
+
+class SupabaseWriteBehind:
+    """Coalesces upload-session changes and mirrors them to Supabase in the background"""
+
+    def __init__(self, flush_interval: float = 2.0):
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Dict] = {}
+        self._task = None
+
+    def create(self, session_data: Dict):
+        self._pending[session_data["session_id"]] = {"create": dict(session_data), "update": {}}
+
+    def update(self, session_id: str, update_data: Dict):
+        entry = self._pending.setdefault(session_id, {"create": None, "update": {}})
+        entry["update"].update(update_data)
+
+    async def flush(self):
+        """Send all pending session summaries to Supabase"""
+        pending, self._pending = self._pending, {}
+        for session_id, entry in pending.items():
+            try:
+                if entry["create"] is not None:
+                    await asyncio.to_thread(
+                        supabase_service.create_upload_session, {**entry["create"], **entry["update"]}
+                    )
+                elif entry["update"]:
+                    await asyncio.to_thread(
+                        supabase_service.update_upload_session, session_id, entry["update"]
+                    )
+            except Exception as e:
+                logger.warning(f"Write-behind for upload session {session_id} failed: {e}")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# Singleton instances
+upload_registry = UploadSessionRegistry(
+    os.getenv("UPLOAD_REGISTRY_DB", os.path.join(DATA_DIR, "upload_sessions.db"))
+)
+supabase_write_behind = SupabaseWriteBehind()
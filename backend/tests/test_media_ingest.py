@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.media_ingest import MediaIngestor
+
+
+class FakeSource:
+    def __init__(self):
+        self.probed = None
+
+    def read_prefix(self, limit: int) -> bytes:
+        self.probed = limit
+        return b"header"
+
+    def iter_bytes(self):
+        return iter(())
+
+    def cancel(self):
+        pass
+
+
+class FakeProcess:
+    def __init__(self, command, **kwargs):
+        self.command = command
+        self.kwargs = kwargs
+        self.stdin = open(os.devnull, "wb") if kwargs.get("stdin") == subprocess.PIPE else None
+        self.stdout = open(os.devnull, "rb")
+
+    def poll(self):
+        return 0
+
+    def wait(self):
+        return 0
+
+
+def open_demux(monkeypatch, video_path: str, **kwargs):
+    ingestor = MediaIngestor()
+    probes = []
+    monkeypatch.setattr(ingestor, "probe", lambda path, header=None: probes.append(header) or {
+        "width": 1280, "height": 720, "duration": 10.0, "has_audio": True
+    })
+    monkeypatch.setattr(subprocess, "Popen", FakeProcess)
+    session = ingestor.open(video_path, **kwargs)
+    session.close()
+    return session, probes
+
+
+def test_open_accepts_router_arguments(monkeypatch):
+    source = FakeSource()
+    session, probes = open_demux(
+        monkeypatch,
+        "https://bucket.example/video.mp4?sig=1",
+        fps=2,
+        analysis_width=640,
+        sample_rate=16000,
+        input_source=source,
+        output_base="/tmp/uploads/job-1"
+    )
+
+    assert probes == [b"header"]
+    assert source.probed == MediaIngestor.PROBE_BYTES
+    assert session.audio_path == "/tmp/uploads/job-1.wav"
+    command = session.process.command
+    assert command[command.index("-i") + 1] == "pipe:0"
+    assert session.process.kwargs["stdin"] == subprocess.PIPE
+
+
+def test_open_reads_path_without_source(monkeypatch):
+    session, probes = open_demux(monkeypatch, "/tmp/uploads/job-2.mp4")
+
+    assert probes == [None]
+    command = session.process.command
+    assert command[command.index("-i") + 1] == "/tmp/uploads/job-2.mp4"
+    assert session.process.kwargs["stdin"] is None
+    assert session.audio_path == "/tmp/uploads/job-2.wav"
@@ -0,0 +1,493 @@
+"""
+Durable work queue for assessment jobs
+The API enqueues jobs; embedded workers (inside the API process) and standalone
+workers (`python worker.py`) claim them under a time-limited lease that they keep
+renewing while the job runs. A job whose worker dies is re-delivered once its
+lease runs out, and resumes from its pipeline checkpoints. The default backend is
+an embedded SQLite (WAL) database shared by every process on the node; set
+WORK_QUEUE=memory for a single-process queue.
+
+Higher priority classes are always claimed first. Within a class, tenants share
+the workers by start-time fair queueing: each claim charges the job's tenant
+1/weight of virtual time, and the tenant with the earliest virtual start goes
+next, so one tenant's backlog cannot starve the others.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from session_registry import DATA_DIR
+
+DEFAULT_TENANT = "default"
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Tenant weights from "tenant=weight,..." (unlisted tenants weigh 1)"""
+    weights = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        tenant, _, weight = entry.partition("=")
+        tenant, weight = tenant.strip(), float(weight)
+        if weight <= 0:
+            raise ValueError(f"Tenant weight for '{tenant}' must be positive")
+        weights[tenant] = weight
+    return weights
+
+
+def pick_tenant(firsts: Dict[str, str], starts: Dict[str, float]) -> str:
+    """Tenant with the earliest virtual start (oldest waiting job breaks ties)"""
+    return min(firsts, key=lambda tenant: (starts[tenant], firsts[tenant]))
+
+
+def replay_position(waiting: List[Tuple], job_id: str, finish: Dict[str, float], clock: float,
+                    weights: Dict[str, float]) -> Optional[int]:
+    """Replay the claim order over the waiting (priority, tenant, order, job_id) entries
+    and return the 1-based place of `job_id`
+    """
+    queues: Dict[int, Dict[str, List[Tuple]]] = {}
+    for entry in sorted(waiting, key=lambda e: e[2], reverse=True):
+        queues.setdefault(entry[0], {}).setdefault(entry[1], []).append(entry)
+    finish = dict(finish)
+
+    position = 0
+    for priority in sorted(queues, reverse=True):
+        tenants = queues[priority]
+        while tenants:
+            starts = {tenant: max(finish.get(tenant, 0.0), clock) for tenant in tenants}
+            tenant = pick_tenant({t: entries[-1][2] for t, entries in tenants.items()}, starts)
+            entry = tenants[tenant].pop()
+            position += 1
+            if entry[3] == job_id:
+                return position
+            if not tenants[tenant]:
+                del tenants[tenant]
+            clock = starts[tenant]
+            finish[tenant] = clock + 1 / weights.get(tenant, 1.0)
+    return None
+
+
+class WorkQueue(ABC):
+    """Interface shared by the work queue backends
+
+    Items are keyed by assessment ID; a claimed item is a dict with job_id,
+    payload, attempts, priority and tenant.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = weights or {}
+
+    def _weight(self, tenant: str) -> float:
+        return self.weights.get(tenant, 1.0)
+
+    @abstractmethod
+    def enqueue(self, job_id: str, payload: Dict, priority: int = 0, tenant: str = DEFAULT_TENANT):
+        """Queue a job (again), resetting its attempt count"""
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float, min_priority: Optional[int] = None) -> Optional[Dict]:
+        """Lease the next job (fair across tenants within the highest priority class),
+        including jobs whose lease has expired; `min_priority` skips lower classes
+        """
+
+    @abstractmethod
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based place in the claim order of a queued job (None once claimed)"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False once `worker_id` no longer holds the job"""
+
+    @abstractmethod
+    def ack(self, job_id: str, worker_id: str):
+        """Mark a leased job done"""
+
+    @abstractmethod
+    def release(self, job_id: str, worker_id: str):
+        """Put a leased job back in the queue without finishing it"""
+
+    @abstractmethod
+    def cancel(self, job_id: str) -> bool:
+        """Withdraw a job that has not been claimed; False if it is not queued"""
+
+    @abstractmethod
+    def reap_exhausted(self, max_attempts: int) -> List[str]:
+        """Mark jobs whose lease lapsed after `max_attempts` deliveries dead; returns their IDs"""
+
+    @abstractmethod
+    def is_pending(self, job_id: str) -> bool:
+        """Whether a job is queued or leased"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of items in each status"""
+
+    @abstractmethod
+    def purge_finished(self, before: str) -> int:
+        """Delete done, dead and cancelled items last updated before `before`; returns how many"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    def __init__(self, db_path: str, weights: Optional[Dict[str, float]] = None):
+        super().__init__(weights)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # API and worker processes all claim from the same database
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS work_items (
+                job_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                tenant TEXT NOT NULL DEFAULT 'default',
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                leased_by TEXT,
+                lease_expires_at REAL,
+                enqueued_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_work_items_claim
+                ON work_items(status, priority DESC, enqueued_at);
+
+            -- Virtual finish time of each tenant's last claimed job, and the
+            -- virtual clock (start time of the last claim) under tenant ''
+            CREATE TABLE IF NOT EXISTS tenant_shares (
+                tenant TEXT PRIMARY KEY,
+                finish REAL NOT NULL
+            );
+        """)
+
+        # Databases created before tenants were added
+        self._add_missing_columns("work_items", {"tenant": "TEXT NOT NULL DEFAULT 'default'"})
+
+    def _add_missing_columns(self, table: str, columns: Dict[str, str]):
+        existing = {r["name"] for r in self._conn.execute(f"PRAGMA table_info({table})")}
+        for name, definition in columns.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def enqueue(self, job_id: str, payload: Dict, priority: int = 0, tenant: str = DEFAULT_TENANT):
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO work_items (job_id, payload, priority, tenant, status, attempts, enqueued_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', 0, ?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET payload = excluded.payload, priority = excluded.priority, "
+                "tenant = excluded.tenant, status = 'queued', attempts = 0, leased_by = NULL, "
+                "lease_expires_at = NULL, enqueued_at = excluded.enqueued_at, updated_at = excluded.updated_at",
+                (job_id, json.dumps(payload), priority, tenant, now, now)
+            )
+
+    def _shares(self, tenants) -> Tuple[Dict[str, float], float]:
+        """Virtual finish time of each tenant's last claimed job, and the virtual clock"""
+        tenants = list(tenants)
+        rows = self._conn.execute(
+            f"SELECT tenant, finish FROM tenant_shares WHERE tenant IN ({', '.join('?' * (len(tenants) + 1))})",
+            ["", *tenants]
+        ).fetchall()
+        finish = {r["tenant"]: r["finish"] for r in rows}
+        return finish, finish.pop("", 0.0)
+
+    def claim(self, worker_id: str, lease_seconds: float, min_priority: Optional[int] = None) -> Optional[Dict]:
+        now = time.time()
+        claimable = "(status = 'queued' OR (status = 'leased' AND lease_expires_at < ?))"
+        with self._lock:
+            # Select and lease in one write transaction so two workers never get the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                top = self._conn.execute(
+                    f"SELECT MAX(priority) AS priority FROM work_items WHERE {claimable}", (now,)
+                ).fetchone()["priority"]
+                if top is None or (min_priority is not None and top < min_priority):
+                    self._conn.execute("COMMIT")
+                    return None
+
+                firsts = {
+                    r["tenant"]: r["first"] for r in self._conn.execute(
+                        f"SELECT tenant, MIN(enqueued_at) AS first FROM work_items "
+                        f"WHERE {claimable} AND priority = ? GROUP BY tenant",
+                        (now, top)
+                    )
+                }
+                finish, clock = self._shares(firsts)
+                starts = {t: max(finish.get(t, 0.0), clock) for t in firsts}
+                tenant = pick_tenant(firsts, starts)
+                row = self._conn.execute(
+                    f"SELECT job_id, payload, priority, tenant, attempts FROM work_items "
+                    f"WHERE {claimable} AND priority = ? AND tenant = ? ORDER BY enqueued_at LIMIT 1",
+                    (now, top, tenant)
+                ).fetchone()
+
+                self._conn.execute(
+                    "UPDATE work_items SET status = 'leased', attempts = attempts + 1, leased_by = ?, "
+                    "lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                    (worker_id, now + lease_seconds, datetime.utcnow().isoformat(), row["job_id"])
+                )
+                self._conn.executemany(
+                    "INSERT INTO tenant_shares (tenant, finish) VALUES (?, ?) "
+                    "ON CONFLICT (tenant) DO UPDATE SET finish = excluded.finish",
+                    [(tenant, starts[tenant] + 1 / self._weight(tenant)), ("", starts[tenant])]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return {
+            "job_id": row["job_id"],
+            "payload": json.loads(row["payload"]),
+            "priority": row["priority"],
+            "tenant": row["tenant"],
+            "attempts": row["attempts"] + 1
+        }
+
+    def position(self, job_id: str) -> Optional[int]:
+        with self._lock:
+            item = self._conn.execute(
+                "SELECT priority FROM work_items WHERE job_id = ? AND status = 'queued'", (job_id,)
+            ).fetchone()
+            if item is None:
+                return None
+            # Expired leases are claimable again, so they wait in line too
+            waiting = [
+                (r["priority"], r["tenant"], r["enqueued_at"], r["job_id"]) for r in self._conn.execute(
+                    "SELECT job_id, priority, tenant, enqueued_at FROM work_items "
+                    "WHERE (status = 'queued' OR (status = 'leased' AND lease_expires_at < ?)) AND priority >= ?",
+                    (time.time(), item["priority"])
+                )
+            ]
+            finish, clock = self._shares({entry[1] for entry in waiting})
+        return replay_position(waiting, job_id, finish, clock, self.weights)
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE work_items SET lease_expires_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND status = 'leased' AND leased_by = ?",
+                (time.time() + lease_seconds, datetime.utcnow().isoformat(), job_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def _finish(self, job_id: str, worker_id: str, status: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE work_items SET status = ?, leased_by = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE job_id = ? AND status = 'leased' AND leased_by = ?",
+                (status, datetime.utcnow().isoformat(), job_id, worker_id)
+            )
+
+    def ack(self, job_id: str, worker_id: str):
+        self._finish(job_id, worker_id, "done")
+
+    def release(self, job_id: str, worker_id: str):
+        self._finish(job_id, worker_id, "queued")
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE work_items SET status = 'cancelled', updated_at = ? WHERE job_id = ? AND status = 'queued'",
+                (datetime.utcnow().isoformat(), job_id)
+            )
+        return cursor.rowcount == 1
+
+    def reap_exhausted(self, max_attempts: int) -> List[str]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT job_id FROM work_items "
+                    "WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?",
+                    (now, max_attempts)
+                ).fetchall()
+                job_ids = [r["job_id"] for r in rows]
+                self._conn.executemany(
+                    "UPDATE work_items SET status = 'dead', leased_by = NULL, updated_at = ? WHERE job_id = ?",
+                    [(datetime.utcnow().isoformat(), job_id) for job_id in job_ids]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_ids
+
+    def is_pending(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM work_items WHERE job_id = ? AND status IN ('queued', 'leased')", (job_id,)
+            ).fetchone()
+        return row is not None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM work_items GROUP BY status"
+            ).fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    def purge_finished(self, before: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM work_items WHERE status IN ('done', 'dead', 'cancelled') AND updated_at < ?", (before,)
+            )
+        return cursor.rowcount
+
+
+class InMemoryWorkQueue(WorkQueue):
+    """Process-local queue (lost on restart; only embedded workers can claim from it)"""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        super().__init__(weights)
+        self._items: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._tenant_finish: Dict[str, float] = {}
+        self._clock = 0.0
+
+    def enqueue(self, job_id: str, payload: Dict, priority: int = 0, tenant: str = DEFAULT_TENANT):
+        with self._lock:
+            self._sequence += 1
+            self._items[job_id] = {
+                "job_id": job_id,
+                "payload": dict(payload),
+                "priority": priority,
+                "tenant": tenant,
+                "status": "queued",
+                "attempts": 0,
+                "leased_by": None,
+                "lease_expires_at": None,
+                "sequence": self._sequence,
+                "updated_at": datetime.utcnow().isoformat()
+            }
+
+    def _claimable(self, item: Dict, now: float) -> bool:
+        return item["status"] == "queued" or (item["status"] == "leased" and item["lease_expires_at"] < now)
+
+    def _start(self, tenant: str) -> float:
+        return max(self._tenant_finish.get(tenant, 0.0), self._clock)
+
+    def claim(self, worker_id: str, lease_seconds: float, min_priority: Optional[int] = None) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            candidates = [item for item in self._items.values() if self._claimable(item, now)]
+            if not candidates:
+                return None
+            top = max(item["priority"] for item in candidates)
+            if min_priority is not None and top < min_priority:
+                return None
+
+            firsts: Dict[str, int] = {}
+            for item in candidates:
+                if item["priority"] == top:
+                    firsts[item["tenant"]] = min(firsts.get(item["tenant"], item["sequence"]), item["sequence"])
+            tenant = pick_tenant(firsts, {t: self._start(t) for t in firsts})
+            item = min(
+                (i for i in candidates if i["priority"] == top and i["tenant"] == tenant),
+                key=lambda i: i["sequence"]
+            )
+            self._clock = self._start(tenant)
+            self._tenant_finish[tenant] = self._clock + 1 / self._weight(tenant)
+
+            item.update(status="leased", leased_by=worker_id, lease_expires_at=now + lease_seconds)
+            item["attempts"] += 1
+            return {k: item[k] for k in ("job_id", "payload", "priority", "tenant", "attempts")}
+
+    def position(self, job_id: str) -> Optional[int]:
+        now = time.time()
+        with self._lock:
+            item = self._items.get(job_id)
+            if item is None or item["status"] != "queued":
+                return None
+            waiting = [
+                (other["priority"], other["tenant"], other["sequence"], other["job_id"])
+                for other in self._items.values()
+                if self._claimable(other, now) and other["priority"] >= item["priority"]
+            ]
+            return replay_position(waiting, job_id, self._tenant_finish, self._clock, self.weights)
+
+    def _held(self, job_id: str, worker_id: str) -> Optional[Dict]:
+        item = self._items.get(job_id)
+        if item and item["status"] == "leased" and item["leased_by"] == worker_id:
+            return item
+        return None
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._lock:
+            item = self._held(job_id, worker_id)
+            if item:
+                item["lease_expires_at"] = time.time() + lease_seconds
+            return item is not None
+
+    def _finish(self, job_id: str, worker_id: str, status: str):
+        with self._lock:
+            item = self._held(job_id, worker_id)
+            if item:
+                item.update(status=status, leased_by=None, lease_expires_at=None,
+                            updated_at=datetime.utcnow().isoformat())
+
+    def ack(self, job_id: str, worker_id: str):
+        self._finish(job_id, worker_id, "done")
+
+    def release(self, job_id: str, worker_id: str):
+        self._finish(job_id, worker_id, "queued")
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            item = self._items.get(job_id)
+            if item is None or item["status"] != "queued":
+                return False
+            item.update(status="cancelled", updated_at=datetime.utcnow().isoformat())
+            return True
+
+    def reap_exhausted(self, max_attempts: int) -> List[str]:
+        now = time.time()
+        reaped = []
+        with self._lock:
+            for item in self._items.values():
+                if item["status"] == "leased" and item["lease_expires_at"] < now and item["attempts"] >= max_attempts:
+                    item.update(status="dead", leased_by=None, updated_at=datetime.utcnow().isoformat())
+                    reaped.append(item["job_id"])
+        return reaped
+
+    def is_pending(self, job_id: str) -> bool:
+        item = self._items.get(job_id)
+        return item is not None and item["status"] in ("queued", "leased")
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for item in list(self._items.values()):
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return counts
+
+    def purge_finished(self, before: str) -> int:
+        with self._lock:
+            finished = [
+                job_id for job_id, item in self._items.items()
+                if item["status"] in ("done", "dead", "cancelled") and item["updated_at"] < before
+            ]
+            for job_id in finished:
+                del self._items[job_id]
+        return len(finished)
+
+
+def create_work_queue() -> WorkQueue:
+    backend = os.getenv("WORK_QUEUE", "sqlite").lower()
+    # Every process sharing the queue must use the same weights
+    weights = parse_weights(os.getenv("TENANT_WEIGHTS", ""))
+    if backend == "memory":
+        return InMemoryWorkQueue(weights)
+    if backend == "sqlite":
+        return SQLiteWorkQueue(os.getenv("WORK_QUEUE_DB", os.path.join(DATA_DIR, "queue.db")), weights)
+    raise ValueError(f"Unknown WORK_QUEUE backend '{backend}'")
+
+
+# Singleton instance
+work_queue = create_work_queue()
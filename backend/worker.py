@@ -0,0 +1,192 @@
+"""
+Assessment worker
+Claims jobs from the work queue and runs the analysis pipeline. Runs embedded in
+the API server (EMBEDDED_WORKERS jobs at a time, 0 to disable) or standalone, so
+analysis capacity can be added without adding API capacity:
+
+    python worker.py --concurrency 2
+
+Standalone workers must see the same job store, work queue and upload directory
+as the API (same node, or shared storage with object-store uploads).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from typing import Dict, List, Optional
+
+import sys
+sys.path.append(os.path.dirname(__file__))
+from routers.assessment_router import WORKER_ID, INTERACTIVE_PRIORITY, run_queued_job
+from services.stage_runner import stage_runner
+from job_store import job_store
+from work_queue import WorkQueue, work_queue
+
+logger = logging.getLogger(__name__)
+
+
+class QueueWorker:
+    def __init__(self, queue: WorkQueue, concurrency: int = 1, lease_seconds: float = 60,
+                 poll_interval: float = 1.0, max_attempts: int = 3, worker_id: str = WORKER_ID,
+                 interactive_reserve: int = 1):
+        self.queue = queue
+        self.concurrency = concurrency
+        # Slots batch jobs may not take, so interactive uploads start without waiting
+        # for a batch job to finish (at least one slot is always left for batches)
+        self.interactive_reserve = max(0, min(interactive_reserve, concurrency - 1))
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id
+        self._running: Dict[str, asyncio.Task] = {}
+        self._priorities: Dict[str, int] = {}
+        self._task = None
+        self.metrics = {"claimed": 0, "finished": 0, "leases_lost": 0, "dead": 0}
+
+    def _fail_exhausted(self):
+        """Jobs whose worker died on every delivery are failed instead of re-delivered"""
+        for job_id in self.queue.reap_exhausted(self.max_attempts):
+            self.metrics["dead"] += 1
+            job_store.update_status(
+                job_id, status="failed", message="Processing failed",
+                error=f"Worker stopped while processing this assessment ({self.max_attempts} attempts)"
+            )
+            logger.error(f"Assessment {job_id} abandoned after {self.max_attempts} deliveries")
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task) -> bool:
+        """Renew the lease while `task` runs; True if the lease was lost and `task` cancelled"""
+        while not task.done():
+            await asyncio.sleep(self.lease_seconds / 3)
+            held = await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id, self.lease_seconds)
+            if not held and not task.done():
+                # Another worker took the job over after our lease lapsed
+                self.metrics["leases_lost"] += 1
+                logger.warning(f"Lost the lease on assessment {job_id}, stopping it here")
+                task.cancel()
+                return True
+        return False
+
+    async def _process(self, item: Dict):
+        job_id = item["job_id"]
+        if item["attempts"] > 1:
+            job_store.update_status(job_id, status="processing", message="Resuming analysis...")
+
+        task = asyncio.create_task(run_queued_job(job_id, item["payload"]))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, task))
+        try:
+            await task
+            # Failures are recorded on the job and retried through /retry, not re-delivered
+            await asyncio.to_thread(self.queue.ack, job_id, self.worker_id)
+            self.metrics["finished"] += 1
+        except asyncio.CancelledError:
+            # Only the heartbeat's cancellation of the job is absorbed; shutdown propagates
+            lease_lost = heartbeat.done() and not heartbeat.cancelled() and heartbeat.result()
+            if not (task.cancelled() and lease_lost):
+                raise
+            # The item is no longer ours to release: it was re-delivered, cancelled or reaped
+            logger.warning(f"Dropped assessment {job_id} on {self.worker_id} after losing its lease")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+            self._priorities.pop(job_id, None)
+
+    def _min_priority(self) -> Optional[int]:
+        """Only interactive jobs may take the reserved slots"""
+        batch_running = sum(1 for p in self._priorities.values() if p < INTERACTIVE_PRIORITY)
+        if batch_running >= self.concurrency - self.interactive_reserve:
+            return INTERACTIVE_PRIORITY
+        return None
+
+    async def run(self):
+        logger.info(f"Worker {self.worker_id} taking up to {self.concurrency} jobs")
+        while True:
+            try:
+                await asyncio.to_thread(self._fail_exhausted)
+                while len(self._running) < self.concurrency:
+                    item = await asyncio.to_thread(
+                        self.queue.claim, self.worker_id, self.lease_seconds, self._min_priority()
+                    )
+                    if item is None:
+                        break
+                    self.metrics["claimed"] += 1
+                    logger.info(
+                        f"Claimed assessment {item['job_id']} for tenant {item['tenant']} (attempt {item['attempts']})"
+                    )
+                    self._priorities[item["job_id"]] = item["priority"]
+                    self._running[item["job_id"]] = asyncio.create_task(self._process(item))
+            except Exception as e:
+                logger.error(f"Work queue poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None and self.concurrency > 0:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop claiming and hand running jobs back for immediate re-delivery"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for job_id, task in list(self._running.items()):
+            task.cancel()
+            self.queue.release(job_id, self.worker_id)
+        self._running.clear()
+        self._priorities.clear()
+
+    def snapshot(self) -> Dict:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "interactive_reserve": self.interactive_reserve,
+            "running": sorted(self._running),
+            "queue": self.queue.counts(),
+            **self.metrics
+        }
+
+
+def create_worker(concurrency: int) -> QueueWorker:
+    return QueueWorker(
+        work_queue,
+        concurrency=concurrency,
+        lease_seconds=float(os.getenv("WORK_LEASE_SECONDS", "60")),
+        poll_interval=float(os.getenv("WORK_POLL_INTERVAL_SECONDS", "1")),
+        max_attempts=int(os.getenv("WORK_MAX_ATTEMPTS", "3")),
+        interactive_reserve=int(os.getenv("WORK_INTERACTIVE_RESERVE", "1"))
+    )
+
+
+# Singleton instance (the worker embedded in the API server)
+embedded_worker = create_worker(int(os.getenv("EMBEDDED_WORKERS", "1")))
+
+
+async def serve(worker: QueueWorker):
+    stopping = asyncio.Event()
+    # Hand jobs back on SIGTERM rather than leaving them to lease expiry
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    worker.start()
+    try:
+        await stopping.wait()
+    finally:
+        await worker.stop()
+        await asyncio.to_thread(stage_runner.stop)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run assessment jobs from the work queue")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "1")),
+                        help="Jobs processed at the same time")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(create_worker(args.concurrency)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
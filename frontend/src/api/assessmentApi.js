@@ -3,9 +3,10 @@ import axios from 'axios';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api/assessment`;
 
-export const uploadVideo = async (file, onProgress) => {
+export const uploadVideo = async (file, onProgress, tier = 'standard') => {
   const formData = new FormData();
   formData.append('file', file);
+  formData.append('tier', tier);
 
   try {
     const response = await axios.post(`${API}/upload`, formData, {
@@ -52,6 +53,90 @@ export const getStatus = async (assessmentId) => {
   }
 };
 
+export const cancelAssessment = async (assessmentId) => {
+  try {
+    const response = await axios.post(`${API}/cancel/${assessmentId}`);
+    return response.data;
+  } catch (error) {
+    throw new Error(
+      error.response?.data?.detail || 'Failed to cancel assessment'
+    );
+  }
+};
+
+const TERMINAL_STATUSES = ['completed', 'failed', 'cancelled'];
+const LONG_POLL_WAIT_SECONDS = 25;
+
+// Long-poll /status: each request is held until the status changes
+const longPollStatus = (assessmentId, onStatus, onError, isClosed, since = -1) => {
+  const poll = async (revision) => {
+    while (!isClosed()) {
+      try {
+        const response = await axios.get(`${API}/status/${assessmentId}`, {
+          params: { wait: LONG_POLL_WAIT_SECONDS, since: revision },
+          timeout: (LONG_POLL_WAIT_SECONDS + 10) * 1000,
+        });
+        const status = response.data;
+        if (isClosed()) return;
+        if (status.revision > revision) {
+          revision = status.revision;
+          onStatus(status);
+        }
+        if (TERMINAL_STATUSES.includes(status.status)) return;
+      } catch (error) {
+        if (error.response?.status === 404) {
+          onError(new Error(error.response.data?.detail || 'Assessment not found'));
+          return;
+        }
+        // Transient failure: back off before asking again
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+      }
+    }
+  };
+  poll(since);
+};
+
+// Push status updates to `onStatus` until the job finishes; returns an unsubscribe function.
+// Uses Server-Sent Events, falling back to long-polling where they are unavailable.
+export const subscribeToStatus = (assessmentId, onStatus, onError) => {
+  let closed = false;
+  let revision = -1;
+  const isClosed = () => closed;
+
+  if (typeof EventSource === 'undefined') {
+    longPollStatus(assessmentId, onStatus, onError, isClosed);
+    return () => { closed = true; };
+  }
+
+  const source = new EventSource(`${API}/events/${assessmentId}`);
+  let received = false;
+
+  source.addEventListener('status', (event) => {
+    const status = JSON.parse(event.data);
+    received = true;
+    revision = status.revision;
+    onStatus(status);
+    if (TERMINAL_STATUSES.includes(status.status)) {
+      // Otherwise EventSource reconnects when the server ends the stream
+      source.close();
+    }
+  });
+
+  source.onerror = () => {
+    // The browser retries a stream that was working; one that never opened
+    // (blocked by a proxy, or a 404) falls back to long-polling
+    if (!received || source.readyState === EventSource.CLOSED) {
+      source.close();
+      if (!closed) longPollStatus(assessmentId, onStatus, onError, isClosed, revision);
+    }
+  };
+
+  return () => {
+    closed = true;
+    source.close();
+  };
+};
+
 export const getReport = async (assessmentId) => {
   try {
     const response = await axios.get(`${API}/report/${assessmentId}`);
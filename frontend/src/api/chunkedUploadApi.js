@@ -10,91 +10,280 @@ const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api/chunked-upload`;
 
 const CHUNK_SIZE = 10 * 1024 * 1024; // 10MB chunks for better performance with large files
+const PARALLEL_CHUNKS = 3; // Chunks uploaded concurrently
+const MAX_CHUNK_ATTEMPTS = 5; // Retries per chunk before giving up (the upload stays resumable)
+const RESUME_KEY_PREFIX = 'chunked-upload:';
+// 's3_multipart' sends parts straight to the object store via presigned URLs
+const UPLOAD_MODE = process.env.REACT_APP_UPLOAD_MODE || 'chunked';
+
+const resumeKey = (file, tier) => `${RESUME_KEY_PREFIX}${file.name}:${file.size}:${file.lastModified}:${tier}`;
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+/**
+ * Hex SHA-256 of a blob (sent with each chunk so the server can verify it)
+ */
+const sha256Hex = async (blob) => {
+  if (!window.crypto?.subtle) {
+    return null;
+  }
+  const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+};
+
+/**
+ * Look up a previous, still-active session for this file; returns its missing chunks
+ */
+const findResumableSession = async (key) => {
+  const uploadId = localStorage.getItem(key);
+  if (!uploadId) {
+    return null;
+  }
+  try {
+    const status = await axios.get(`${API}/status/${uploadId}`);
+    if (status.data.status === 'active' && status.data.chunk_size === CHUNK_SIZE) {
+      return { uploadId, missingChunks: status.data.missing_chunks };
+    }
+  } catch (error) {
+    console.warn('Previous upload session is no longer available:', error);
+  }
+  localStorage.removeItem(key);
+  return null;
+};
+
+/**
+ * Upload video parts directly to the object store using presigned URLs
+ */
+const uploadVideoToObjectStore = async (file, onProgress, tier) => {
+  if (onProgress) {
+    onProgress(0);
+  }
+  
+  const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
+  const initFormData = new URLSearchParams();
+  initFormData.append('filename', file.name);
+  initFormData.append('file_size', file.size.toString());
+  initFormData.append('total_chunks', totalChunks.toString());
+  initFormData.append('tier', tier);
+  initFormData.append('upload_type', 's3_multipart');
+  
+  const initResponse = await axios.post(`${API}/init`, initFormData, {
+    headers: { 'Content-Type': 'application/x-www-form-urlencoded' }
+  });
+  const { upload_id: uploadId, part_urls: partUrls } = initResponse.data;
+  
+  const loadedBytes = new Array(totalChunks).fill(0);
+  const etags = new Array(totalChunks);
+  const reportProgress = () => {
+    const uploaded = loadedBytes.reduce((sum, bytes) => sum + bytes, 0);
+    if (onProgress) {
+      onProgress(Math.round((uploaded / Math.max(file.size, 1)) * 95));
+    }
+  };
+  
+  const uploadPart = async (chunkIndex) => {
+    const start = chunkIndex * CHUNK_SIZE;
+    const end = Math.min(start + CHUNK_SIZE, file.size);
+    
+    for (let attempt = 1; ; attempt++) {
+      try {
+        // The bucket's CORS policy must expose the ETag header
+        const response = await axios.put(partUrls[chunkIndex], file.slice(start, end), {
+          timeout: 120000,
+          maxContentLength: Infinity,
+          maxBodyLength: Infinity,
+          onUploadProgress: (progressEvent) => {
+            loadedBytes[chunkIndex] = Math.min(progressEvent.loaded, end - start);
+            reportProgress();
+          }
+        });
+        etags[chunkIndex] = response.headers.etag;
+        loadedBytes[chunkIndex] = end - start;
+        reportProgress();
+        return;
+      } catch (error) {
+        loadedBytes[chunkIndex] = 0;
+        if (attempt >= MAX_CHUNK_ATTEMPTS) {
+          throw new Error(`Failed to upload part ${chunkIndex + 1}: ${error.message}`);
+        }
+        await sleep(Math.min(1000 * 2 ** (attempt - 1), 15000));
+      }
+    }
+  };
+  
+  let nextChunk = 0;
+  const uploadWorker = async () => {
+    while (nextChunk < totalChunks) {
+      await uploadPart(nextChunk++);
+    }
+  };
+  
+  try {
+    await Promise.all(
+      Array.from({ length: Math.min(PARALLEL_CHUNKS, totalChunks) }, uploadWorker)
+    );
+  } catch (error) {
+    nextChunk = totalChunks;
+    await cancelChunkedUpload(uploadId);
+    throw error;
+  }
+  
+  if (onProgress) {
+    onProgress(95);
+  }
+  
+  const completeFormData = new URLSearchParams();
+  completeFormData.append('upload_id', uploadId);
+  completeFormData.append('parts', JSON.stringify(
+    etags.map((etag, i) => ({ part_number: i + 1, etag }))
+  ));
+  
+  const completeResponse = await axios.post(`${API}/complete`, completeFormData, {
+    headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+    timeout: 60000
+  });
+  
+  if (onProgress) {
+    onProgress(100);
+  }
+  
+  return completeResponse.data;
+};
 
 /**
  * Upload video using chunked upload (bypasses ingress limits)
  */
-export const uploadVideoChunked = async (file, onProgress) => {
+export const uploadVideoChunked = async (file, onProgress, tier = 'standard') => {
   try {
+    if (UPLOAD_MODE === 's3_multipart') {
+      return await uploadVideoToObjectStore(file, onProgress, tier);
+    }
+    
     // Initialize progress
     if (onProgress) {
       onProgress(0);
     }
     
-    // Step 1: Initialize upload session
+    // Step 1: Resume a previous session for this file, or initialize a new one
     const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
+    const key = resumeKey(file, tier);
     
-    const initFormData = new URLSearchParams();
-    initFormData.append('filename', file.name);
-    initFormData.append('file_size', file.size.toString());
-    initFormData.append('total_chunks', totalChunks.toString());
-    
-    const initResponse = await axios.post(`${API}/init`, initFormData, {
-      headers: { 'Content-Type': 'application/x-www-form-urlencoded' }
-    });
-    
-    const uploadId = initResponse.data.upload_id;
+    let uploadId;
+    let pendingChunks;
+    const previous = await findResumableSession(key);
+    if (previous) {
+      uploadId = previous.uploadId;
+      pendingChunks = previous.missingChunks;
+    } else {
+      const initFormData = new URLSearchParams();
+      initFormData.append('filename', file.name);
+      initFormData.append('file_size', file.size.toString());
+      initFormData.append('total_chunks', totalChunks.toString());
+      initFormData.append('tier', tier);
+      initFormData.append('incremental', 'true'); // Server starts analysis early for streamable MP4s
+      
+      const initResponse = await axios.post(`${API}/init`, initFormData, {
+        headers: { 'Content-Type': 'application/x-www-form-urlencoded' }
+      });
+      
+      uploadId = initResponse.data.upload_id;
+      pendingChunks = Array.from({ length: totalChunks }, (_, i) => i);
+      localStorage.setItem(key, uploadId);
+    }
     
     // Show we've started
     if (onProgress) {
       onProgress(1);
     }
     
-    // Step 2: Upload chunks
-    for (let chunkIndex = 0; chunkIndex < totalChunks; chunkIndex++) {
+    // Step 2: Upload chunks (several in parallel; the server writes each at its offset)
+    const loadedBytes = Array.from({ length: totalChunks }, (_, i) =>
+      pendingChunks.includes(i) ? 0 : Math.min(CHUNK_SIZE, file.size - i * CHUNK_SIZE)
+    );
+    const reportProgress = () => {
+      const uploaded = loadedBytes.reduce((sum, bytes) => sum + bytes, 0);
+      if (onProgress) {
+        onProgress(Math.round((uploaded / Math.max(file.size, 1)) * 95)); // Save 5% for completion
+      }
+    };
+    
+    const uploadChunk = async (chunkIndex) => {
       const start = chunkIndex * CHUNK_SIZE;
       const end = Math.min(start + CHUNK_SIZE, file.size);
       const chunk = file.slice(start, end);
+      const digest = await sha256Hex(chunk);
       
-      const formData = new FormData();
-      formData.append('upload_id', uploadId);
-      formData.append('chunk_index', chunkIndex.toString());
-      formData.append('chunk', chunk, `chunk_${chunkIndex}`);
+      const headers = {
+        'Content-Type': 'application/octet-stream',
+        'X-Upload-Id': uploadId,
+        'X-Chunk-Index': chunkIndex.toString()
+      };
+      if (digest) {
+        headers['X-Chunk-SHA256'] = digest;
+      }
       
-      try {
-        await axios.post(`${API}/chunk`, formData, {
-          headers: { 'Content-Type': 'multipart/form-data' },
-          timeout: 120000, // 2 minutes per chunk for large files
-          maxContentLength: Infinity,
-          maxBodyLength: Infinity,
-          onUploadProgress: (progressEvent) => {
-            // Progress within current chunk
-            const chunkProgress = progressEvent.loaded / progressEvent.total;
-            // Overall progress: (completed chunks + current chunk progress) / total chunks
-            const overallProgress = Math.round(
-              (((chunkIndex + chunkProgress) / totalChunks) * 95)
-            );
-            if (onProgress) {
-              onProgress(overallProgress);
+      for (let attempt = 1; ; attempt++) {
+        try {
+          // Raw body upload: the server streams it to disk without multipart parsing
+          await axios.put(`${API}/chunk`, chunk, {
+            headers,
+            timeout: 120000, // 2 minutes per chunk for large files
+            maxContentLength: Infinity,
+            maxBodyLength: Infinity,
+            onUploadProgress: (progressEvent) => {
+              loadedBytes[chunkIndex] = Math.min(progressEvent.loaded, end - start);
+              reportProgress();
             }
-          }
-        });
+          });
         
-        // Ensure progress shows chunk completed
-        const progress = Math.round(((chunkIndex + 1) / totalChunks) * 95); // Save 5% for completion
-        if (onProgress) {
-          onProgress(progress);
-        }
-      } catch (error) {
-        console.error(`Chunk upload failed for chunk ${chunkIndex}:`, error);
+          // Ensure progress shows chunk completed
+          loadedBytes[chunkIndex] = end - start;
+          reportProgress();
+          return;
+        } catch (error) {
+          console.error(`Chunk upload failed for chunk ${chunkIndex} (attempt ${attempt}):`, error);
+          loadedBytes[chunkIndex] = 0;
+          reportProgress();
         
-        // Handle specific error types
-        if (error.code === 'ECONNABORTED') {
-          throw new Error(`Upload timeout for chunk ${chunkIndex + 1} - connection too slow`);
-        }
-        if (error.response?.status === 413) {
-          throw new Error(`Chunk ${chunkIndex + 1} too large - this should not happen. Contact support.`);
-        }
-        if (error.response?.status === 504) {
-          throw new Error(`Gateway timeout for chunk ${chunkIndex + 1} - please try again`);
-        }
+          // Network errors, timeouts, 5xx and checksum mismatches (400) are worth retrying
+          const status = error.response?.status;
+          const retryable = !status || status >= 500 || status === 400 || status === 429;
+          if (retryable && attempt < MAX_CHUNK_ATTEMPTS) {
+            await sleep(Math.min(1000 * 2 ** (attempt - 1), 15000));
+            continue;
+          }
         
-        // Cancel upload on chunk failure
-        await axios.delete(`${API}/cancel/${uploadId}`).catch(cancelError => {
-          console.error('Failed to cancel upload:', cancelError);
-        });
-        throw new Error(`Failed to upload chunk ${chunkIndex + 1}: ${error.response?.data?.detail || error.message}`);
+          // Handle specific error types
+          if (error.code === 'ECONNABORTED') {
+            throw new Error(`Upload timeout for chunk ${chunkIndex + 1} - connection too slow`);
+          }
+          if (error.response?.status === 413) {
+            throw new Error(`Chunk ${chunkIndex + 1} too large - this should not happen. Contact support.`);
+          }
+          if (error.response?.status === 504) {
+            throw new Error(`Gateway timeout for chunk ${chunkIndex + 1} - please try again`);
+          }
+          throw new Error(`Failed to upload chunk ${chunkIndex + 1}: ${error.response?.data?.detail || error.message}`);
+        }
       }
+    };
+    
+    let nextChunk = 0;
+    const uploadWorker = async () => {
+      while (nextChunk < pendingChunks.length) {
+        const chunkIndex = pendingChunks[nextChunk++];
+        await uploadChunk(chunkIndex);
+      }
+    };
+    
+    try {
+      await Promise.all(
+        Array.from({ length: Math.min(PARALLEL_CHUNKS, pendingChunks.length) }, uploadWorker)
+      );
+    } catch (error) {
+      // Stop handing out chunks; the session is kept so a retry resumes from the missing chunks
+      nextChunk = pendingChunks.length;
+      throw error;
     }
     
     // Step 3: Complete upload
@@ -110,6 +299,8 @@ export const uploadVideoChunked = async (file, onProgress) => {
       timeout: 30000
     });
     
+    localStorage.removeItem(key);
+    
     if (onProgress) {
       onProgress(100);
     }
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
-import { getStatus } from '../api/assessmentApi';
+import { subscribeToStatus, cancelAssessment } from '../api/assessmentApi';
 import { Loader2, CheckCircle2, XCircle } from 'lucide-react';
 
 const ProcessingPage = () => {
@@ -8,6 +8,7 @@ const ProcessingPage = () => {
   const navigate = useNavigate();
   const [status, setStatus] = useState(null);
   const [error, setError] = useState(null);
+  const [cancelling, setCancelling] = useState(false);
 
   useEffect(() => {
     if (!id) {
@@ -15,33 +16,46 @@ const ProcessingPage = () => {
       return;
     }
 
-    const checkStatus = async () => {
-      try {
-        const statusData = await getStatus(id);
-        setStatus(statusData);
-
-        if (statusData.status === 'completed') {
-          // Wait a moment before redirecting
-          setTimeout(() => {
-            navigate(`/report/${id}`);
-          }, 1000);
-        } else if (statusData.status === 'failed') {
-          setError(statusData.error || 'Processing failed');
-        }
-      } catch (err) {
-        setError(err.message);
+    let redirectTimer;
+
+    const handleStatus = (statusData) => {
+      setStatus(statusData);
+
+      if (statusData.status === 'completed') {
+        // Wait a moment before redirecting
+        clearTimeout(redirectTimer);
+        redirectTimer = setTimeout(() => {
+          navigate(`/report/${id}`);
+        }, 1000);
+      } else if (statusData.status === 'failed') {
+        setError(statusData.error || 'Processing failed');
+      } else if (statusData.status === 'cancelled') {
+        setError('Assessment cancelled');
+      } else {
+        setError(null);
       }
     };
 
-    // Initial check
-    checkStatus();
+    // The current status arrives first, then each change as it happens
+    const unsubscribe = subscribeToStatus(id, handleStatus, (err) => setError(err.message));
 
-    // Poll every 2 seconds
-    const interval = setInterval(checkStatus, 2000);
-
-    return () => clearInterval(interval);
+    return () => {
+      unsubscribe();
+      clearTimeout(redirectTimer);
+    };
   }, [id, navigate]);
 
+  const handleCancel = async () => {
+    setCancelling(true);
+    try {
+      // The page updates when the job reports itself cancelled
+      await cancelAssessment(id);
+    } catch (err) {
+      setError(err.message);
+      setCancelling(false);
+    }
+  };
+
   const getStepStatus = (stepProgress) => {
     if (!status) return 'pending';
     if (status.progress >= stepProgress) return 'complete';
@@ -120,6 +134,13 @@ const ProcessingPage = () => {
           <p className="text-xl text-gray-300 font-medium" data-testid="processing-status-message">
             {error ? error : status?.message || 'Initializing...'}
           </p>
+          {!error && status?.queue_position && (
+            <p className="mt-2 text-sm text-gray-400" data-testid="processing-queue-position">
+              {status.queue_position === 1
+                ? 'Next in line for analysis'
+                : `Position ${status.queue_position} in the analysis queue`}
+            </p>
+          )}
         </div>
 
         {/* Processing Steps */}
@@ -163,6 +184,20 @@ const ProcessingPage = () => {
           </div>
         </div>
 
+        {/* Cancel */}
+        {!error && status?.status === 'processing' && (
+          <div className="mt-6 text-center">
+            <button
+              onClick={handleCancel}
+              disabled={cancelling}
+              className="px-6 py-2 bg-gray-700 hover:bg-gray-600 disabled:opacity-50 text-white rounded-lg transition"
+              data-testid="cancel-assessment-button"
+            >
+              {cancelling ? 'Cancelling...' : 'Cancel Analysis'}
+            </button>
+          </div>
+        )}
+
         {/* Error Display */}
         {error && (
           <div className="mt-6 bg-red-900/20 border border-red-500 rounded-lg p-4 text-center" data-testid="processing-error-display">
@@ -42,6 +42,11 @@ CREATE TABLE IF NOT EXISTS upload_sessions (
     upload_type TEXT DEFAULT 'direct' CHECK (upload_type IN ('direct', 'chunked', 's3_presigned', 's3_multipart')),
     s3_upload_id TEXT,
     s3_key TEXT,
+    tier TEXT DEFAULT 'standard',
+    tenant TEXT,
+    chunk_size INTEGER,
+    target_path TEXT,
+    incremental BOOLEAN DEFAULT FALSE,
     status TEXT DEFAULT 'initiated' CHECK (status IN ('initiated', 'uploading', 'completed', 'failed', 'cancelled', 'expired')),
     error_message TEXT,
     expires_at TIMESTAMPTZ,
@@ -54,6 +59,13 @@ CREATE INDEX IF NOT EXISTS idx_upload_sessions_session_id ON upload_sessions(ses
 CREATE INDEX IF NOT EXISTS idx_upload_sessions_status ON upload_sessions(status);
 CREATE INDEX IF NOT EXISTS idx_upload_sessions_video_id ON upload_sessions(video_id);
 
+-- Columns added after the initial release
+ALTER TABLE upload_sessions ADD COLUMN IF NOT EXISTS tier TEXT DEFAULT 'standard';
+ALTER TABLE upload_sessions ADD COLUMN IF NOT EXISTS chunk_size INTEGER;
+ALTER TABLE upload_sessions ADD COLUMN IF NOT EXISTS target_path TEXT;
+ALTER TABLE upload_sessions ADD COLUMN IF NOT EXISTS tenant TEXT;
+ALTER TABLE upload_sessions ADD COLUMN IF NOT EXISTS incremental BOOLEAN DEFAULT FALSE;
+
 -- 3. Assessments Table
 -- Stores assessment analysis results
 CREATE TABLE IF NOT EXISTS assessments (